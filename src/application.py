@@ -81,7 +81,6 @@ class Application(Gtk.Application):
                             flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE)
         os.environ['PULSE_PROP_media.role'] = 'music'
         os.environ['PULSE_PROP_application.icon_name'] = 'lollypop'
-        self.cursors = {}
         self.window = None
         self.notify = None
         self.lastfm = None
@@ -135,7 +134,7 @@ class Application(Gtk.Application):
         self.settings = Settings.new()
         self.db = Database()
         self.playlists = Playlists()
-        # We store cursors for main thread
+        # Main thread connections are never rolled back
         SqlCursor.add(self.db)
         SqlCursor.add(self.playlists)
         self.albums = AlbumsDatabase()
@@ -227,6 +226,8 @@ class Application(Gtk.Application):
                     self.player.shuffle_albums(False)
                     dump(self.player.get_albums(),
                          open(DataPath + "/albums.bin", "wb"))
+                    dump(self.player.get_shuffle_history(),
+                         open(DataPath + "/shuffle.bin", "wb"))
                 except Exception as e:
                     print("Application::prepare_to_exit()", e)
             dump(track_id, open(DataPath + "/track_id.bin", "wb"))
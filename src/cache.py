@@ -48,18 +48,22 @@ class InfoCache:
             except:
                 print("Can't create %s" % InfoCache._CACHE_PATH)
 
-    def exists(prefix):
+    def exists(prefix, service=None):
         """
-            Return True if an info is cached
+            Return True if an artwork is cached, placeholders are ignored
             @param prefix as string
+            @param service as str, any service if None
         """
         exists = False
         for (suffix, helper1, helper2) in InfoCache.WEBSERVICES:
+            if service is not None and suffix != service:
+                continue
             filepath = "%s/%s_%s.jpg" % (InfoCache._INFO_PATH,
                                          escape(prefix),
                                          suffix)
             if path.exists(filepath):
-                exists = True
+                if path.getsize(filepath) > 0:
+                    exists = True
             else:
                 # FIXME Remove this code, support for old lollypop versions
                 #
@@ -13,16 +13,21 @@
 from gi.repository import GLib, GObject, Gio
 
 import os
+from collections import deque
+from stat import S_ISDIR
+from concurrent.futures import Future, ThreadPoolExecutor
 from gettext import gettext as _
-from threading import Thread
+from threading import Thread, local
 from time import time
 
 from lollypop.inotify import Inotify
 from lollypop.define import Lp
 from lollypop.sqlcursor import SqlCursor
-from lollypop.tagreader import TagReader
+from lollypop.tagreader import TagReader, Discoverer
 from lollypop.database_history import History
-from lollypop.utils import is_audio, is_pls, debug
+from lollypop.database_dirs import DirsDatabase
+from lollypop.database_tags import TagsDatabase
+from lollypop.utils import debug
 
 
 class CollectionScanner(GObject.GObject, TagReader):
@@ -35,8 +40,23 @@ class CollectionScanner(GObject.GObject, TagReader):
                                                                  int,
                                                                  bool)),
         'genre-updated': (GObject.SignalFlags.RUN_FIRST, None, (int, bool)),
-        'album-updated': (GObject.SignalFlags.RUN_FIRST, None, (int,))
+        'album-updated': (GObject.SignalFlags.RUN_FIRST, None, (int,)),
+        # Added track ids, removed track ids, before 'scan-finished'
+        'tracks-changed': (GObject.SignalFlags.RUN_FIRST, None, (object,
+                                                                 object))
     }
+    # How many files are queued per discovery worker
+    __QUEUE_FACTOR = 4
+    # How many tracks are added to db in one transaction
+    __BATCH_SIZE = 200
+    # Files with these extensions are not sniffed
+    __AUDIO_EXTENSIONS = ["aac", "aif", "aiff", "ape", "flac", "m4a", "m4b",
+                          "mka", "mp2", "mp3", "mpc", "oga", "ogg", "opus",
+                          "spx", "tta", "wav", "wma", "wv"]
+    __OTHER_EXTENSIONS = ["accurip", "bmp", "cue", "db", "gif", "htm", "html",
+                          "ini", "jpeg", "jpg", "log", "m3u", "m3u8", "md5",
+                          "nfo", "pdf", "pls", "png", "sfv", "txt", "xspf"]
+    __PLS_CONTENT_TYPES = ["audio/x-mpegurl", "application/xspf+xml"]
 
     def __init__(self):
         """
@@ -47,14 +67,24 @@ class CollectionScanner(GObject.GObject, TagReader):
 
         self.__thread = None
         self.__history = None
+        self.__walked = 0
+        # Track ids added/removed by current scan
+        self.__added = []
+        self.__removed = []
+        self.__dirs = DirsDatabase()
+        self.__tags = TagsDatabase()
+        # Per worker discoverers
+        self.__workers_data = local()
         if Lp().settings.get_value('auto-update'):
             self.__inotify = Inotify()
         else:
             self.__inotify = None
 
-    def update(self):
+    def update(self, incremental=False):
         """
             Update database
+            @param incremental as bool, skip directories unchanged
+                   since last scan
         """
         if not self.is_locked():
             paths = Lp().settings.get_music_paths()
@@ -66,7 +96,23 @@ class CollectionScanner(GObject.GObject, TagReader):
 
             if Lp().notify is not None:
                 Lp().notify.send(_("Your music is updating"))
-            self.__thread = Thread(target=self.__scan, args=(paths,))
+            self.__thread = Thread(target=self.__scan,
+                                   args=(paths, incremental))
+            self.__thread.daemon = True
+            self.__thread.start()
+
+    def update_paths(self, paths, moves=[]):
+        """
+            Update database for changed files and directories only
+            @param paths as [str]
+            @param moves as [(old path as str, new path as str)],
+                   moved tracks keep their stats
+        """
+        if not self.is_locked():
+            Lp().window.progress.add(self)
+            Lp().window.progress.set_fraction(0.0, self)
+            self.__thread = Thread(target=self.__scan,
+                                   args=(paths, True, moves))
             self.__thread.daemon = True
             self.__thread.start()
 
@@ -82,38 +128,157 @@ class CollectionScanner(GObject.GObject, TagReader):
         """
         self.__thread = None
 
+    def get_modified(self, uris, mtimes, orig_tracks, modified, was_empty):
+        """
+            Filter walked uris, yield new and modified files
+            @param uris as (uri as str, mtime as int/None) generator
+            @param mtimes as {uri as str: mtime as int}
+            @param orig_tracks as set(str), found uris are removed,
+                   remaining ones are deleted files
+            @param modified as [str], filled with modified uris
+            @param was_empty as bool
+            @return (uri as str, mtime as int) generator
+        """
+        for (uri, mtime) in uris:
+            # If songs exists and mtime unchanged, continue,
+            # else rescan, no mtime means directory unchanged
+            if uri in orig_tracks:
+                orig_tracks.discard(uri)
+                if mtime is None or mtime <= mtimes[uri]:
+                    continue
+                else:
+                    modified.append(uri)
+            # On first scan, use modification time
+            # Else, use current time
+            if not was_empty:
+                mtime = int(time())
+            yield (uri, mtime)
+
+    def del_from_db(self, uris):
+        """
+            Delete tracks from db, deleted or modified files
+            @param uris as [str]
+        """
+        if not uris:
+            return
+        track_ids = Lp().tracks.get_ids_for_uris(uris)
+        (album_ids, artists, genre_ids) = Lp().db.del_tracks(track_ids,
+                                                             self.__history)
+        self.__removed += track_ids
+        artist_ids = list(artists.keys())
+        self.del_from_caches(artist_ids, genre_ids, album_ids)
+        with SqlCursor(Lp().db) as sql:
+            sql.commit()
+        for album_id in album_ids:
+            GLib.idle_add(self.emit, 'album-updated', album_id)
+        for artist_id in artist_ids:
+            GLib.idle_add(self.emit, 'artist-updated',
+                          artist_id, artists[artist_id], False)
+        for genre_id in genre_ids:
+            GLib.idle_add(self.emit, 'genre-updated', genre_id, False)
+
 #######################
 # PRIVATE             #
 #######################
-    def __get_objects_for_paths(self, paths):
-        """
-            Return all tracks/dirs for paths
-            @param paths as string
-            @return ([tracks path], [dirs path], track count)
-        """
-        tracks = []
-        track_dirs = list(paths)
-        for path in paths:
-            for root, dirs, files in os.walk(path, followlinks=True):
-                # Add dirs
-                for d in dirs:
-                    track_dirs.append(os.path.join(root, d))
-                # Add files
-                for name in files:
-                    path = os.path.join(root, name)
-                    uri = GLib.filename_to_uri(path)
-                    try:
-                        f = Gio.File.new_for_uri(uri)
-                        if is_pls(f):
-                            pass
-                        elif is_audio(f):
-                            tracks.append(uri)
-                        else:
-                            debug("%s not detected as a music file" % uri)
-                    except Exception as e:
-                        print("CollectionScanner::__get_objects_for_paths: %s"
-                              % e)
-        return (tracks, track_dirs)
+    def __walk(self, paths, dirs, known_dirs, orig_tracks, dirs_state):
+        """
+            Walk paths and yield music files
+            Directories unchanged since last scan are not read, their
+            tracks are taken from db
+            @param paths as [string]
+            @param dirs as [string], filled with walked directories
+            @param known_dirs as {path as str: (mtime as int, count as int)}
+            @param orig_tracks as set(str), tracks in db
+            @param dirs_state as [(path as str, mtime as int, count as int)],
+                   filled with walked directories state
+            @return (uri as str, mtime as int/None) generator,
+                    mtime is None for tracks in unchanged directories
+        """
+        # Directory -> tracks in db
+        dir_tracks = {}
+        # Directory -> known subdirectories
+        subdirs = {}
+        if known_dirs:
+            for uri in orig_tracks:
+                if uri.startswith('file:'):
+                    path = GLib.filename_from_uri(uri)[0]
+                    dir_tracks.setdefault(os.path.dirname(path),
+                                          []).append(uri)
+            for path in sorted(known_dirs.keys()):
+                subdirs.setdefault(os.path.dirname(path), []).append(path)
+        to_walk = deque(paths)
+        # Do not follow symlinks loops
+        walked = set()
+        while to_walk:
+            path = to_walk.popleft()
+            try:
+                stat = os.stat(path)
+                # Changed file
+                if not S_ISDIR(stat.st_mode):
+                    if self.__is_audio(path):
+                        yield (GLib.filename_to_uri(path),
+                               int(stat.st_mtime))
+                    continue
+                if (stat.st_dev, stat.st_ino) in walked:
+                    continue
+                walked.add((stat.st_dev, stat.st_ino))
+                tracks = dir_tracks.get(path, [])
+                # Directory content unchanged, reuse db state
+                if known_dirs.get(path) == (stat.st_mtime_ns, len(tracks)):
+                    for subdir in subdirs.get(path, []):
+                        dirs.append(subdir)
+                        to_walk.append(subdir)
+                    for uri in tracks:
+                        yield (uri, None)
+                    dirs_state.append((path, stat.st_mtime_ns, len(tracks)))
+                    continue
+                count = 0
+                for entry in sorted(os.scandir(path), key=lambda e: e.name):
+                    if entry.is_dir():
+                        dirs.append(entry.path)
+                        to_walk.append(entry.path)
+                    elif entry.is_file() and self.__is_audio(entry.path):
+                        try:
+                            mtime = int(entry.stat().st_mtime)
+                        except FileNotFoundError:
+                            # Removed while walking
+                            continue
+                        count += 1
+                        yield (GLib.filename_to_uri(entry.path), mtime)
+                dirs_state.append((path, stat.st_mtime_ns, count))
+            except FileNotFoundError:
+                # Removed or moved out, its tracks are not yielded
+                debug("CollectionScanner::__walk(): %s removed" % path)
+            except Exception as e:
+                print("CollectionScanner::__walk(): %s" % e)
+
+    def __is_audio(self, path):
+        """
+            Return True if path is a music file, content type is only
+            sniffed for unknown extensions
+            @param path as str
+            @return bool
+        """
+        extension = os.path.splitext(path)[1][1:].lower()
+        if extension in self.__AUDIO_EXTENSIONS:
+            return True
+        elif extension in self.__OTHER_EXTENSIONS:
+            return False
+        try:
+            f = Gio.File.new_for_path(path)
+            info = f.query_info('standard::content-type',
+                                Gio.FileQueryInfoFlags.NONE,
+                                None)
+            content_type = info.get_content_type()
+            if content_type in self.__PLS_CONTENT_TYPES:
+                return False
+            elif content_type[0:6] == "audio/" or\
+                    content_type == "video/mp4":
+                return True
+        except Exception as e:
+            print("CollectionScanner::__is_audio(): %s" % e)
+        debug("%s not detected as a music file" % path)
+        return False
 
     def __update_progress(self, current, total):
         """
@@ -122,65 +287,118 @@ class CollectionScanner(GObject.GObject, TagReader):
         """
         Lp().window.progress.set_fraction(current / total, self)
 
-    def __finish(self):
+    def __finish(self, added, removed):
         """
             Notify from main thread when scan finished
+            @param added as [int], added track ids
+            @param removed as [int], removed track ids
         """
         Lp().window.progress.set_fraction(1.0, self)
         self.stop()
+        self.emit("tracks-changed", added, removed)
         self.emit("scan-finished")
         if Lp().settings.get_value('artist-artwork'):
             Lp().art.cache_artists_info()
 
-    def __scan(self, paths):
+    def __scan(self, paths, incremental, moves=None):
         """
             Scan music collection for music files
             @param paths as [string], paths to scan
+            @param incremental as bool
+            @param moves as [(old path as str, new path as str)],
+                   None for a full scan
+            @thread safe
+        """
+        self.init_caches()
+        self.__added = []
+        self.__removed = []
+        try:
+            # Keep tags cache cursor open while scanning
+            with SqlCursor(self.__tags):
+                if moves is None:
+                    self.__scan_paths(paths, incremental)
+                else:
+                    self.__move(moves)
+                    paths += [new_path for (old_path, new_path) in moves]
+                    self.__scan_paths(paths, incremental, True)
+        except Exception as e:
+            # Stop scan, notify about committed changes
+            print("CollectionScanner::__scan():", e)
+            GLib.idle_add(self.__finish, self.__added, self.__removed)
+        finally:
+            self.clean_caches()
+
+    def __move(self, moves):
+        """
+            Rename moved files and directories in db
+            @param moves as [(old path as str, new path as str)]
+            @thread safe
+        """
+        with SqlCursor(Lp().db) as sql:
+            for (old_path, new_path) in moves:
+                try:
+                    new_uri = GLib.filename_to_uri(new_path)
+                    # Moved over an existing file
+                    self.del_from_db([new_uri])
+                    Lp().tracks.rename(GLib.filename_to_uri(old_path),
+                                       new_uri)
+                    Lp().albums.rename_path(old_path, new_path)
+                    self.__dirs.rename(old_path, new_path)
+                    self.__tags.rename(old_path, new_path)
+                except Exception as e:
+                    print("CollectionScanner::__move():", e)
+            sql.commit()
+
+    def __scan_paths(self, paths, incremental, partial=False):
+        """
+            Scan paths for music files, caches must be loaded
+            @param paths as [string], paths to scan
+            @param incremental as bool
+            @param partial as bool, paths are changed files and
+                   directories inside collection
             @thread safe
         """
         gst_message = None
         if self.__history is None:
             self.__history = History()
         mtimes = Lp().tracks.get_mtimes()
-        orig_tracks = Lp().tracks.get_uris()
-        was_empty = len(orig_tracks) == 0
+        was_empty = len(mtimes) == 0
+        if partial:
+            prefixes = [GLib.filename_to_uri(path) for path in paths]
+            orig_tracks = set([uri for uri in mtimes.keys()
+                               if self.__is_in(uri, prefixes)])
+        else:
+            orig_tracks = set(mtimes.keys())
 
-        (new_tracks, new_dirs) = self.__get_objects_for_paths(paths)
-        count = len(new_tracks) + len(orig_tracks)
-        # Add monitors on dirs
-        if self.__inotify is not None:
-            for d in new_dirs:
-                self.__inotify.add_monitor(d)
+        count = len(orig_tracks)
+        new_dirs = [path for path in paths if os.path.isdir(path)]
+        if incremental:
+            known_dirs = self.__dirs.get()
+        else:
+            known_dirs = {}
+        dirs_state = []
 
         with SqlCursor(Lp().db) as sql:
-            i = 0
-            for uri in new_tracks:
+            self.__walked = 0
+            # Walk paths, search for new and modified files
+            uris = self.__walk(paths, new_dirs, known_dirs,
+                               orig_tracks, dirs_state)
+            # Modified files, removed from db before next batch is added
+            modified = []
+            to_discover = self.get_modified(
+                                        self.__count_walked(uris, count),
+                                        mtimes, orig_tracks, modified,
+                                        was_empty)
+            # Read tags in workers, add to db in files order
+            items = []
+            tags = []
+            for (uri, mtime, future, key) in self.__discover(to_discover):
                 if self.__thread is None:
                     return
-                GLib.idle_add(self.__update_progress, i, count)
                 try:
-                    f = Gio.File.new_for_uri(uri)
-                    info = f.query_info('time::modified',
-                                        Gio.FileQueryInfoFlags.NONE,
-                                        None)
-                    mtime = info.get_attribute_as_string('time::modified')
-                    # If songs exists and mtime unchanged, continue,
-                    # else rescan
-                    if uri in orig_tracks:
-                        orig_tracks.remove(uri)
-                        i += 1
-                        if mtime <= mtimes[uri]:
-                            i += 1
-                            continue
-                        else:
-                            self.__del_from_db(uri)
-                    info = self.get_info(uri)
-                    # On first scan, use modification time
-                    # Else, use current time
-                    if not was_empty:
-                        mtime = int(time())
-                    debug("Adding file: %s" % uri)
-                    self.__add2db(uri, info, mtime)
+                    items.append((uri, future.result(), mtime))
+                    if key is not None:
+                        tags.append(key + (future.result(),))
                 except GLib.GError as e:
                     print(e, uri)
                     if e.message != gst_message:
@@ -189,138 +407,273 @@ class CollectionScanner(GObject.GObject, TagReader):
                             Lp().notify.send(gst_message)
                 except:
                     pass
-                i += 1
+                if len(items) >= self.__BATCH_SIZE:
+                    self.del_from_db(modified)
+                    del modified[:]
+                    self.__add2db(items)
+                    items = []
+                    self.__tags.set(tags)
+                    tags = []
+            if self.__thread is None:
+                return
+            self.del_from_db(modified)
+            if items:
+                self.__add2db(items)
+            if tags:
+                self.__tags.set(tags)
+
+            # Add monitors on dirs
+            if self.__inotify is not None:
+                GLib.idle_add(self.__inotify.add_monitors, new_dirs)
 
             # Clean deleted files
-            for uri in orig_tracks:
-                i += 1
-                GLib.idle_add(self.__update_progress, i, count)
-                if uri.startswith('file:'):
-                    self.__del_from_db(uri)
+            deleted = [uri for uri in orig_tracks if uri.startswith('file:')]
+            self.del_from_db(deleted)
+            self.__tags.remove([GLib.filename_from_uri(uri)[0]
+                                for uri in deleted])
 
+            if partial:
+                self.__dirs.set(dirs_state, [path for path in paths
+                                             if not os.path.isfile(path)])
+            else:
+                self.__dirs.set(dirs_state)
             sql.commit()
-        GLib.idle_add(self.__finish)
+        GLib.idle_add(self.__finish, self.__added, self.__removed)
         del self.__history
         self.__history = None
 
-    def __add2db(self, uri, info, mtime):
-        """
-            Add new file to db with informations
-            @param uri as string
-            @param info as GstPbutils.DiscovererInfo
-            @param mtime as int
-            @return track id as int
-        """
-        debug("CollectionScanner::add2db(): Read tags")
-        path = GLib.filename_from_uri(uri)[0]
-        tags = info.get_tags()
-        title = self.get_title(tags, path)
-        artists = self.get_artists(tags)
-        composers = self.get_composers(tags)
-        performers = self.get_performers(tags)
-        a_sortnames = self.get_artist_sortnames(tags)
-        aa_sortnames = self.get_album_artist_sortnames(tags)
-        album_artists = self.get_album_artist(tags)
-        album_name = self.get_album_name(tags)
-        genres = self.get_genres(tags)
-        discnumber = self.get_discnumber(tags)
-        discname = self.get_discname(tags)
-        tracknumber = self.get_tracknumber(tags, GLib.basename(path))
-        year = self.get_year(tags)
-        duration = int(info.get_duration()/1000000000)
-        name = GLib.path_get_basename(path)
-
-        # If no artists tag, use album artist
-        if artists == '':
-            artists = album_artists
-        # if artists is always null, no album artists too,
-        # use composer/performer
-        if artists == '':
-            artists = performers
-            album_artists = composers
-            if artists == '':
-                artists = album_artists
-            if artists == '':
-                artists = _("Unknown")
-
-        debug("CollectionScanner::add2db(): Restore stats")
-        # Restore stats
-        (track_pop, track_ltime, amtime, album_pop) = self.__history.get(
-                                                            name, duration)
-        # If nothing in stats, set mtime
-        if amtime == 0:
-            amtime = mtime
-        debug("CollectionScanner::add2db(): Add artists %s" % artists)
-        (artist_ids, new_artist_ids) = self.add_artists(artists,
-                                                        album_artists,
-                                                        a_sortnames)
-        debug("CollectionScanner::add2db(): "
-              "Add album artists %s" % album_artists)
-        (album_artist_ids, new_album_artist_ids) = self.add_album_artists(
-                                                                 album_artists,
-                                                                 aa_sortnames)
-        new_artist_ids += new_album_artist_ids
-
-        debug("CollectionScanner::add2db(): Add album: "
-              "%s, %s" % (album_name, album_artist_ids))
-        (album_id, new_album) = self.add_album(album_name, album_artist_ids,
-                                               path, album_pop, amtime)
-
-        (genre_ids, new_genre_ids) = self.add_genres(genres, album_id)
-
-        # Add track to db
-        debug("CollectionScanner::add2db(): Add track")
-        track_id = Lp().tracks.add(title, uri, duration,
-                                   tracknumber, discnumber, discname,
-                                   album_id, year, track_pop,
-                                   track_ltime, mtime)
-
-        debug("CollectionScanner::add2db(): Update tracks")
-        self.update_track(track_id, artist_ids, genre_ids)
-        self.update_album(album_id, album_artist_ids, genre_ids, year)
-        # Notify about new artists/genres
-        if new_genre_ids or new_artist_ids:
-            with SqlCursor(Lp().db) as sql:
-                sql.commit()
-            for genre_id in new_genre_ids:
-                GLib.idle_add(self.emit, 'genre-updated', genre_id, True)
-            for artist_id in new_artist_ids:
-                GLib.idle_add(self.emit, 'artist-updated',
-                              artist_id, album_id, True)
-        return track_id
+    def __is_in(self, uri, prefixes):
+        """
+            True if uri is one of prefixes or inside one of them
+            @param uri as str
+            @param prefixes as [str]
+            @return bool
+        """
+        for prefix in prefixes:
+            if uri == prefix or uri.startswith(prefix + "/"):
+                return True
+        return False
 
-    def __del_from_db(self, uri):
+    def __count_walked(self, uris, count):
+        """
+            Update progress for walked uris, stop with scan
+            @param uris as (uri as str, mtime as int/None) generator
+            @param count as int, estimated files count
+            @return (uri as str, mtime as int/None) generator
         """
-            Delete track from db
+        for item in uris:
+            if self.__thread is None:
+                return
+            self.__walked += 1
+            GLib.idle_add(self.__update_progress, self.__walked,
+                          max(count, self.__walked + 1))
+            yield item
+
+    def __get_workers_count(self):
+        """
+            Return how many discovery workers should be used
+            @return int
+        """
+        workers = Lp().settings.get_value('scan-workers').get_int32()
+        if workers < 1:
+            workers = os.cpu_count() or 1
+        return workers
+
+    def __discover(self, items):
+        """
+            Discover items in a pool of workers
+            Results are yielded in items order
+            Files found in tags cache are not discovered
+            @param items as [(uri as str, mtime as int)]
+            @return (uri as str, mtime as int, future as Future,
+                     key as (path as str, size as int, mtime as int)/None)
+                    generator, future result is a TagReader.parse_info()
+                    tuple, key is set when result should be cached
+        """
+        workers = self.__get_workers_count()
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            for (uri, mtime) in items:
+                key = self.__get_tags_key(uri)
+                cached = None
+                if key is not None:
+                    cached = self.__tags.get(*key)
+                if cached is None:
+                    future = executor.submit(self.__discover_uri, uri)
+                else:
+                    future = Future()
+                    future.set_result(cached)
+                    key = None
+                pending.append((uri, mtime, future, key))
+                if len(pending) >= workers * self.__QUEUE_FACTOR:
+                    yield pending.popleft()
+            while pending:
+                yield pending.popleft()
+        finally:
+            # Scan stopped, do not discover queued files
+            for (uri, mtime, future, key) in pending:
+                future.cancel()
+            executor.shutdown()
+
+    def __get_tags_key(self, uri):
+        """
+            Get tags cache key for uri
             @param uri as str
+            @return (path as str, size as int, mtime as int (ns)) or None
         """
-        path = GLib.filename_from_uri(uri)[0]
-        name = GLib.path_get_basename(path)
-        track_id = Lp().tracks.get_id_by_uri(uri)
-        album_id = Lp().tracks.get_album_id(track_id)
-        genre_ids = Lp().tracks.get_genre_ids(track_id)
-        album_artist_ids = Lp().albums.get_artist_ids(album_id)
-        artist_ids = Lp().tracks.get_artist_ids(track_id)
-        popularity = Lp().tracks.get_popularity(track_id)
-        ltime = Lp().tracks.get_ltime(track_id)
-        mtime = Lp().albums.get_mtime(album_id)
-        duration = Lp().tracks.get_duration(track_id)
-        album_popularity = Lp().albums.get_popularity(album_id)
-        self.__history.add(name, duration, popularity,
-                           ltime, mtime, album_popularity)
-        Lp().tracks.remove(track_id)
-        Lp().tracks.clean(track_id)
-        modified = Lp().albums.clean(album_id)
-        if modified:
-            with SqlCursor(Lp().db) as sql:
+        try:
+            path = GLib.filename_from_uri(uri)[0]
+            stat = os.stat(path)
+            return (path, stat.st_size, stat.st_mtime_ns)
+        except:
+            return None
+
+    def __discover_uri(self, uri):
+        """
+            Read tags for uri from file headers, fallback to current
+            worker discoverer
+            @param uri as str
+            @return TagReader.parse_info() tuple
+            @thread safe
+        """
+        tags = self.parse_file(uri)
+        if tags is not None:
+            return tags
+        discoverer = getattr(self.__workers_data, 'discoverer', None)
+        if discoverer is None:
+            discoverer = Discoverer()
+            self.__workers_data.discoverer = discoverer
+        info = discoverer.get_info(uri)
+        return self.parse_info(info, uri)
+
+    def __add2db(self, items):
+        """
+            Add new files to db with informations, in one transaction
+            @param items as [(uri as str, tags as TagReader.parse_info()
+                              tuple, mtime as int)]
+            @raise Exception if batch can't be added, nothing is added
+        """
+        # (artist id, album id) for new artists
+        new_artists = []
+        new_genre_ids = []
+        # album id -> calculate artists from tracks
+        albums = {}
+        track_artists = []
+        track_genres = []
+        album_genres = set()
+        track_ids = []
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("SAVEPOINT add2db")
+            for (uri, tags, mtime) in items:
+                # Do not keep albums/genres without track on failure
+                sql.execute("SAVEPOINT track")
+                try:
+                    debug("CollectionScanner::add2db(): Read tags")
+                    path = GLib.filename_from_uri(uri)[0]
+                    (title, artists, composers, performers, a_sortnames,
+                     aa_sortnames, album_artists, album_name, genres,
+                     discnumber, discname, tracknumber, year,
+                     duration) = tags
+                    name = GLib.path_get_basename(path)
+
+                    # If no artists tag, use album artist
+                    if artists == '':
+                        artists = album_artists
+                    # if artists is always null, no album artists too,
+                    # use composer/performer
+                    if artists == '':
+                        artists = performers
+                        album_artists = composers
+                        if artists == '':
+                            artists = album_artists
+                        if artists == '':
+                            artists = _("Unknown")
+
+                    debug("CollectionScanner::add2db(): Restore stats")
+                    # Restore stats
+                    (track_pop, track_ltime,
+                     amtime, album_pop) = self.__history.get(name, duration)
+                    # If nothing in stats, set mtime
+                    if amtime == 0:
+                        amtime = mtime
+                    debug("CollectionScanner::add2db(): "
+                          "Add artists %s" % artists)
+                    (artist_ids,
+                     new_artist_ids) = self.add_artists(artists,
+                                                        album_artists,
+                                                        a_sortnames)
+                    debug("CollectionScanner::add2db(): "
+                          "Add album artists %s" % album_artists)
+                    (album_artist_ids,
+                     new_album_artist_ids) = self.add_album_artists(
+                                                                album_artists,
+                                                                aa_sortnames)
+                    new_artist_ids += new_album_artist_ids
+
+                    debug("CollectionScanner::add2db(): Add album: "
+                          "%s, %s" % (album_name, album_artist_ids))
+                    (album_id, new_album) = self.add_album(album_name,
+                                                           album_artist_ids,
+                                                           path, album_pop,
+                                                           amtime)
+
+                    (genre_ids, new_genre) = self.add_genres(genres,
+                                                             album_id)
+
+                    # Add track to db
+                    debug("CollectionScanner::add2db(): Add track")
+                    track_id = Lp().tracks.add(title, uri, duration,
+                                               tracknumber, discnumber,
+                                               discname, album_id, year,
+                                               track_pop, track_ltime, mtime)
+                except Exception as e:
+                    print("CollectionScanner::__add2db():", e, uri)
+                    sql.execute("ROLLBACK TO track")
+                    sql.execute("RELEASE track")
+                    # Rolled back ids may be cached
+                    self.init_caches()
+                    continue
+                sql.execute("RELEASE track")
+                track_ids.append(track_id)
+                albums[album_id] = not album_artist_ids
+                new_genre_ids += new_genre
+                for artist_id in new_artist_ids:
+                    new_artists.append((artist_id, album_id))
+                # Keep tags order, artists order matters
+                for artist_id in artist_ids:
+                    if (track_id, artist_id) not in track_artists:
+                        track_artists.append((track_id, artist_id))
+                for genre_id in genre_ids:
+                    if (track_id, genre_id) not in track_genres:
+                        track_genres.append((track_id, genre_id))
+                    album_genres.add((album_id, genre_id))
+
+            try:
+                debug("CollectionScanner::add2db(): Update tracks/albums")
+                Lp().tracks.add_artists(track_artists)
+                Lp().tracks.add_genres(track_genres)
+                Lp().albums.add_genres(list(album_genres))
+                for (album_id, calculate_artists) in albums.items():
+                    # Set artist ids based on content
+                    if calculate_artists:
+                        Lp().albums.set_artist_ids(
+                                    album_id,
+                                    Lp().albums.calculate_artist_ids(album_id))
+                    # Update year based on tracks
+                    year = Lp().albums.get_year_from_tracks(album_id)
+                    Lp().albums.set_year(album_id, year)
+                sql.execute("RELEASE add2db")
                 sql.commit()
-            GLib.idle_add(self.emit, 'album-updated', album_id)
-        for artist_id in album_artist_ids + artist_ids:
-            ret = Lp().artists.clean(artist_id)
-            if ret:
-                GLib.idle_add(self.emit, 'artist-updated',
-                              artist_id, album_id, False)
-        for genre_id in genre_ids:
-            ret = Lp().genres.clean(genre_id)
-            if ret:
-                GLib.idle_add(self.emit, 'genre-updated', genre_id, False)
+            except:
+                sql.execute("ROLLBACK TO add2db")
+                sql.execute("RELEASE add2db")
+                self.init_caches()
+                raise
+        self.__added += track_ids
+        # Notify about new artists/genres
+        for genre_id in new_genre_ids:
+            GLib.idle_add(self.emit, 'genre-updated', genre_id, True)
+        for (artist_id, album_id) in new_artists:
+            GLib.idle_add(self.emit, 'artist-updated',
+                          artist_id, album_id, True)
@@ -69,16 +69,17 @@ class Container:
         Lp().playlists.connect('playlists-changed',
                                self.__update_playlists)
 
-    def update_db(self):
+    def update_db(self, incremental=False):
         """
             Update db at startup only if needed
+            @param incremental as bool, skip unchanged directories
         """
         # Stop previous scan
         if Lp().scanner.is_locked():
             Lp().scanner.stop()
-            GLib.timeout_add(250, self.update_db)
+            GLib.timeout_add(250, self.update_db, incremental)
         else:
-            Lp().scanner.update()
+            Lp().scanner.update(incremental)
 
     def get_genre_id(self):
         """
@@ -240,6 +241,7 @@ class Container:
             Mark force scan as False, update lists
             @param scanner as CollectionScanner
         """
+        Lp().playlists.update_track_ids()
         self.__update_lists(scanner)
 
     def add_fake_phone(self):
@@ -12,14 +12,15 @@
 
 from gi.repository import GLib
 
-import sqlite3
 import os
+import re
+from locale import setlocale, LC_COLLATE
 
 from lollypop.define import Lp
 from lollypop.database_upgrade import DatabaseUpgrade
 from lollypop.sqlcursor import SqlCursor
 from lollypop.localized import LocalizedCollation
-from lollypop.utils import noaccents
+from lollypop.utils import noaccents, get_sortkey, sql_chunks
 
 
 class Database:
@@ -36,6 +37,7 @@ class Database:
     # this make VACUUM not destroy rowids...
     __create_albums = '''CREATE TABLE albums (id INTEGER PRIMARY KEY,
                                               name TEXT NOT NULL,
+                                              sortkey BLOB NOT NULL,
                                               no_album_artist BOOLEAN NOT NULL,
                                               year INT,
                                               path TEXT NOT NULL,
@@ -44,9 +46,11 @@ class Database:
                                               mtime INT NOT NULL)'''
     __create_artists = '''CREATE TABLE artists (id INTEGER PRIMARY KEY,
                                                name TEXT NOT NULL,
-                                               sortname TEXT NOT NULL)'''
+                                               sortname TEXT NOT NULL,
+                                               sortkey BLOB NOT NULL)'''
     __create_genres = '''CREATE TABLE genres (id INTEGER PRIMARY KEY,
-                                            name TEXT NOT NULL)'''
+                                            name TEXT NOT NULL,
+                                            sortkey BLOB NOT NULL)'''
     __create_album_artists = '''CREATE TABLE album_artists (
                                                 album_id INT NOT NULL,
                                                 artist_id INT NOT NULL)'''
@@ -73,6 +77,10 @@ class Database:
     __create_track_genres = '''CREATE TABLE track_genres (
                                                 track_id INT NOT NULL,
                                                 genre_id INT NOT NULL)'''
+    # Directories state at last successful scan
+    __create_dirs = '''CREATE TABLE dirs (path TEXT PRIMARY KEY,
+                                          mtime INT NOT NULL,
+                                          count INT NOT NULL)'''
     __create_album_artists_idx = '''CREATE index idx_aa ON album_artists(
                                                 album_id)'''
     __create_track_artists_idx = '''CREATE index idx_ta ON track_artists(
@@ -81,6 +89,60 @@ class Database:
                                                 album_id)'''
     __create_track_genres_idx = '''CREATE index idx_tg ON track_genres(
                                                 track_id)'''
+    __create_tracks_uri_idx = '''CREATE index idx_tu ON tracks(uri)'''
+    __create_albums_sortkey_idx = '''CREATE index idx_als ON albums(
+                                                sortkey)'''
+    __create_artists_sortkey_idx = '''CREATE index idx_ars ON artists(
+                                                sortkey)'''
+    __create_genres_sortkey_idx = '''CREATE index idx_gs ON genres(
+                                                sortkey)'''
+    # Lookups by name or path, junction tables from artist/genre side,
+    # album tracks in disc order and top lists
+    __create_indexes = [
+        "CREATE INDEX IF NOT EXISTS idx_arn ON artists(name)",
+        "CREATE INDEX IF NOT EXISTS idx_gn ON genres(name)",
+        "CREATE INDEX IF NOT EXISTS idx_aln ON albums(name)",
+        "CREATE INDEX IF NOT EXISTS idx_alp ON albums(path)",
+        "CREATE INDEX IF NOT EXISTS idx_alpo ON albums(popularity)",
+        "CREATE INDEX IF NOT EXISTS idx_alm ON albums(mtime)",
+        "CREATE INDEX IF NOT EXISTS idx_tn ON tracks(name)",
+        "CREATE INDEX IF NOT EXISTS idx_tad ON tracks(album_id,\
+                                                      discnumber,\
+                                                      tracknumber)",
+        "CREATE INDEX IF NOT EXISTS idx_tpo ON tracks(popularity)",
+        "CREATE INDEX IF NOT EXISTS idx_tl ON tracks(ltime)",
+        "CREATE INDEX IF NOT EXISTS idx_aar ON album_artists(artist_id,\
+                                                             album_id)",
+        "CREATE INDEX IF NOT EXISTS idx_agr ON album_genres(genre_id,\
+                                                            album_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tar ON track_artists(artist_id,\
+                                                             track_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tgr ON track_genres(genre_id,\
+                                                            track_id)"]
+    # Full text search, names are indexed without accents and with prefixes
+    # External content tables, kept up to date by triggers
+    __FTS_TABLES = ["tracks", "albums", "artists"]
+    __FTS_TOKENIZERS = ["unicode61 remove_diacritics 2",
+                        "unicode61 remove_diacritics 1"]
+    __create_fts = '''CREATE VIRTUAL TABLE %s_fts USING fts5(
+                                                name,
+                                                content=%s,
+                                                content_rowid=id,
+                                                prefix='1 2 3',
+                                                tokenize='%s')'''
+    __create_fts_triggers = [
+        '''CREATE TRIGGER %s_fts_ai AFTER INSERT ON %s BEGIN
+             INSERT INTO %s_fts(rowid, name) VALUES (new.id, new.name);
+           END''',
+        '''CREATE TRIGGER %s_fts_ad AFTER DELETE ON %s BEGIN
+             INSERT INTO %s_fts(%s_fts, rowid, name)
+             VALUES ('delete', old.id, old.name);
+           END''',
+        '''CREATE TRIGGER %s_fts_au AFTER UPDATE OF name ON %s BEGIN
+             INSERT INTO %s_fts(%s_fts, rowid, name)
+             VALUES ('delete', old.id, old.name);
+             INSERT INTO %s_fts(rowid, name) VALUES (new.id, new.name);
+           END''']
 
     def __init__(self):
         """
@@ -107,47 +169,230 @@ class Database:
                     sql.execute(self.__create_tracks)
                     sql.execute(self.__create_track_artists)
                     sql.execute(self.__create_track_genres)
+                    sql.execute(self.__create_dirs)
                     sql.execute(self.__create_album_artists_idx)
                     sql.execute(self.__create_track_artists_idx)
                     sql.execute(self.__create_album_genres_idx)
                     sql.execute(self.__create_track_genres_idx)
+                    sql.execute(self.__create_tracks_uri_idx)
+                    sql.execute(self.__create_albums_sortkey_idx)
+                    sql.execute(self.__create_artists_sortkey_idx)
+                    sql.execute(self.__create_genres_sortkey_idx)
                     sql.commit()
+                    self.create_indexes()
+                    self.create_fts()
                     Lp().settings.set_value('db-version',
                                             GLib.Variant('i', upgrade.count()))
             except Exception as e:
                 print("Database::__init__(): %s" % e)
+        self.update_sortkeys()
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT COUNT(1) FROM sqlite_master\
+                                  WHERE name IN (%s)" %
+                                 ", ".join(["'%s_fts'" % table
+                                            for table in self.__FTS_TABLES]))
+            self.__fts = result.fetchone()[0] == len(self.__FTS_TABLES)
+
+    def create_indexes(self):
+        """
+            Create indexes for lookups, existing ones are kept
+        """
+        with SqlCursor(self) as sql:
+            for request in self.__create_indexes:
+                sql.execute(request)
+            sql.commit()
+
+    def create_fts(self):
+        """
+            Create full text search tables if sqlite supports FTS5,
+            index current content
+        """
+        with SqlCursor(self) as sql:
+            for tokenizer in self.__FTS_TOKENIZERS:
+                try:
+                    for table in self.__FTS_TABLES:
+                        sql.execute(self.__create_fts %
+                                    (table, table, tokenizer))
+                    break
+                except Exception as e:
+                    print("Database::create_fts():", tokenizer, e)
+            else:
+                return
+            for table in self.__FTS_TABLES:
+                for trigger in self.__create_fts_triggers:
+                    sql.execute(trigger.replace("%s", table))
+                sql.execute("INSERT INTO %s_fts(%s_fts) VALUES ('rebuild')" %
+                            (table, table))
+            sql.commit()
+
+    def update_sortkeys(self):
+        """
+            Rebuild sort keys if collation locale changed
+        """
+        collate = setlocale(LC_COLLATE)
+        if Lp().settings.get_value('db-locale').get_string() == collate:
+            return
+        try:
+            with SqlCursor(self) as sql:
+                for (table, column) in [("albums", "name"),
+                                        ("artists", "sortname"),
+                                        ("genres", "name")]:
+                    result = sql.execute("SELECT rowid, %s FROM %s" %
+                                         (column, table))
+                    sql.executemany("UPDATE %s SET sortkey=?\
+                                     WHERE rowid=?" % table,
+                                    [(get_sortkey(name), rowid)
+                                     for (rowid, name) in list(result)])
+                sql.commit()
+            Lp().settings.set_value('db-locale', GLib.Variant('s', collate))
+        except Exception as e:
+            print("Database::update_sortkeys():", e)
 
     def get_cursor(self):
         """
-            Return a new sqlite cursor
+            Return a new sqlite connection, kept open by SqlCursor
         """
         try:
-            c = sqlite3.connect(self.DB_PATH, 600.0)
+            c = SqlCursor.connect(self.DB_PATH)
             c.create_collation('LOCALIZED', LocalizedCollation())
             c.create_function("noaccents", 1, noaccents)
             return c
         except:
             exit(-1)
 
+    def del_tracks(self, track_ids, history=None):
+        """
+            Delete tracks from db, clean orphaned albums, artists and genres
+            @param track_ids as [int]
+            @param history as History, save tracks stats if not None
+            @return (album ids, artists, genre ids) as
+                    ([int], {artist id as int: album id as int}, [int]):
+                    modified albums, deleted artists, deleted genres
+            @warning commit needed
+        """
+        if not track_ids:
+            return ([], {}, [])
+        if history is not None:
+            rows = []
+            for (uri, duration, popularity, ltime, mtime,
+                 album_popularity) in Lp().tracks.get_stats(track_ids):
+                try:
+                    path = GLib.filename_from_uri(uri)[0]
+                    name = GLib.path_get_basename(path)
+                except:
+                    continue
+                rows.append((name, duration, popularity,
+                             ltime, mtime, album_popularity))
+            history.add_many(rows)
+        (album_ids, artists, genre_ids) = Lp().tracks.get_relations(track_ids)
+        Lp().tracks.remove_ids(track_ids)
+        album_ids = Lp().albums.clean_ids(album_ids)
+        artist_ids = Lp().artists.clean_ids(artists.keys())
+        genre_ids = Lp().genres.clean_ids(genre_ids)
+        return (album_ids,
+                dict([(artist_id, artists[artist_id])
+                      for artist_id in artist_ids]),
+                genre_ids)
+
+    def search(self, searched, limit=25):
+        """
+            Search for tracks, albums and artists matching searched
+            @param searched as str
+            @param limit as int, per kind of result
+            @return (tracks, albums, artists) as
+                    ([(id as int, name as str)] * 3), ranked by relevance
+            @thread safe
+        """
+        if not self.__fts:
+            return (Lp().tracks.search(searched),
+                    Lp().albums.search(searched),
+                    Lp().artists.search(searched))
+        query = self.__get_fts_query(searched)
+        matches = ([], [], [])
+        if not query:
+            return matches
+        with SqlCursor(self) as sql:
+            request = " UNION ALL ".join(
+                ["SELECT * FROM (SELECT %s, rowid, name, rank FROM %s_fts\
+                                 WHERE %s_fts MATCH :query\
+                                 ORDER BY rank LIMIT :limit)" %
+                 (i, table, table)
+                 for (i, table) in enumerate(self.__FTS_TABLES)])
+            result = sql.execute(request + " ORDER BY 1, 4",
+                                 {"query": query, "limit": limit})
+            for (i, rowid, name, rank) in result:
+                matches[i].append((rowid, name))
+        return matches
+
+    def search_match(self, searched, name):
+        """
+            True if name is a result of search(searched)
+            @param searched as str
+            @param name as str
+            @return bool
+        """
+        searched = noaccents(searched).lower()
+        name = noaccents(name).lower()
+        if not self.__fts:
+            return searched in name
+        words = re.findall(r"\w+", name)
+        for prefix in re.findall(r"\w+", searched):
+            if not [word for word in words if word.startswith(prefix)]:
+                return False
+        return True
+
+    def get_artists_content(self, artist_ids):
+        """
+            Get albums and tracks for artists
+            @param artist_ids as [int]
+            @return (albums, track ids) as
+                    ([(album id as int, artist id as int)], [int]),
+                    albums in artist_ids order, track ids are tracks of
+                    artists outside their albums
+            @thread safe
+        """
+        albums = []
+        track_ids = []
+        with SqlCursor(self) as sql:
+            for (chunk, marks) in sql_chunks(artist_ids):
+                result = sql.execute("SELECT album_artists.album_id,\
+                                      album_artists.artist_id\
+                                      FROM album_artists, albums\
+                                      WHERE album_artists.artist_id IN (%s)\
+                                      AND albums.rowid=album_artists.album_id\
+                                      ORDER BY albums.sortkey" % marks, chunk)
+                albums += list(result)
+                result = sql.execute("SELECT tracks.rowid\
+                                      FROM tracks, track_artists\
+                                      WHERE track_artists.artist_id IN (%s)\
+                                      AND track_artists.track_id=tracks.rowid\
+                                      AND NOT EXISTS (\
+                                       SELECT artist_id\
+                                       FROM album_artists\
+                                       WHERE artist_id=track_artists.artist_id\
+                                       AND album_id=tracks.album_id)\
+                                      ORDER BY tracks.name" % marks, chunk)
+                track_ids += [row[0] for row in result]
+        order = {artist_id: i for (i, artist_id) in enumerate(artist_ids)}
+        albums.sort(key=lambda row: order[row[1]])
+        return (albums, track_ids)
+
     def del_non_persistent(self):
         """
             Delete non persistent tracks from db
         """
-        for track_id in Lp().tracks.get_non_persistent():
-            album_id = Lp().tracks.get_album_id(track_id)
-            genre_ids = Lp().tracks.get_genre_ids(track_id)
-            album_artist_ids = Lp().albums.get_artist_ids(album_id)
-            artist_ids = Lp().tracks.get_artist_ids(track_id)
-            Lp().tracks.remove(track_id)
-            Lp().tracks.clean(track_id)
-            Lp().albums.clean(album_id)
-            for artist_id in album_artist_ids + artist_ids:
-                Lp().artists.clean(artist_id)
-            for genre_id in genre_ids:
-                Lp().genres.clean(genre_id)
+        self.del_tracks(Lp().tracks.get_non_persistent())
         with SqlCursor(Lp().db) as sql:
             sql.commit()
 
 #######################
 # PRIVATE             #
 #######################
+    def __get_fts_query(self, searched):
+        """
+            Get FTS5 query matching all words of searched as prefixes
+            @param searched as str
+            @return str
+        """
+        return " ".join(['"%s"*' % word.replace('"', '""')
+                         for word in searched.split()])
@@ -18,7 +18,8 @@ import itertools
 
 from lollypop.sqlcursor import SqlCursor
 from lollypop.define import Lp, Type, OrderBy
-from lollypop.utils import remove_static_genres, noaccents
+from lollypop.utils import remove_static_genres, noaccents, sql_chunks
+from lollypop.utils import get_sortkey
 
 
 class AlbumsDatabase:
@@ -44,10 +45,10 @@ class AlbumsDatabase:
         """
         with SqlCursor(Lp().db) as sql:
             result = sql.execute("INSERT INTO albums\
-                                  (name, no_album_artist,\
+                                  (name, sortkey, no_album_artist,\
                                   path, popularity, mtime, synced)\
-                                  VALUES (?, ?, ?, ?, ?, ?)",
-                                 (name, artist_ids == [],
+                                  VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (name, get_sortkey(name), artist_ids == [],
                                   path, popularity, mtime, 0))
             for artist_id in artist_ids:
                 sql.execute("INSERT INTO album_artists\
@@ -83,6 +84,20 @@ class AlbumsDatabase:
                             "album_genres (album_id, genre_id)"
                             "VALUES (?, ?)", (album_id, genre_id))
 
+    def add_genres(self, rows):
+        """
+            Add genres to albums, existing ones are ignored
+            @param rows as [(album id as int, genre id as int)]
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.executemany("INSERT INTO "
+                            "album_genres (album_id, genre_id) "
+                            "SELECT ?, ? WHERE NOT EXISTS ("
+                            "SELECT 1 FROM album_genres "
+                            "WHERE album_id=? AND genre_id=?)",
+                            [(a, g, a, g) for (a, g) in rows])
+
     def del_genres(self, album_id):
         """
             Delete all genres for album
@@ -142,6 +157,21 @@ class AlbumsDatabase:
             sql.execute("UPDATE albums SET path=? WHERE rowid=?",
                         (path, album_id))
 
+    def rename_path(self, old_path, new_path):
+        """
+            Rename albums path, subdirectories included
+            @param old_path as str
+            @param new_path as str
+            @warning commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("UPDATE albums SET path=? WHERE path=?",
+                        (new_path, old_path))
+            prefix = old_path + "/"
+            sql.execute("UPDATE albums SET path=? || substr(path, ?)\
+                         WHERE substr(path, 1, ?)=?",
+                        (new_path, len(prefix), len(prefix), prefix))
+
     def set_popularity(self, album_id, popularity, commit=False):
         """
             Set popularity
@@ -269,6 +299,20 @@ class AlbumsDatabase:
                 return v[0]
             return None
 
+    def get_all(self):
+        """
+            Get all albums with their artists
+            @return [(album id as int, name as str, path as str,
+                      no album artist as bool, artist id as int/None)]
+        """
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute("SELECT albums.rowid, albums.name,\
+                                  albums.path, albums.no_album_artist,\
+                                  album_artists.artist_id\
+                                  FROM albums LEFT JOIN album_artists\
+                                  ON album_artists.album_id=albums.rowid")
+            return list(result)
+
     def get_compilation_id(self, album_name):
         """
             Get compilation id
@@ -328,6 +372,38 @@ class AlbumsDatabase:
 
             return _("Unknown")
 
+    def get_infos(self, album_ids):
+        """
+            Get fields for albums, path and duration excepted,
+            see objects.Album.FIELDS
+            @param album_ids as [int]
+            @return {album id as int: {field as str: value}}
+        """
+        infos = {}
+        with SqlCursor(Lp().db) as sql:
+            for (chunk, marks) in sql_chunks(set(album_ids)):
+                result = sql.execute("SELECT rowid, name, year\
+                                      FROM albums\
+                                      WHERE rowid IN (%s)" % marks, chunk)
+                for (album_id, name, year) in result:
+                    infos[album_id] = {'name': name,
+                                       'year': str(year) if year else "",
+                                       'artist_ids': [],
+                                       'artists': []}
+                result = sql.execute("SELECT album_artists.album_id,\
+                                      artists.rowid, artists.name\
+                                      FROM album_artists, artists\
+                                      WHERE album_artists.artist_id=\
+                                      artists.rowid\
+                                      AND album_artists.album_id IN (%s)\
+                                      ORDER BY album_artists.rowid" % marks,
+                                     chunk)
+                for (album_id, artist_id, artist) in result:
+                    if album_id in infos:
+                        infos[album_id]['artist_ids'].append(artist_id)
+                        infos[album_id]['artists'].append(artist)
+        return infos
+
     def get_artists(self, album_id):
         """
             Get artist names
@@ -452,20 +528,21 @@ class AlbumsDatabase:
             @param Array of genre ids
             @return Array of album ids as int
         """
-        albums = []
+        candidates = []
         # get popular first
         if Type.POPULARS in genre_ids:
-            albums += self.get_populars()
+            candidates += self.get_populars()
         # get recents next
         if Type.RECENTS in genre_ids:
-            recents = self.get_recents()
-            for recent in recents:
-                if recent not in albums:
-                    albums.append(recent)
+            candidates += self.get_recents()
         for genre_id in genre_ids:
-            for album in Lp().genres.get_albums(genre_id):
-                if album not in albums:
-                    albums.append(album)
+            candidates += Lp().genres.get_albums(genre_id)
+        albums = []
+        added = set()
+        for album in candidates:
+            if album not in added:
+                added.add(album)
+                albums.append(album)
         return albums
 
     def get_disc_names(self, album_id, disc):
@@ -641,22 +718,17 @@ class AlbumsDatabase:
         genre_ids = remove_static_genres(genre_ids)
         orderby = Lp().settings.get_enum('orderby')
         if orderby == OrderBy.ARTIST:
-            order = "ORDER BY artists.sortname\
-                     COLLATE NOCASE COLLATE LOCALIZED,\
+            order = "ORDER BY artists.sortkey,\
                      albums.year,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortkey"
         elif orderby == OrderBy.NAME:
-            order = "ORDER BY albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+            order = "ORDER BY albums.sortkey"
         elif orderby == OrderBy.YEAR:
             order = "ORDER BY albums.year,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortkey"
         else:
             order = "ORDER BY albums.popularity DESC,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortkey"
 
         with SqlCursor(Lp().db) as sql:
             result = []
@@ -784,14 +856,14 @@ class AlbumsDatabase:
         """
             Search for albums looking like string
             @param search as str
-            @return album ids as [int]
+            @return [(album id as int, album name as str)]
         """
         with SqlCursor(Lp().db) as sql:
-            result = sql.execute("SELECT albums.rowid\
+            result = sql.execute("SELECT albums.rowid, name\
                                   FROM albums\
                                   WHERE noaccents(name) LIKE ?\
                                   LIMIT 25", ('%' + noaccents(string) + '%',))
-            return list(itertools.chain(*result))
+            return list(result)
 
     def calculate_artist_ids(self, album_id):
         """
@@ -865,6 +937,53 @@ class AlbumsDatabase:
                 sql.execute("DELETE FROM albums WHERE rowid=?", (album_id,))
             return ret
 
+    def clean_ids(self, album_ids):
+        """
+            Clean database for album ids
+            @param album_ids as [int]
+            @return album ids deleted or with genres modified as [int]
+            @warning commit needed
+        """
+        modified = set()
+        with SqlCursor(Lp().db) as sql:
+            for (chunk, marks) in sql_chunks(album_ids):
+                # Genres without tracks in album
+                result = sql.execute("SELECT album_id, genre_id\
+                                      FROM album_genres\
+                                      WHERE album_id IN (%s)\
+                                      AND NOT EXISTS (\
+                                        SELECT 1 FROM tracks, track_genres\
+                                        WHERE track_genres.track_id=\
+                                        tracks.rowid\
+                                        AND tracks.album_id=\
+                                        album_genres.album_id\
+                                        AND track_genres.genre_id=\
+                                        album_genres.genre_id)" % marks,
+                                     chunk)
+                rows = list(result)
+                sql.executemany("DELETE FROM album_genres\
+                                 WHERE album_id=?\
+                                 AND genre_id=?", rows)
+                modified |= set([row[0] for row in rows])
+                # Orphaned albums
+                result = sql.execute("SELECT rowid FROM albums\
+                                      WHERE rowid IN (%s)\
+                                      AND NOT EXISTS (\
+                                        SELECT 1 FROM tracks\
+                                        WHERE tracks.album_id=albums.rowid)"
+                                     % marks, chunk)
+                orphans = list(itertools.chain(*result))
+                if orphans:
+                    orphan_marks = ",".join("?" * len(orphans))
+                    sql.execute("DELETE FROM album_artists\
+                                 WHERE album_id IN (%s)" % orphan_marks,
+                                orphans)
+                    sql.execute("DELETE FROM albums\
+                                 WHERE rowid IN (%s)" % orphan_marks,
+                                orphans)
+                    modified |= set(orphans)
+        return list(modified)
+
 #######################
 # PRIVATE             #
 #######################
@@ -15,7 +15,8 @@ import itertools
 
 from lollypop.sqlcursor import SqlCursor
 from lollypop.define import Lp, Type
-from lollypop.utils import format_artist_name, noaccents
+from lollypop.utils import format_artist_name, noaccents, sql_chunks
+from lollypop.utils import get_sortkey
 
 
 class ArtistsDatabase:
@@ -40,9 +41,10 @@ class ArtistsDatabase:
         if sortname == "":
             sortname = format_artist_name(name)
         with SqlCursor(Lp().db) as sql:
-            result = sql.execute("INSERT INTO artists (name, sortname)\
-                                  VALUES (?, ?)",
-                                 (name, sortname))
+            result = sql.execute("INSERT INTO artists\
+                                  (name, sortname, sortkey)\
+                                  VALUES (?, ?, ?)",
+                                 (name, sortname, get_sortkey(sortname)))
             return result.lastrowid
 
     def set_sortname(self, artist_id, sortname):
@@ -54,9 +56,9 @@ class ArtistsDatabase:
         """
         with SqlCursor(Lp().db) as sql:
             sql.execute("UPDATE artists\
-                         SET sortname=?\
+                         SET sortname=?, sortkey=?\
                          WHERE rowid=?",
-                        (sortname, artist_id))
+                        (sortname, get_sortkey(sortname), artist_id))
 
     def get_sortname(self, artist_id):
         """
@@ -86,6 +88,15 @@ class ArtistsDatabase:
                 return v[0]
             return None
 
+    def get_all(self):
+        """
+            Get all artists, even the ones without albums
+            @return [(artist id as int, name as str, sortname as str)]
+        """
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute("SELECT rowid, name, sortname FROM artists")
+            return list(result)
+
     def get_name(self, artist_id):
         """
             Get artist name
@@ -111,11 +122,10 @@ class ArtistsDatabase:
         with SqlCursor(Lp().db) as sql:
             request = "SELECT DISTINCT albums.rowid\
                        FROM album_artists, albums\
-                       WHERE albums.rowid=album_artists.album_id AND (1=0 "
-            for artist_id in artist_ids:
-                request += "OR album_artists.artist_id=%s " % artist_id
-            request += ") ORDER BY year"
-            result = sql.execute(request)
+                       WHERE albums.rowid=album_artists.album_id\
+                       AND album_artists.artist_id IN (%s)\
+                       ORDER BY year" % ",".join("?" * len(artist_ids))
+            result = sql.execute(request, list(artist_ids))
             return list(itertools.chain(*result))
 
     def get_compilations(self, artist_ids):
@@ -127,14 +137,13 @@ class ArtistsDatabase:
             request = "SELECT DISTINCT albums.rowid FROM albums,\
                        tracks, track_artists, album_artists\
                        WHERE track_artists.track_id=tracks.rowid\
-                       AND album_artists.artists_id=%s\
+                       AND album_artists.artist_id=?\
                        AND album_artists.album_id=albums.rowid\
-                       AND albums.rowid=tracks.album_id AND (1=0 " %\
-                       Type.COMPILATIONS
-            for artist_id in artist_ids:
-                request += "OR track_artists.artist_id=%s " % artist_id
-            request += ") ORDER BY albums.year"
-            result = sql.execute(request)
+                       AND albums.rowid=tracks.album_id\
+                       AND track_artists.artist_id IN (%s)\
+                       ORDER BY albums.year" % ",".join("?" * len(artist_ids))
+            result = sql.execute(request,
+                                 [Type.COMPILATIONS] + list(artist_ids))
             return list(itertools.chain(*result))
 
     def get(self, genre_ids):
@@ -153,8 +162,7 @@ class ArtistsDatabase:
                                   FROM artists, albums, album_artists\
                                   WHERE album_artists.artist_id=artists.rowid\
                                   AND album_artists.album_id=albums.rowid\
-                                  ORDER BY artists.sortname\
-                                  COLLATE NOCASE COLLATE LOCALIZED")
+                                  ORDER BY artists.sortkey")
             else:
                 genres = tuple(genre_ids)
                 request = "SELECT DISTINCT artists.rowid,\
@@ -165,8 +173,7 @@ class ArtistsDatabase:
                            AND album_genres.album_id=albums.rowid AND ("
                 for genre_id in genre_ids:
                     request += "album_genres.genre_id=? OR "
-                request += "1=0) ORDER BY artists.sortname\
-                            COLLATE NOCASE COLLATE LOCALIZED"
+                request += "1=0) ORDER BY artists.sortkey"
                 result = sql.execute(request, genres)
             return [(row[0], row[1]) for row in result]
 
@@ -187,13 +194,13 @@ class ArtistsDatabase:
         """
             Search for artists looking like string
             @param string
-            @return Array of id as int
+            @return [(artist id as int, artist name as str)]
         """
         with SqlCursor(Lp().db) as sql:
-            result = sql.execute("SELECT rowid FROM artists\
+            result = sql.execute("SELECT rowid, name FROM artists\
                                   WHERE noaccents(name) LIKE ?\
                                   LIMIT 25", ('%' + noaccents(string) + '%',))
-            return list(itertools.chain(*result))
+            return list(result)
 
     def count(self):
         """
@@ -232,3 +239,30 @@ class ArtistsDatabase:
                     sql.execute("DELETE FROM artists WHERE rowid=?",
                                 (artist_id,))
         return ret
+
+    def clean_ids(self, artist_ids):
+        """
+            Clean database for artist ids
+            @param artist_ids as [int]
+            @return deleted artist ids as [int]
+            @warning commit needed
+        """
+        removed = []
+        with SqlCursor(Lp().db) as sql:
+            for (chunk, marks) in sql_chunks(artist_ids):
+                result = sql.execute("SELECT rowid FROM artists\
+                                      WHERE rowid IN (%s)\
+                                      AND NOT EXISTS (\
+                                        SELECT 1 FROM album_artists\
+                                        WHERE album_artists.artist_id=\
+                                        artists.rowid)\
+                                      AND NOT EXISTS (\
+                                        SELECT 1 FROM track_artists\
+                                        WHERE track_artists.artist_id=\
+                                        artists.rowid)" % marks, chunk)
+                orphans = list(itertools.chain(*result))
+                if orphans:
+                    sql.execute("DELETE FROM artists WHERE rowid IN (%s)"
+                                % ",".join("?" * len(orphans)), orphans)
+                    removed += orphans
+        return removed
@@ -0,0 +1,73 @@
+# Copyright (c) 2014-2016 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from lollypop.sqlcursor import SqlCursor
+from lollypop.define import Lp
+
+
+class DirsDatabase:
+    """
+        Scanned directories database helper
+    """
+
+    def __init__(self):
+        """
+            Init dirs database object
+        """
+        pass
+
+    def get(self):
+        """
+            Get directories state at last successful scan
+            @return {path as str: (mtime as int, count as int)}
+        """
+        with SqlCursor(Lp().db) as sql:
+            dirs = {}
+            result = sql.execute("SELECT path, mtime, count FROM dirs")
+            for (path, mtime, count) in result:
+                dirs[path] = (mtime, count)
+            return dirs
+
+    def set(self, dirs, paths=None):
+        """
+            Replace directories state
+            @param dirs as [(path as str, mtime as int, count as int)]
+            @param paths as [str], only replace state for these
+                   directories and their subdirectories, all if None
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            if paths is None:
+                sql.execute("DELETE FROM dirs")
+            else:
+                for path in paths:
+                    prefix = path + "/"
+                    sql.execute("DELETE FROM dirs\
+                                 WHERE path=? OR substr(path, 1, ?)=?",
+                                (path, len(prefix), prefix))
+            sql.executemany("INSERT OR REPLACE INTO dirs (path, mtime, count)\
+                             VALUES (?, ?, ?)", dirs)
+
+    def rename(self, old_path, new_path):
+        """
+            Rename directory, subdirectories included
+            @param old_path as str
+            @param new_path as str
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("UPDATE dirs SET path=? WHERE path=?",
+                        (new_path, old_path))
+            prefix = old_path + "/"
+            sql.execute("UPDATE dirs SET path=? || substr(path, ?)\
+                         WHERE substr(path, 1, ?)=?",
+                        (new_path, len(prefix), len(prefix), prefix))
@@ -15,6 +15,7 @@ import itertools
 
 from lollypop.sqlcursor import SqlCursor
 from lollypop.define import Lp
+from lollypop.utils import sql_chunks, get_sortkey
 
 
 class GenresDatabase:
@@ -36,8 +37,9 @@ class GenresDatabase:
             @warning: commit needed
         """
         with SqlCursor(Lp().db) as sql:
-            result = sql.execute("INSERT INTO genres (name) VALUES (?)",
-                                 (name,))
+            result = sql.execute("INSERT INTO genres (name, sortkey)\
+                                  VALUES (?, ?)",
+                                 (name, get_sortkey(name)))
             return result.lastrowid
 
     def get_id(self, name):
@@ -76,8 +78,7 @@ class GenresDatabase:
         with SqlCursor(Lp().db) as sql:
             result = sql.execute("SELECT name\
                                  FROM genres\
-                                 ORDER BY name\
-                                 COLLATE NOCASE COLLATE LOCALIZED")
+                                 ORDER BY sortkey")
             return list(itertools.chain(*result))
 
     def get_albums(self, genre_id):
@@ -100,8 +101,7 @@ class GenresDatabase:
         """
         with SqlCursor(Lp().db) as sql:
             result = sql.execute("SELECT rowid, name FROM genres\
-                                  ORDER BY name\
-                                  COLLATE NOCASE COLLATE LOCALIZED")
+                                  ORDER BY sortkey")
             return list(result)
 
     def get_ids(self):
@@ -111,8 +111,7 @@ class GenresDatabase:
         """
         with SqlCursor(Lp().db) as sql:
             result = sql.execute("SELECT rowid FROM genres\
-                                  ORDER BY name\
-                                  COLLATE NOCASE COLLATE LOCALIZED")
+                                  ORDER BY sortkey")
             return list(itertools.chain(*result))
 
     def clean(self, genre_id):
@@ -133,3 +132,26 @@ class GenresDatabase:
                 sql.execute("DELETE FROM genres\
                             WHERE rowid=?", (genre_id,))
         return ret
+
+    def clean_ids(self, genre_ids):
+        """
+            Clean database for genre ids
+            @param genre_ids as [int]
+            @return deleted genre ids as [int]
+            @warning commit needed
+        """
+        removed = []
+        with SqlCursor(Lp().db) as sql:
+            for (chunk, marks) in sql_chunks(genre_ids):
+                result = sql.execute("SELECT rowid FROM genres\
+                                      WHERE rowid IN (%s)\
+                                      AND NOT EXISTS (\
+                                        SELECT 1 FROM track_genres\
+                                        WHERE track_genres.genre_id=\
+                                        genres.rowid)" % marks, chunk)
+                orphans = list(itertools.chain(*result))
+                if orphans:
+                    sql.execute("DELETE FROM genres WHERE rowid IN (%s)"
+                                % ",".join("?" * len(orphans)), orphans)
+                    removed += orphans
+        return removed
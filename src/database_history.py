@@ -12,7 +12,6 @@
 
 
 import os
-import sqlite3
 
 from lollypop.sqlcursor import SqlCursor
 
@@ -33,6 +32,8 @@ class History:
                             popularity INT NOT NULL,
                             mtime INT NOT NULL,
                             album_popularity INT NOT NULL)'''
+    __create_history_idx = '''CREATE INDEX IF NOT EXISTS idx_hnd
+                              ON history(name, duration)'''
 
     def __init__(self):
         """
@@ -45,6 +46,12 @@ class History:
                 sql.commit()
         except:
             pass
+        try:
+            with SqlCursor(self) as sql:
+                sql.execute(self.__create_history_idx)
+                sql.commit()
+        except Exception as e:
+            print("History::__init__():", e)
         with SqlCursor(self) as sql:
             result = sql.execute("SELECT COUNT(*)\
                                   FROM history")
@@ -85,6 +92,31 @@ class History:
                              ltime, mtime, album_popularity))
             sql.commit()
 
+    def add_many(self, rows):
+        """
+            Add stats for many tracks, update existing entries
+            @param rows as [(name as str, duration as int, popularity as int,
+                             ltime as int, mtime as int,
+                             album_popularity as int)]
+            @thread safe
+        """
+        with SqlCursor(self) as sql:
+            sql.executemany("UPDATE history\
+                             SET popularity=?,ltime=?,\
+                             mtime=?,album_popularity=?\
+                             WHERE name=? AND duration=?",
+                            [(p, l, m, a, n, d) for (n, d, p, l, m, a)
+                             in rows])
+            sql.executemany("INSERT INTO history\
+                             (name, duration, popularity, ltime,\
+                              mtime, album_popularity)\
+                             SELECT ?, ?, ?, ?, ?, ?\
+                             WHERE NOT EXISTS (\
+                                SELECT 1 FROM history\
+                                WHERE name=? AND duration=?)",
+                            [row + row[:2] for row in rows])
+            sql.commit()
+
     def get(self, name, duration):
         """
             Get stats for track with filename and duration
@@ -126,10 +158,10 @@ class History:
 
     def get_cursor(self):
         """
-            Return a new sqlite cursor
+            Return a new sqlite connection, kept open by SqlCursor
         """
         try:
-            return sqlite3.connect(self.__DB_PATH, 600.0)
+            return SqlCursor.connect(self.__DB_PATH)
         except:
             exit(-1)
 
@@ -0,0 +1,109 @@
+# Copyright (c) 2014-2016 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from time import time
+
+from lollypop.sqlcursor import SqlCursor
+
+
+class LookupsDatabase:
+    """
+        Web services lookup outcomes, survives collection db reset
+        Outcomes are kept in memory, a miss is valid until ttl expires
+    """
+    __LOCAL_PATH = os.path.expanduser("~") + "/.local/share/lollypop"
+    __DB_PATH = "%s/lookups.db" % __LOCAL_PATH
+    __VERSION = 1
+    __create_lookups = '''CREATE TABLE lookups (
+                            artist TEXT NOT NULL,
+                            album TEXT NOT NULL,
+                            service TEXT NOT NULL,
+                            found INT NOT NULL,
+                            mtime INT NOT NULL,
+                            PRIMARY KEY (artist, album, service))
+                          WITHOUT ROWID'''
+
+    def __init__(self, ttl):
+        """
+            Init lookups, expired outcomes are dropped
+            @param ttl as int (seconds)
+        """
+        self.__ttl = ttl
+        # (artist, album, service) -> (found, mtime)
+        self.__outcomes = {}
+        try:
+            if not os.path.exists(self.__LOCAL_PATH):
+                os.makedirs(self.__LOCAL_PATH)
+            with SqlCursor(self) as sql:
+                result = sql.execute("PRAGMA user_version")
+                v = result.fetchone()
+                if v is not None and v[0] != self.__VERSION:
+                    sql.execute("DROP TABLE IF EXISTS lookups")
+                    sql.execute(self.__create_lookups)
+                    sql.execute("PRAGMA user_version=%s" % self.__VERSION)
+                sql.execute("DELETE FROM lookups\
+                             WHERE found=0 AND mtime<?",
+                            (int(time()) - ttl,))
+                sql.commit()
+                result = sql.execute("SELECT artist, album, service,\
+                                      found, mtime\
+                                      FROM lookups")
+                for (artist, album, service, found, mtime) in result:
+                    self.__outcomes[(artist, album, service)] = (found,
+                                                                 mtime)
+        except Exception as e:
+            print("LookupsDatabase::__init__():", e)
+
+    def is_missed(self, artist, album, service):
+        """
+            True if service had nothing for artist/album, ttl not expired
+            @param artist as str
+            @param album as str, "" for artist lookups
+            @param service as str
+            @return bool
+        """
+        outcome = self.__outcomes.get((artist, album, service))
+        if outcome is None:
+            return False
+        (found, mtime) = outcome
+        return not found and mtime + self.__ttl > time()
+
+    def set(self, artist, album, service, found):
+        """
+            Save lookup outcome
+            @param artist as str
+            @param album as str, "" for artist lookups
+            @param service as str
+            @param found as bool
+            @thread safe
+        """
+        mtime = int(time())
+        self.__outcomes[(artist, album, service)] = (found, mtime)
+        try:
+            with SqlCursor(self) as sql:
+                sql.execute("INSERT OR REPLACE INTO lookups\
+                             (artist, album, service, found, mtime)\
+                             VALUES (?, ?, ?, ?, ?)",
+                            (artist, album, service, found, mtime))
+                sql.commit()
+        except Exception as e:
+            print("LookupsDatabase::set():", e)
+
+    def get_cursor(self):
+        """
+            Return a new sqlite connection, kept open by SqlCursor
+        """
+        try:
+            return SqlCursor.connect(self.__DB_PATH)
+        except:
+            exit(-1)
@@ -0,0 +1,137 @@
+# Copyright (c) 2014-2016 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import pickle
+import sqlite3
+
+from lollypop.sqlcursor import SqlCursor
+from lollypop.utils import sql_chunks
+
+
+class TagsDatabase:
+    """
+        Parsed tags cache, survives collection db reset
+    """
+    __LOCAL_PATH = os.path.expanduser("~") + "/.local/share/lollypop"
+    __DB_PATH = "%s/tags.db" % __LOCAL_PATH
+    # Bump when TagReader.parse_info() result changes
+    __VERSION = 1
+    __create_tags = '''CREATE TABLE tags (
+                            path TEXT PRIMARY KEY,
+                            size INT NOT NULL,
+                            mtime INT NOT NULL,
+                            data BLOB NOT NULL)'''
+
+    def __init__(self):
+        """
+            Init tags cache
+        """
+        try:
+            if not os.path.exists(self.__LOCAL_PATH):
+                os.makedirs(self.__LOCAL_PATH)
+            with SqlCursor(self) as sql:
+                result = sql.execute("PRAGMA user_version")
+                v = result.fetchone()
+                if v is not None and v[0] != self.__VERSION:
+                    sql.execute("DROP TABLE IF EXISTS tags")
+                    sql.execute(self.__create_tags)
+                    sql.execute("PRAGMA user_version=%s" % self.__VERSION)
+                    sql.commit()
+        except Exception as e:
+            print("TagsDatabase::__init__():", e)
+
+    def get(self, path, size, mtime):
+        """
+            Get cached tags for file
+            @param path as str
+            @param size as int
+            @param mtime as int (ns)
+            @return TagReader.parse_info() tuple or None
+        """
+        try:
+            with SqlCursor(self) as sql:
+                result = sql.execute("SELECT data FROM tags\
+                                      WHERE path=? AND size=? AND mtime=?",
+                                     (path, size, mtime))
+                v = result.fetchone()
+                if v is not None:
+                    return pickle.loads(v[0])
+        except Exception as e:
+            print("TagsDatabase::get():", e)
+        return None
+
+    def set(self, rows):
+        """
+            Cache tags for files
+            @param rows as [(path as str, size as int, mtime as int (ns),
+                             TagReader.parse_info() tuple)]
+            @thread safe
+        """
+        try:
+            with SqlCursor(self) as sql:
+                sql.executemany("INSERT OR REPLACE INTO tags\
+                                 (path, size, mtime, data)\
+                                 VALUES (?, ?, ?, ?)",
+                                [(path, size, mtime,
+                                  sqlite3.Binary(pickle.dumps(
+                                     tags, pickle.HIGHEST_PROTOCOL)))
+                                 for (path, size, mtime, tags) in rows])
+                sql.commit()
+        except Exception as e:
+            print("TagsDatabase::set():", e)
+
+    def remove(self, paths):
+        """
+            Remove files from cache
+            @param paths as [str]
+            @thread safe
+        """
+        try:
+            with SqlCursor(self) as sql:
+                for (chunk, marks) in sql_chunks(paths):
+                    sql.execute("DELETE FROM tags\
+                                 WHERE path IN (%s)" % marks, chunk)
+                sql.commit()
+        except Exception as e:
+            print("TagsDatabase::remove():", e)
+
+    def rename(self, old_path, new_path):
+        """
+            Rename file, or files in directory
+            @param old_path as str
+            @param new_path as str
+            @thread safe
+        """
+        try:
+            with SqlCursor(self) as sql:
+                sql.execute("DELETE FROM tags WHERE path=?", (new_path,))
+                sql.execute("UPDATE tags SET path=? WHERE path=?",
+                            (new_path, old_path))
+                prefix = old_path + "/"
+                sql.execute("UPDATE OR REPLACE tags\
+                             SET path=? || substr(path, ?)\
+                             WHERE substr(path, 1, ?)=?",
+                            (new_path, len(prefix), len(prefix), prefix))
+                sql.commit()
+        except Exception as e:
+            print("TagsDatabase::rename():", e)
+
+    def get_cursor(self):
+        """
+            Return a new sqlite connection, kept open by SqlCursor
+        """
+        try:
+            return SqlCursor.connect(self.__DB_PATH)
+        except:
+            exit(-1)
@@ -16,7 +16,7 @@ import itertools
 
 from lollypop.sqlcursor import SqlCursor
 from lollypop.define import Lp
-from lollypop.utils import noaccents
+from lollypop.utils import noaccents, sql_chunks
 
 
 class TracksDatabase:
@@ -98,6 +98,28 @@ class TracksDatabase:
                             "track_genres (track_id, genre_id)"
                             "VALUES (?, ?)", (track_id, genre_id))
 
+    def add_artists(self, rows):
+        """
+            Add artists to tracks
+            @param rows as [(track id as int, artist id as int)]
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.executemany("INSERT INTO "
+                            "track_artists (track_id, artist_id)"
+                            "VALUES (?, ?)", rows)
+
+    def add_genres(self, rows):
+        """
+            Add genres to tracks
+            @param rows as [(track id as int, genre id as int)]
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.executemany("INSERT INTO "
+                            "track_genres (track_id, genre_id)"
+                            "VALUES (?, ?)", rows)
+
     def del_genres(self, track_id):
         """
             Delete all genres for track
@@ -144,6 +166,35 @@ class TracksDatabase:
                 return v[0]
             return None
 
+    def get_ids_for_uris(self, uris):
+        """
+            Get track ids for uris
+            @param uris as [str]
+            @return [int]
+        """
+        track_ids = []
+        with SqlCursor(Lp().db) as sql:
+            for (chunk, marks) in sql_chunks(uris):
+                result = sql.execute("SELECT rowid FROM tracks\
+                                      WHERE uri IN (%s)" % marks, chunk)
+                track_ids += list(itertools.chain(*result))
+        return track_ids
+
+    def rename(self, old_uri, new_uri):
+        """
+            Rename track uri, or uris for tracks in directory
+            @param old_uri as str
+            @param new_uri as str
+            @warning commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("UPDATE tracks SET uri=? WHERE uri=?",
+                        (new_uri, old_uri))
+            prefix = old_uri + "/"
+            sql.execute("UPDATE tracks SET uri=? || substr(uri, ?)\
+                         WHERE substr(uri, 1, ?)=?",
+                        (new_uri, len(prefix), len(prefix), prefix))
+
     def get_id_by(self, name, album_id):
         """
             Return track id for uri
@@ -175,6 +226,96 @@ class TracksDatabase:
                 return v[0]
             return ""
 
+    def get_infos(self, track_ids):
+        """
+            Get fields for tracks, see objects.Track.FIELDS
+            @param track_ids as [int]
+            @return {track id as int: {field as str: value}}
+        """
+        infos = {}
+        album_ids = set()
+        with SqlCursor(Lp().db) as sql:
+            for (chunk, marks) in sql_chunks(set(track_ids)):
+                result = sql.execute("SELECT tracks.rowid, tracks.name,\
+                                      tracks.uri, tracks.album_id,\
+                                      albums.name, tracks.duration,\
+                                      tracks.tracknumber, tracks.year,\
+                                      tracks.persistent, tracks.mtime\
+                                      FROM tracks LEFT JOIN albums\
+                                      ON albums.rowid=tracks.album_id\
+                                      WHERE tracks.rowid IN (%s)" % marks,
+                                     chunk)
+                for (track_id, name, uri, album_id, album_name, duration,
+                     number, year, persistent, mtime) in result:
+                    album_ids.add(album_id)
+                    infos[track_id] = {
+                        'name': name,
+                        'uri': uri,
+                        'album_id': album_id,
+                        'album_name': album_name or _("Unknown"),
+                        'duration': duration,
+                        'number': number,
+                        'position': number or 0,
+                        'year': str(year) if year else "",
+                        'persistent': persistent,
+                        'mtime': mtime,
+                        'artist_ids': [],
+                        'artists': [],
+                        'genre_ids': [],
+                        'album_artist_ids': [],
+                        'album_artists': []}
+                result = sql.execute("SELECT track_artists.track_id,\
+                                      artists.rowid, artists.name\
+                                      FROM track_artists, artists\
+                                      WHERE track_artists.artist_id=\
+                                      artists.rowid\
+                                      AND track_artists.track_id IN (%s)\
+                                      ORDER BY track_artists.rowid" % marks,
+                                     chunk)
+                for (track_id, artist_id, artist) in result:
+                    infos[track_id]['artist_ids'].append(artist_id)
+                    infos[track_id]['artists'].append(artist)
+                result = sql.execute("SELECT track_id, genre_id\
+                                      FROM track_genres\
+                                      WHERE track_id IN (%s)\
+                                      ORDER BY rowid" % marks, chunk)
+                for (track_id, genre_id) in result:
+                    infos[track_id]['genre_ids'].append(genre_id)
+            # Album artists, shared by album tracks
+            album_artists = {}
+            for (chunk, marks) in sql_chunks(album_ids):
+                result = sql.execute("SELECT album_artists.album_id,\
+                                      artists.rowid, artists.name\
+                                      FROM album_artists, artists\
+                                      WHERE album_artists.artist_id=\
+                                      artists.rowid\
+                                      AND album_artists.album_id IN (%s)\
+                                      ORDER BY album_artists.rowid" % marks,
+                                     chunk)
+                for (album_id, artist_id, artist) in result:
+                    album_artists.setdefault(album_id, []).append((artist_id,
+                                                                   artist))
+        for info in infos.values():
+            for (artist_id, artist) in album_artists.get(info['album_id'],
+                                                         []):
+                info['album_artist_ids'].append(artist_id)
+                info['album_artists'].append(artist)
+        return infos
+
+    def get_album_artist_ids(self, track_id):
+        """
+            Get album artist ids for track
+            @param track id as int
+            @return artist ids as [int]
+        """
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute("SELECT album_artists.artist_id\
+                                  FROM tracks, album_artists\
+                                  WHERE tracks.rowid=?\
+                                  AND album_artists.album_id=\
+                                  tracks.album_id", (track_id,))
+            return list(itertools.chain(*result))
+
     def get_year(self, track_id):
         """
             Get track year
@@ -474,8 +615,8 @@ class TracksDatabase:
             @return int
         """
         with SqlCursor(Lp().db) as sql:
-            result = sql.execute("SELECT rowid FROM tracks\
-                                  WHERE persistent=?", (track_id,))
+            result = sql.execute("SELECT persistent FROM tracks\
+                                  WHERE rowid=?", (track_id,))
             v = result.fetchone()
             if v is not None:
                 return v[0]
@@ -607,6 +748,65 @@ class TracksDatabase:
             sql.execute("DELETE FROM track_genres\
                          WHERE track_id = ?", (track_id,))
 
+    def get_stats(self, track_ids):
+        """
+            Get stats for tracks, as saved in history
+            @param track_ids as [int]
+            @return [(uri as str, duration as int, popularity as int,
+                      ltime as int, album mtime as int,
+                      album popularity as int)]
+        """
+        stats = []
+        with SqlCursor(Lp().db) as sql:
+            for (chunk, marks) in sql_chunks(track_ids):
+                result = sql.execute("SELECT tracks.uri, tracks.duration,\
+                                      tracks.popularity, tracks.ltime,\
+                                      albums.mtime, albums.popularity\
+                                      FROM tracks, albums\
+                                      WHERE albums.rowid=tracks.album_id\
+                                      AND tracks.rowid IN (%s)" % marks,
+                                     chunk)
+                stats += list(result)
+        return stats
+
+    def get_relations(self, track_ids):
+        """
+            Get albums, artists and genres for tracks
+            @param track_ids as [int]
+            @return (album ids, artists, genre ids) as
+                    (set(int), {artist id as int: album id as int}, set(int))
+        """
+        album_ids = set()
+        artists = {}
+        genre_ids = set()
+        with SqlCursor(Lp().db) as sql:
+            for (chunk, marks) in sql_chunks(track_ids):
+                result = sql.execute("SELECT DISTINCT album_id\
+                                      FROM tracks\
+                                      WHERE rowid IN (%s)" % marks, chunk)
+                album_ids |= set(itertools.chain(*result))
+                result = sql.execute("SELECT DISTINCT\
+                                      track_artists.artist_id,\
+                                      tracks.album_id\
+                                      FROM tracks, track_artists\
+                                      WHERE track_artists.track_id=\
+                                      tracks.rowid\
+                                      AND tracks.rowid IN (%s)" % marks,
+                                     chunk)
+                for (artist_id, album_id) in result:
+                    artists.setdefault(artist_id, album_id)
+                result = sql.execute("SELECT DISTINCT genre_id\
+                                      FROM track_genres\
+                                      WHERE track_id IN (%s)" % marks, chunk)
+                genre_ids |= set(itertools.chain(*result))
+            for (chunk, marks) in sql_chunks(album_ids):
+                result = sql.execute("SELECT DISTINCT artist_id, album_id\
+                                      FROM album_artists\
+                                      WHERE album_id IN (%s)" % marks, chunk)
+                for (artist_id, album_id) in result:
+                    artists.setdefault(artist_id, album_id)
+        return (album_ids, artists, genre_ids)
+
     def search(self, searched):
         """
             Search for tracks looking like searched
@@ -652,3 +852,18 @@ class TracksDatabase:
                          WHERE track_id=?", (track_id,))
             sql.execute("DELETE FROM tracks\
                          WHERE rowid=?", (track_id,))
+
+    def remove_ids(self, track_ids):
+        """
+            Remove tracks
+            @param track_ids as [int]
+            @warning commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            for (chunk, marks) in sql_chunks(track_ids):
+                sql.execute("DELETE FROM track_genres\
+                             WHERE track_id IN (%s)" % marks, chunk)
+                sql.execute("DELETE FROM track_artists\
+                             WHERE track_id IN (%s)" % marks, chunk)
+                sql.execute("DELETE FROM tracks\
+                             WHERE rowid IN (%s)" % marks, chunk)
@@ -14,7 +14,6 @@ from gi.repository import GLib
 
 import itertools
 import os
-import sqlite3
 
 from lollypop.sqlcursor import SqlCursor
 from lollypop.utils import translate_artist_name
@@ -26,10 +25,10 @@ class DumbPlaylists:
 
     def get_cursor(self):
         """
-            Return a new sqlite cursor
+            Return a new sqlite connection, kept open by SqlCursor
         """
         try:
-            sql = sqlite3.connect(self.__DB_PATH, 600.0)
+            sql = SqlCursor.connect(self.__DB_PATH)
             return sql
         except Exception as e:
             exit(-1)
@@ -63,7 +62,14 @@ class DatabaseUpgrade:
             10: "UPDATE tracks set ltime=0 where ltime is null",
             11: "ALTER TABLE albums ADD synced INT NOT NULL DEFAULT 0",
             12: "ALTER TABLE tracks ADD persistent INT NOT NULL DEFAULT 1",
-            13: self.__upgrade_13
+            13: self.__upgrade_13,
+            14: "CREATE TABLE dirs (path TEXT PRIMARY KEY,\
+                                    mtime INT NOT NULL,\
+                                    count INT NOT NULL)",
+            15: self.__upgrade_15,
+            16: self._db.create_fts,
+            17: "CREATE index idx_tu ON tracks(uri)",
+            18: self._db.create_indexes
                          }
 
     """
@@ -222,3 +228,17 @@ class DatabaseUpgrade:
                     sql.execute("UPDATE tracks set uri=? WHERE uri=?",
                                 (uri, path))
             sql.commit()
+
+    def __upgrade_15(self):
+        """
+            Add locale sort keys, filled by Database.update_sortkeys()
+        """
+        with SqlCursor(self._db) as sql:
+            for (table, index) in [("albums", "idx_als"),
+                                   ("artists", "idx_ars"),
+                                   ("genres", "idx_gs")]:
+                sql.execute("ALTER TABLE %s ADD\
+                             sortkey BLOB NOT NULL DEFAULT x''" % table)
+                sql.execute("CREATE index %s ON %s(sortkey)" %
+                            (index, table))
+            sql.commit()
@@ -0,0 +1,122 @@
+# Copyright (c) 2014-2016 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from threading import Thread, Lock
+from time import monotonic, sleep
+import heapq
+
+
+class DownloadQueue:
+    """
+        Bounded pool of download workers
+        Tasks run by priority, a task already queued is not queued again.
+        Requests to a web service are spaced and backed off on errors
+    """
+    __WORKERS = 6
+    # Minimal delay between two requests to a service, in seconds
+    __DELAYS = {"lastfm": 0.2, "itunes": 3.0}
+    __DEFAULT_DELAY = 0.1
+    # Backoff after errors, in seconds
+    __BACKOFF_MIN = 1.0
+    __BACKOFF_MAX = 300.0
+
+    def __init__(self):
+        """
+            Init queue
+        """
+        self.__lock = Lock()
+        # Heap of (priority, order, key, callback, args)
+        self.__tasks = []
+        # Keys queued or running
+        self.__keys = set()
+        self.__order = 0
+        self.__workers = 0
+        # Service -> next request time
+        self.__next = {}
+        # Service -> current backoff
+        self.__backoff = {}
+
+    def add(self, key, callback, args, priority, lifo=False):
+        """
+            Queue a task
+            @param key as hashable, task is dropped if key is already queued
+            @param callback as function
+            @param args as tuple
+            @param priority as int, lower runs first
+            @param lifo as bool, run after tasks with same priority if False
+        """
+        with self.__lock:
+            if key in self.__keys:
+                return
+            self.__keys.add(key)
+            self.__order += 1
+            order = -self.__order if lifo else self.__order
+            heapq.heappush(self.__tasks, (priority, order, key,
+                                          callback, args))
+            if self.__workers < self.__WORKERS:
+                self.__workers += 1
+                t = Thread(target=self.__run)
+                t.daemon = True
+                t.start()
+
+    def wait(self, service):
+        """
+            Wait until service can be requested
+            @param service as str
+        """
+        with self.__lock:
+            now = monotonic()
+            at = max(now, self.__next.get(service, 0))
+            self.__next[service] = at +\
+                self.__DELAYS.get(service, self.__DEFAULT_DELAY) +\
+                self.__backoff.get(service, 0)
+        if at > now:
+            sleep(at - now)
+
+    def failed(self, service):
+        """
+            Back off service after an error
+            @param service as str
+        """
+        with self.__lock:
+            backoff = self.__backoff.get(service, 0) * 2
+            self.__backoff[service] = min(max(backoff, self.__BACKOFF_MIN),
+                                          self.__BACKOFF_MAX)
+
+    def succeeded(self, service):
+        """
+            Reset service backoff
+            @param service as str
+        """
+        with self.__lock:
+            self.__backoff.pop(service, None)
+
+#######################
+# PRIVATE             #
+#######################
+    def __run(self):
+        """
+            Run tasks until queue is empty
+        """
+        while True:
+            with self.__lock:
+                if not self.__tasks:
+                    self.__workers -= 1
+                    return
+                (priority, order, key, callback, args) = heapq.heappop(
+                                                                self.__tasks)
+            try:
+                callback(*args)
+            except Exception as e:
+                print("DownloadQueue::__run():", key, e)
+            with self.__lock:
+                self.__keys.discard(key)
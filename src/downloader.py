@@ -16,7 +16,9 @@ from threading import Thread
 import json
 
 from lollypop.cache import InfoCache
+from lollypop.database_lookups import LookupsDatabase
 from lollypop.define import Lp, GOOGLE_API_ID
+from lollypop.download_queue import DownloadQueue
 from lollypop.utils import debug
 
 
@@ -28,29 +30,43 @@ class Downloader:
         from lollypop.wikipedia import Wikipedia
     except:
         Wikipedia = None
+    # Albums artwork is requested by visible widgets
+    __PRIORITY_ALBUM = 0
+    __PRIORITY_ARTIST = 1
+    # Errors meaning service did not answer, others are HTTP errors
+    __NETWORK_ERRORS = [Gio.IOErrorEnum.HOST_NOT_FOUND,
+                        Gio.IOErrorEnum.HOST_UNREACHABLE,
+                        Gio.IOErrorEnum.NETWORK_UNREACHABLE,
+                        Gio.IOErrorEnum.CONNECTION_REFUSED,
+                        Gio.IOErrorEnum.TIMED_OUT,
+                        Gio.IOErrorEnum.NOT_CONNECTED,
+                        Gio.IOErrorEnum.BROKEN_PIPE,
+                        Gio.IOErrorEnum.PROXY_FAILED,
+                        Gio.IOErrorEnum.PROXY_AUTH_FAILED,
+                        Gio.IOErrorEnum.PROXY_NEED_AUTH,
+                        Gio.IOErrorEnum.PROXY_NOT_ALLOWED]
 
     def __init__(self):
         """
             Init art downloader
         """
-        self.__albums_queue = []
-        self.__albums_history = []
-        self.__in_albums_download = False
+        self.__queue = DownloadQueue()
+        self.__lookups = LookupsDatabase(
+            Lp().settings.get_value('lookups-ttl').get_int32() * 86400)
+        # Albums already looked up in this session
+        self.__albums_history = set()
         self.__cache_artists_running = False
 
     def cache_album_art(self, album_id):
         """
-            Download album artwork
+            Download album artwork, last requested first
             @param album id as int
         """
         if album_id in self.__albums_history:
             return
         if Gio.NetworkMonitor.get_default().get_network_available():
-            self.__albums_queue.append(album_id)
-            if not self.__in_albums_download:
-                t = Thread(target=self.__cache_albums_art)
-                t.daemon = True
-                t.start()
+            self.__queue.add(("album", album_id), self.__cache_album_art,
+                             (album_id,), self.__PRIORITY_ALBUM, True)
 
     def cache_artists_info(self):
         """
@@ -107,6 +123,29 @@ class Downloader:
 #######################
 # PROTECTED           #
 #######################
+    def _load_uri(self, uri, service):
+        """
+            Load uri content, requests to service are rate limited
+            @param uri as str
+            @param service as str
+            @return data as bytes/None, None if service answered an error
+            @raise GLib.Error if service did not answer
+        """
+        self.__queue.wait(service)
+        try:
+            (status, data, tag) = Gio.File.new_for_uri(uri).load_contents(
+                                                                         None)
+        except GLib.Error as e:
+            if self.__is_network_error(e):
+                self.__queue.failed(service)
+                raise
+            # Service answered with an error status, like 404
+            debug("Downloader::_load_uri(): %s, %s" % (e, uri))
+            status = False
+            data = None
+        self.__queue.succeeded(service)
+        return data if status else None
+
     def _get_lastfm_artist_info(self, artist):
         """
             Return lastfm artist information
@@ -114,6 +153,7 @@ class Downloader:
             @return (url as str/None, content as str)
         """
         if Lp().lastfm is not None:
+            self.__queue.wait("lastfm")
             return Lp().lastfm.get_artist_infos(artist)
         else:
             return (None, None)
@@ -125,6 +165,7 @@ class Downloader:
             @return (url as str/None, content as str)
         """
         if Downloader.Wikipedia is not None:
+            self.__queue.wait("wikipedia")
             wp = Downloader.Wikipedia()
             return wp.get_page_infos(artist)
         else:
@@ -135,17 +176,19 @@ class Downloader:
             Return deezer artist information
             @param artist as str
             @return (url as str/None, content as None)
+            @raise GLib.Error
         """
         try:
             artist_formated = GLib.uri_escape_string(
                                 artist, None, True).replace(' ', '+')
-            s = Gio.File.new_for_uri("https://api.deezer.com/search/artist/?"
-                                     "q=%s&output=json&index=0&limit=1&" %
-                                     artist_formated)
-            (status, data, tag) = s.load_contents()
-            if status:
+            data = self._load_uri("https://api.deezer.com/search/artist/?"
+                                  "q=%s&output=json&index=0&limit=1&" %
+                                  artist_formated, "deezer")
+            if data is not None:
                 decode = json.loads(data.decode('utf-8'))
                 return (decode['data'][0]['picture_xl'], None)
+        except GLib.Error:
+            raise
         except Exception as e:
             debug("Downloader::_get_deezer_artist_artwork(): %s [%s]" %
                   (e, artist))
@@ -156,18 +199,20 @@ class Downloader:
             Return spotify artist information
             @param artist as str
             @return (url as str/None, content as None)
+            @raise GLib.Error
         """
         try:
             artist_formated = GLib.uri_escape_string(
                                 artist, None, True).replace(' ', '+')
-            s = Gio.File.new_for_uri("https://api.spotify.com/v1/search?q=%s"
-                                     "&type=artist" % artist_formated)
-            (status, data, tag) = s.load_contents()
-            if status:
+            data = self._load_uri("https://api.spotify.com/v1/search?q=%s"
+                                  "&type=artist" % artist_formated, "spotify")
+            if data is not None:
                 decode = json.loads(data.decode('utf-8'))
                 for item in decode['artists']['items']:
                     if item['name'].lower() == artist.lower():
                         return (item['images'][0]['url'], None)
+        except GLib.Error:
+            raise
         except Exception as e:
             debug("Downloader::_get_spotify_artist_artwork(): %s [%s]" %
                   (e, artist))
@@ -180,15 +225,15 @@ class Downloader:
             @param album as string
             @return image as bytes
             @tread safe
+            @raise GLib.Error
         """
         image = None
         try:
             album_formated = GLib.uri_escape_string(album, None, True)
-            s = Gio.File.new_for_uri("https://api.deezer.com/search/album/?"
-                                     "q=%s&output=json" %
-                                     album_formated)
-            (status, data, tag) = s.load_contents()
-            if status:
+            data = self._load_uri("https://api.deezer.com/search/album/?"
+                                  "q=%s&output=json" %
+                                  album_formated, "deezer")
+            if data is not None:
                 decode = json.loads(data.decode('utf-8'))
                 url = None
                 for item in decode['data']:
@@ -196,8 +241,9 @@ class Downloader:
                         url = item['cover_xl']
                         break
                 if url is not None:
-                    s = Gio.File.new_for_uri(url)
-                    (status, image, tag) = s.load_contents()
+                    image = self._load_uri(url, "deezer")
+        except GLib.Error:
+            raise
         except Exception as e:
             print("Downloader::__get_deezer_album_artwork: %s" % e)
         return image
@@ -209,25 +255,25 @@ class Downloader:
             @param album as string
             @return image as bytes
             @tread safe
+            @raise GLib.Error
         """
         image = None
         artists_spotify_ids = []
         try:
             artist_formated = GLib.uri_escape_string(
                                 artist, None, True).replace(' ', '+')
-            s = Gio.File.new_for_uri("https://api.spotify.com/v1/search?q=%s"
-                                     "&type=artist" % artist_formated)
-            (status, data, tag) = s.load_contents()
-            if status:
+            data = self._load_uri("https://api.spotify.com/v1/search?q=%s"
+                                  "&type=artist" % artist_formated, "spotify")
+            if data is not None:
                 decode = json.loads(data.decode('utf-8'))
                 for item in decode['artists']['items']:
                     artists_spotify_ids.append(item['id'])
 
             for artist_spotify_id in artists_spotify_ids:
-                s = Gio.File.new_for_uri("https://api.spotify.com/v1/artists/"
-                                         "%s/albums" % artist_spotify_id)
-                (status, data, tag) = s.load_contents()
-                if status:
+                data = self._load_uri("https://api.spotify.com/v1/artists/"
+                                      "%s/albums" % artist_spotify_id,
+                                      "spotify")
+                if data is not None:
                     decode = json.loads(data.decode('utf-8'))
                     url = None
                     for item in decode['items']:
@@ -236,9 +282,10 @@ class Downloader:
                             break
 
                     if url is not None:
-                        s = Gio.File.new_for_uri(url)
-                        (status, image, tag) = s.load_contents()
+                        image = self._load_uri(url, "spotify")
                     break
+        except GLib.Error:
+            raise
         except Exception as e:
             print("Downloader::_get_album_art_spotify: %s [%s/%s]" %
                   (e, artist, album))
@@ -251,23 +298,25 @@ class Downloader:
             @param album as string
             @return image as bytes
             @tread safe
+            @raise GLib.Error
         """
         image = None
         try:
             album_formated = GLib.uri_escape_string(
                                 album, None, True).replace(' ', '+')
-            s = Gio.File.new_for_uri("https://itunes.apple.com/search"
-                                     "?entity=album&term=%s" % album_formated)
-            (status, data, tag) = s.load_contents()
-            if status:
+            data = self._load_uri("https://itunes.apple.com/search"
+                                  "?entity=album&term=%s" % album_formated,
+                                  "itunes")
+            if data is not None:
                 decode = json.loads(data.decode('utf-8'))
                 for item in decode['results']:
                     if item['artistName'].lower() == artist.lower():
                         url = item['artworkUrl60'].replace('60x60',
                                                            '512x512')
-                        s = Gio.File.new_for_uri(url)
-                        (status, image, tag) = s.load_contents()
+                        image = self._load_uri(url, "itunes")
                         break
+        except GLib.Error:
+            raise
         except Exception as e:
             print("Downloader::_get_album_art_itunes: %s [%s/%s]" %
                   (e, artist, album))
@@ -280,15 +329,18 @@ class Downloader:
             @param album as string
             @return data as bytes
             @tread safe
+            @raise GLib.Error
         """
         image = None
         if Lp().lastfm is not None:
             try:
+                self.__queue.wait("lastfm")
                 last_album = Lp().lastfm.get_album(artist, album)
                 url = last_album.get_cover_image(4)
                 if url is not None:
-                    s = Gio.File.new_for_uri(url)
-                    (status, image, tag) = s.load_contents()
+                    image = self._load_uri(url, "lastfm")
+            except GLib.Error:
+                raise
             except Exception as e:
                 print("Downloader::_get_album_art_lastfm: %s [%s/%s]" %
                       (e, artist, album))
@@ -299,64 +351,88 @@ class Downloader:
 #######################
     def __cache_artists_info(self):
         """
-            Cache info for all artists
+            Queue info download for all artists, services already cached
+            are skipped, so download resumes where it stopped
         """
         # We create cache if needed
         InfoCache.init()
         # Then cache for lastfm/wikipedia/spotify/deezer/...
         for (artist_id, artist) in Lp().artists.get([]):
-            if not Gio.NetworkMonitor.get_default().get_network_available() or\
-                    InfoCache.exists(artist):
-                continue
-            artwork_set = False
             for (api, helper, unused) in InfoCache.WEBSERVICES:
-                debug("Downloader::__cache_artists_info(): %s@%s" % (artist,
-                                                                     api))
-                if helper is None:
+                if helper is None or InfoCache.exists(artist, api) or\
+                        self.__lookups.is_missed(artist, "", api):
                     continue
-                try:
-                    method = getattr(self, helper)
-                    (url, content) = method(artist)
-                    if url is not None:
-                        s = Gio.File.new_for_uri(url)
-                        (status, data, tag) = s.load_contents()
-                        if status:
-                            artwork_set = True
-                            InfoCache.add(artist, content, data, api)
-                            debug("Downloader::__cache_artists_info(): %s"
-                                  % url)
-                        else:
-                            InfoCache.add(artist, None, None, api)
-                except Exception as e:
-                    print("Downloader::__cache_artists_info():", e)
-                    InfoCache.add(artist, None, None, api)
-            if artwork_set:
-                GLib.idle_add(Lp().art.emit, 'artist-artwork-changed', artist)
+                self.__queue.add(("artist", artist, api),
+                                 self.__cache_artist_info,
+                                 (artist, api, helper),
+                                 self.__PRIORITY_ARTIST)
         self.__cache_artists_running = False
 
-    def __cache_albums_art(self):
+    def __is_network_error(self, e):
+        """
+            True if error means service did not answer
+            @param e as GLib.Error
+            @return bool
+        """
+        if e.domain == GLib.quark_to_string(Gio.resolver_error_quark()):
+            return True
+        for code in self.__NETWORK_ERRORS:
+            if e.matches(Gio.io_error_quark(), code):
+                return True
+        return False
+
+    def __cache_artist_info(self, artist, api, helper):
         """
-            Cache albums artwork (from queue)
+            Cache info for artist from web service
+            @param artist as str
+            @param api as str
+            @param helper as str
             @thread safe
         """
-        self.__in_albums_download = True
+        if not Gio.NetworkMonitor.get_default().get_network_available():
+            return
+        debug("Downloader::__cache_artist_info(): %s@%s" % (artist, api))
         try:
-            while self.__albums_queue:
-                album_id = self.__albums_queue.pop()
-                album = Lp().albums.get_name(album_id)
-                artist = ", ".join(Lp().albums.get_artists(album_id))
-                for (api, unused, helper) in InfoCache.WEBSERVICES:
-                    if helper is None:
-                        continue
-                    method = getattr(self, helper)
-                    data = method(artist, album)
-                    if data is not None:
-                        break
-                if data is None:
-                    self.__albums_history.append(album_id)
-                    continue
-                Lp().art.save_album_artwork(data, album_id)
+            (url, content) = getattr(self, helper)(artist)
+            data = None
+            if url is not None:
+                data = self._load_uri(url, api)
+            if content is not None or data is not None:
+                InfoCache.add(artist, content, data, api)
+            self.__lookups.set(artist, "", api, data is not None)
+            if data is not None:
+                debug("Downloader::__cache_artist_info(): %s" % url)
+                GLib.idle_add(Lp().art.emit, 'artist-artwork-changed', artist)
+        except GLib.Error as e:
+            # Network error, retry on next run
+            print("Downloader::__cache_artist_info():", e)
         except Exception as e:
-            print("Downloader::__cache_albums_art: %s" % e)
-        self.__albums_history.append(album_id)
-        self.__in_albums_download = False
+            print("Downloader::__cache_artist_info():", e)
+
+    def __cache_album_art(self, album_id):
+        """
+            Cache album artwork
+            @param album id as int
+            @thread safe
+        """
+        album = Lp().albums.get_name(album_id)
+        artist = ", ".join(Lp().albums.get_artists(album_id))
+        data = None
+        for (api, unused, helper) in InfoCache.WEBSERVICES:
+            if helper is None or\
+                    self.__lookups.is_missed(artist, album, api):
+                continue
+            try:
+                data = getattr(self, helper)(artist, album)
+                self.__lookups.set(artist, album, api, data is not None)
+            except GLib.Error as e:
+                # Network error, retry on next run
+                print("Downloader::__cache_album_art:", e)
+                return
+            except Exception as e:
+                print("Downloader::__cache_album_art:", e)
+            if data is not None:
+                break
+        self.__albums_history.add(album_id)
+        if data is not None:
+            Lp().art.save_album_artwork(data, album_id)
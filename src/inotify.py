@@ -12,7 +12,10 @@
 
 from gi.repository import Gio, GLib
 
+import ctypes
+import ctypes.util
 import os
+import struct
 
 from lollypop.define import Lp
 from lollypop.utils import is_audio
@@ -21,16 +24,55 @@ from lollypop.utils import is_audio
 class Inotify:
     """
         Inotify support
+        One inotify instance watches all directories, changed paths are
+        queued and only them are updated by collection scanner
+        Gio monitors are used if inotify is not available
     """
     # 10 second before updating database
     __TIMEOUT = 10000
+    # inotify(7) flags
+    __IN_CLOSE_WRITE = 0x00000008
+    __IN_MOVED_FROM = 0x00000040
+    __IN_MOVED_TO = 0x00000080
+    __IN_CREATE = 0x00000100
+    __IN_DELETE = 0x00000200
+    __IN_Q_OVERFLOW = 0x00004000
+    __IN_IGNORED = 0x00008000
+    __IN_ONLYDIR = 0x01000000
+    __IN_ISDIR = 0x40000000
+    __IN_NONBLOCK = 0o00004000
+    __IN_CLOEXEC = 0o02000000
+    __MASK = __IN_CLOSE_WRITE | __IN_MOVED_FROM | __IN_MOVED_TO |\
+        __IN_CREATE | __IN_DELETE | __IN_ONLYDIR
+    # struct inotify_event without name
+    __EVENT = struct.Struct("iIII")
 
     def __init__(self):
         """
             Init inode notification
         """
+        # Gio monitors, only used as fallback
         self.__monitors = {}
+        # Watch descriptor -> path and path -> watch descriptor
+        self.__wds = {}
+        self.__paths = {}
         self.__timeout = None
+        # Pending changes
+        self.__changed = set()
+        self.__moves = []
+        self.__moved_from = {}
+        self.__overflow = False
+        self.__fd = -1
+        try:
+            self.__libc = ctypes.CDLL(ctypes.util.find_library("c"),
+                                      use_errno=True)
+            self.__fd = self.__libc.inotify_init1(self.__IN_NONBLOCK |
+                                                  self.__IN_CLOEXEC)
+        except Exception as e:
+            print("Inotify::__init__():", e)
+        if self.__fd >= 0:
+            GLib.io_add_watch(self.__fd, GLib.PRIORITY_DEFAULT,
+                              GLib.IOCondition.IN, self.__on_events)
 
     def add_monitor(self, path):
         """
@@ -38,7 +80,18 @@ class Inotify:
             @param path as string
         """
         # Check if there is already a monitor for this path
-        if path in self.__monitors.keys():
+        if path in self.__paths.keys() or path in self.__monitors.keys():
+            return
+        if self.__fd >= 0:
+            wd = self.__libc.inotify_add_watch(self.__fd,
+                                               os.fsencode(path),
+                                               self.__MASK)
+            if wd >= 0:
+                self.__wds[wd] = path
+                self.__paths[path] = wd
+            else:
+                print("Inotify::add_monitor():", path,
+                      os.strerror(ctypes.get_errno()))
             return
         try:
             f = Gio.File.new_for_path(path)
@@ -50,47 +103,142 @@ class Inotify:
         except:
             pass
 
+    def add_monitors(self, paths):
+        """
+            Add monitors for paths
+            @param paths as [string]
+        """
+        for path in paths:
+            self.add_monitor(path)
+
 #######################
 # PRIVATE             #
 #######################
+    def __on_events(self, fd, condition):
+        """
+            Read inotify events, queue changed paths
+            @param fd as int
+            @param condition as GLib.IOCondition
+        """
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            return True
+        offset = 0
+        while offset + self.__EVENT.size <= len(data):
+            (wd, mask, cookie, length) = self.__EVENT.unpack_from(data,
+                                                                  offset)
+            offset += self.__EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & self.__IN_Q_OVERFLOW:
+                self.__overflow = True
+            elif mask & self.__IN_IGNORED:
+                path = self.__wds.pop(wd, None)
+                if self.__paths.get(path) == wd:
+                    del self.__paths[path]
+            elif wd in self.__wds and name:
+                path = os.path.join(self.__wds[wd], os.fsdecode(name))
+                self.__on_event(path, mask, cookie)
+        self.__queue_update()
+        return True
+
+    def __on_event(self, path, mask, cookie):
+        """
+            Queue path if needed
+            @param path as str
+            @param mask as int
+            @param cookie as int
+        """
+        if mask & self.__IN_MOVED_FROM:
+            self.__moved_from[cookie] = path
+        elif mask & self.__IN_MOVED_TO:
+            old_path = self.__moved_from.pop(cookie, None)
+            if old_path is None:
+                self.__changed.add(path)
+            else:
+                self.__moves.append((old_path, path))
+                if mask & self.__IN_ISDIR:
+                    self.__rename_watches(old_path, path)
+        elif mask & self.__IN_ISDIR:
+            self.__changed.add(path)
+        elif mask & self.__IN_DELETE or\
+                is_audio(Gio.File.new_for_path(path)):
+            self.__changed.add(path)
+
+    def __rename_watches(self, old_path, new_path):
+        """
+            Update watched paths after a directory move
+            @param old_path as str
+            @param new_path as str
+        """
+        prefix = old_path + "/"
+        for (wd, path) in list(self.__wds.items()):
+            if path == old_path or path.startswith(prefix):
+                del self.__paths[path]
+                path = new_path + path[len(old_path):]
+                self.__wds[wd] = path
+                self.__paths[path] = wd
+
+    def __remove_watches(self, old_path):
+        """
+            Stop watching a directory moved out of collection
+            @param old_path as str
+        """
+        prefix = old_path + "/"
+        for (wd, path) in list(self.__wds.items()):
+            if path == old_path or path.startswith(prefix):
+                self.__libc.inotify_rm_watch(self.__fd, wd)
+
     def __on_dir_changed(self, monitor, changed_file, other_file, event):
         """
-            Prepare thread to handle changes
+            Queue changed path, Gio fallback
         """
-        update = False
-        # Stop collection scanner and wait
-        if Lp().scanner.is_locked():
-            Lp().scanner.stop()
-            GLib.timeout_add(self.__TIMEOUT,
-                             self.__on_dir_changed,
-                             monitor,
-                             changed_file,
-                             other_file,
-                             event)
-        # Run update delayed
+        path = changed_file.get_path()
+        # If a directory, monitor it
+        if os.path.exists(path):
+            if changed_file.query_file_type(
+                                        Gio.FileQueryInfoFlags.NONE,
+                                        None) == Gio.FileType.DIRECTORY:
+                self.add_monitor(path)
+                self.__changed.add(path)
+            # If not an audio file, exit
+            elif is_audio(changed_file):
+                self.__changed.add(path)
         else:
-            path = changed_file.get_path()
-            # If a directory, monitor it
-            if os.path.exists(path):
-                if changed_file.query_file_type(
-                                            Gio.FileQueryInfoFlags.NONE,
-                                            None) == Gio.FileType.DIRECTORY:
-                    self.add_monitor(path)
-                # If not an audio file, exit
-                elif is_audio(changed_file):
-                    update = True
-            else:
-                update = True
-            if update:
-                if self.__timeout is not None:
-                    GLib.source_remove(self.__timeout)
-                    self.__timeout = None
-                self.__timeout = GLib.timeout_add(self.__TIMEOUT,
-                                                  self.__run_collection_update)
+            self.__changed.add(path)
+        self.__queue_update()
+
+    def __queue_update(self):
+        """
+            Delay update while changes are happening
+        """
+        if not self.__changed and not self.__moves and\
+                not self.__moved_from and not self.__overflow:
+            return
+        if self.__timeout is not None:
+            GLib.source_remove(self.__timeout)
+        self.__timeout = GLib.timeout_add(self.__TIMEOUT,
+                                          self.__run_collection_update)
 
     def __run_collection_update(self):
         """
-            Run a collection update
+            Run a collection update for queued paths
         """
+        # Wait for current scan
+        if Lp().scanner.is_locked():
+            return True
         self.__timeout = None
-        Lp().window.update_db()
+        # Moved out of collection
+        for old_path in self.__moved_from.values():
+            self.__changed.add(old_path)
+            if self.__fd >= 0:
+                self.__remove_watches(old_path)
+        if self.__overflow:
+            Lp().window.update_db(True)
+        else:
+            Lp().scanner.update_paths(list(self.__changed), self.__moves)
+        self.__changed = set()
+        self.__moves = []
+        self.__moved_from = {}
+        self.__overflow = False
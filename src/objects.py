@@ -48,6 +48,14 @@ class Base:
             else:
                 return attr_value
 
+    def set_fields(self, values):
+        """
+            Set fields loaded from db
+            @param values as {field as str: value}
+        """
+        for (field, value) in values.items():
+            setattr(self, "_" + field, value)
+
     def get_popularity(self):
         """
             Get popularity
@@ -80,6 +88,8 @@ class Base:
                 avg_popularity = self.db.get_avg_popularity()
                 popularity = int((popularity * avg_popularity / 5) + 0.5)
                 self.db.set_popularity(self.id, popularity, True)
+                if self.db == Lp().tracks:
+                    Lp().player.update_party(self.id)
             elif self.id == Type.RADIOS:
                 radios = Radios()
                 avg_popularity = radios.get_avg_popularity()
@@ -99,6 +109,7 @@ class Disc:
         self.album = album
         self.number = disc_number
         self._track_ids = []
+        self._tracks = []
 
     @property
     def name(self):
@@ -135,7 +146,9 @@ class Disc:
 
             @return list of Track
         """
-        return [Track(id) for id in self.track_ids]
+        if not self._tracks:
+            self._tracks = Track.many(self.track_ids)
+        return self._tracks
 
 
 class Album(Base):
@@ -145,6 +158,24 @@ class Album(Base):
     FIELDS = ['name', 'artists', 'artist_ids', 'year', 'path', 'duration']
     DEFAULTS = ['', '', [], '', '', 0]
 
+    def many(album_ids, genre_ids=[]):
+        """
+            Get albums, fields are loaded with a few queries
+            @param album_ids as [int]
+            @param genre_ids as [int]
+            @return [Album]
+        """
+        infos = Lp().albums.get_infos([album_id for album_id in album_ids
+                                       if album_id is not None and
+                                       album_id >= 0])
+        albums = []
+        for album_id in album_ids:
+            album = Album(album_id, genre_ids)
+            if album_id in infos:
+                album.set_fields(infos[album_id])
+            albums.append(album)
+        return albums
+
     def __init__(self, album_id=None, genre_ids=[], artist_ids=[]):
         """
             Init album
@@ -210,7 +241,7 @@ class Album(Base):
             @return list of Track
         """
         if not self._tracks and self.track_ids:
-            self._tracks = [Track(track_id) for track_id in self.track_ids]
+            self._tracks = Track.many(self.track_ids)
         return self._tracks
 
     @property
@@ -252,6 +283,23 @@ class Track(Base):
               'duration', 'number', 'position', 'year', 'persistent', 'mtime']
     DEFAULTS = ['', None, [], [], [], '', '', 0.0, None, 0, None, 1, 0]
 
+    def many(track_ids):
+        """
+            Get tracks, fields are loaded with a few queries
+            @param track_ids as [int]
+            @return [Track]
+        """
+        infos = Lp().tracks.get_infos([track_id for track_id in track_ids
+                                       if track_id is not None and
+                                       track_id >= 0])
+        tracks = []
+        for track_id in track_ids:
+            track = Track(track_id)
+            if track_id in infos:
+                track.set_fields(infos[track_id])
+            tracks.append(track)
+        return tracks
+
     def __init__(self, track_id=None):
         """
             Init track
@@ -278,8 +326,8 @@ class Track(Base):
         """
         if not self._non_album_artists:
             # Show all artists for compilations
-            if self.album.artist_ids and\
-                    self.album.artist_ids[0] == Type.COMPILATIONS:
+            if self.album_artist_ids and\
+                    self.album_artist_ids[0] == Type.COMPILATIONS:
                 self._non_album_artists = self.artists
             # Show only non album artist for albums (and only if one)
             elif len(self.artists) > 1:
@@ -0,0 +1,230 @@
+# Copyright (c) 2014-2016 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from bisect import bisect_right
+from itertools import accumulate
+from time import time
+
+try:
+    import numpy
+except:
+    numpy = None
+
+from lollypop.define import Lp
+from lollypop.sqlcursor import SqlCursor
+from lollypop.utils import sql_chunks
+
+
+class PartySampler:
+    """
+        Weighted track sampler for party mode
+        Favor popular tracks, avoid recently played ones, boost never played
+        Use numpy if available
+    """
+    # Recently played weight halves every __HALF_LIFE seconds
+    __HALF_LIFE = 86400
+    # Recompute weights for recency after __REFRESH seconds
+    __REFRESH = 3600
+
+    def __init__(self):
+        """
+            Init sampler
+        """
+        self.__track_ids = []
+        self.__popularities = []
+        self.__ltimes = []
+        # Track id -> index in arrays
+        self.__indexes = {}
+        self.__weights = None
+        self.__cumulated = None
+        self.__computed = 0
+        self.__factors = (1.0, 1.0, 1.0)
+
+    def load(self, album_ids):
+        """
+            Load tracks for albums
+            @param album ids as [int]
+        """
+        album_ids = set(album_ids)
+        (popular, recent, never) = Lp().settings.get_value('party-weights')
+        self.__factors = (popular, recent, never)
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute("SELECT rowid, album_id, popularity, ltime\
+                                  FROM tracks")
+            rows = [(track_id, popularity, ltime)
+                    for (track_id, album_id, popularity, ltime) in result
+                    if album_id in album_ids]
+        self.__track_ids = [row[0] for row in rows]
+        self.__indexes = dict([(track_id, index) for (index, track_id)
+                               in enumerate(self.__track_ids)])
+        if numpy is None:
+            self.__popularities = [row[1] for row in rows]
+            self.__ltimes = [row[2] for row in rows]
+        else:
+            self.__popularities = numpy.array([row[1] for row in rows],
+                                              dtype=numpy.float64)
+            self.__ltimes = numpy.array([row[2] for row in rows],
+                                        dtype=numpy.float64)
+        self.__weights = None
+
+    def add(self, track_ids, album_ids):
+        """
+            Add tracks, only tracks for albums are kept
+            @param track ids as [int]
+            @param album ids as [int]
+        """
+        album_ids = set(album_ids)
+        rows = []
+        with SqlCursor(Lp().db) as sql:
+            for (chunk, marks) in sql_chunks(track_ids):
+                result = sql.execute("SELECT rowid, album_id, popularity,\
+                                      ltime FROM tracks\
+                                      WHERE rowid IN (%s)" % marks, chunk)
+                rows += [(track_id, popularity, ltime)
+                         for (track_id, album_id, popularity, ltime) in result
+                         if album_id in album_ids and
+                         track_id not in self.__indexes]
+        if not rows:
+            return
+        for (track_id, popularity, ltime) in rows:
+            self.__indexes[track_id] = len(self.__track_ids)
+            self.__track_ids.append(track_id)
+        popularities = [row[1] for row in rows]
+        ltimes = [row[2] for row in rows]
+        if numpy is None:
+            self.__popularities += popularities
+            self.__ltimes += ltimes
+        else:
+            self.__popularities = numpy.append(self.__popularities,
+                                               popularities)
+            self.__ltimes = numpy.append(self.__ltimes, ltimes)
+        if self.__weights is not None:
+            weights = self.__get_weights(popularities, ltimes,
+                                         self.__computed)
+            if numpy is None:
+                self.__weights += weights
+            else:
+                self.__weights = numpy.append(self.__weights, weights)
+            self.__cumulated = None
+
+    def remove(self, track_ids):
+        """
+            Remove tracks
+            @param track ids as [int]
+        """
+        for track_id in track_ids:
+            index = self.__indexes.pop(track_id, None)
+            if index is None:
+                continue
+            # Move last track in removed track place
+            last = len(self.__track_ids) - 1
+            if index != last:
+                moved = self.__track_ids[last]
+                self.__track_ids[index] = moved
+                self.__indexes[moved] = index
+                self.__popularities[index] = self.__popularities[last]
+                self.__ltimes[index] = self.__ltimes[last]
+                if self.__weights is not None:
+                    self.__weights[index] = self.__weights[last]
+            self.__track_ids.pop()
+            if numpy is None:
+                self.__popularities.pop()
+                self.__ltimes.pop()
+                if self.__weights is not None:
+                    self.__weights.pop()
+            else:
+                self.__popularities = self.__popularities[:last]
+                self.__ltimes = self.__ltimes[:last]
+                if self.__weights is not None:
+                    self.__weights = self.__weights[:last]
+            self.__cumulated = None
+
+    def update(self, track_id):
+        """
+            Reload popularity and listening time for track
+            @param track id as int
+        """
+        index = self.__indexes.get(track_id)
+        if index is None:
+            return
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute("SELECT popularity, ltime\
+                                  FROM tracks WHERE rowid=?", (track_id,))
+            v = result.fetchone()
+        if v is None:
+            return
+        (self.__popularities[index], self.__ltimes[index]) = v
+        if self.__weights is not None:
+            self.__weights[index] = self.__get_weights(
+                                           [v[0]], [v[1]], self.__computed)[0]
+            self.__cumulated = None
+
+    def pick(self, rand):
+        """
+            Pick a random track
+            @param rand as random.Random
+            @return track id as int/None if no tracks
+        """
+        if not self.__track_ids:
+            return None
+        now = time()
+        if self.__weights is None or\
+                now - self.__computed > self.__REFRESH:
+            self.__computed = now
+            self.__weights = self.__get_weights(self.__popularities,
+                                                self.__ltimes, now)
+            self.__cumulated = None
+        if self.__cumulated is None:
+            if numpy is None:
+                self.__cumulated = list(accumulate(self.__weights))
+            else:
+                self.__cumulated = numpy.cumsum(self.__weights)
+        total = self.__cumulated[-1]
+        # Everything just played, fallback to uniform
+        if total <= 0:
+            return self.__track_ids[rand.randrange(len(self.__track_ids))]
+        value = rand.random() * total
+        if numpy is None:
+            index = bisect_right(self.__cumulated, value)
+        else:
+            index = int(numpy.searchsorted(self.__cumulated, value, 'right'))
+        return self.__track_ids[min(index, len(self.__track_ids) - 1)]
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_weights(self, popularities, ltimes, now):
+        """
+            Get weights for tracks
+            @param popularities as [int]
+            @param ltimes as [int]
+            @param now as float
+            @return weights as [float]
+        """
+        (popular, recent, never) = self.__factors
+        if numpy is None:
+            weights = []
+            for (popularity, ltime) in zip(popularities, ltimes):
+                weight = (1.0 + popularity) ** popular
+                if ltime == 0:
+                    weight *= never
+                else:
+                    age = max(now - ltime, 0)
+                    weight *= (1 - 0.5 ** (age / self.__HALF_LIFE)) ** recent
+                weights.append(weight)
+            return weights
+        popularities = numpy.asarray(popularities, dtype=numpy.float64)
+        ltimes = numpy.asarray(ltimes, dtype=numpy.float64)
+        ages = numpy.maximum(now - ltimes, 0)
+        recency = (1 - numpy.power(0.5, ages / self.__HALF_LIFE)) ** recent
+        return numpy.power(1.0 + popularities, popular) *\
+            numpy.where(ltimes == 0, never, recency)
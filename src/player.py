@@ -267,6 +267,7 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer, RadioPlayer,
                 self._context.artist_ids[album.id].append(artist_id)
         self._context.prev_track = Track()
         self._context.next_track = Track()
+        self._reset_plan()
         self.load(album.tracks[0])
         self._albums = [album.id]
 
@@ -285,6 +286,7 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer, RadioPlayer,
         self._context.aritst_ids = {}
         self._context.prev_track = Track()
         self._context.next_track = Track()
+        self._reset_plan()
         ShufflePlayer.reset_history(self)
 
         # We are not playing a user playlist anymore
@@ -430,6 +432,12 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer, RadioPlayer,
                         self._context.artist_ids = load(open(
                                             DataPath + "/artist_ids.bin",
                                             "rb"))
+                        try:
+                            self.set_shuffle_history(load(open(
+                                            DataPath + "/shuffle.bin",
+                                            "rb")))
+                        except Exception as e:
+                            print("Player::restore_state():", e)
                     self.set_next()
                     self.set_prev()
                     if Lp().settings.get_value('repeat'):
@@ -328,6 +328,7 @@ class BinPlayer(BasePlayer):
                                     int(self.current_track.duration))
         if not Lp().scanner.is_locked():
             Lp().tracks.set_listened_at(self.current_track.id, int(time()))
+            self.update_party(self.current_track.id)
 
 #######################
 # PRIVATE             #
@@ -603,6 +604,7 @@ class BinPlayer(BasePlayer):
         if not Lp().scanner.is_locked():
             Lp().tracks.set_more_popular(finished.id)
             Lp().albums.set_more_popular(finished.album_id)
+            self.update_party(finished.id)
 
     def __set_gv_uri(self, io, condition, track, play):
         """
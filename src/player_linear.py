@@ -19,6 +19,8 @@ from lollypop.define import Lp
 class LinearPlayer(BasePlayer):
     """
         Manage normal playback
+        Albums and tracks positions are cached, so next/prev do not scan
+        albums list or query album tracks again
     """
 
     def __init__(self):
@@ -26,6 +28,11 @@ class LinearPlayer(BasePlayer):
             Init linear player
         """
         BasePlayer.__init__(self)
+        # Album id -> position in self._albums, checked on use
+        self.__positions = {}
+        # Album id -> (genre ids, artist ids, track ids,
+        #              {track id: position})
+        self.__tracks = {}
 
     def next(self):
         """
@@ -36,39 +43,36 @@ class LinearPlayer(BasePlayer):
         if not self._albums:
             return self._current_track
         track = Track()
-        if self._current_track.album.id in self._context.genre_ids and\
-           self._albums:
-            genre_ids = self._context.genre_ids[self._current_track.album.id]
-            artist_ids = self._context.artist_ids[self._current_track.album.id]
-            album = Album(self._current_track.album.id, genre_ids, artist_ids)
-            if self._current_track.id in album.track_ids:
-                new_track_position = album.track_ids.index(
-                                                self._current_track.id) + 1
+        album_id = self._current_track.album.id
+        if album_id in self._context.genre_ids:
+            (track_ids, positions) = self.__get_tracks(
+                                                album_id,
+                                                self._current_track.id)
+            if self._current_track.id in positions:
+                new_track_position = positions[self._current_track.id] + 1
                 # next album
-                if new_track_position >= len(album.tracks) or\
+                if new_track_position >= len(track_ids) or\
                    self._context.next == NextContext.START_NEW_ALBUM:
                     if self._context.next == NextContext.START_NEW_ALBUM:
                         if Lp().settings.get_value('repeat'):
                             self._context.next = NextContext.NONE
                         else:
                             self._context.next = NextContext.STOP_ALL
-                    try:
-                        self._finished = NextContext.STOP_ALBUM
-                        pos = self._albums.index(album.id)
-                        # we are on last album, go to first
-                        if pos + 1 >= len(self._albums):
-                            self._finished = NextContext.STOP_ALL
-                            pos = 0
-                        else:
-                            pos += 1
-                    except:
-                        pos = 0  # Happens if current album has been removed
-                    genre_ids = self._context.genre_ids[self._albums[pos]]
-                    track = Album(self._albums[pos],
-                                  genre_ids, artist_ids).tracks[0]
+                    self._finished = NextContext.STOP_ALBUM
+                    pos = self.__get_position(album_id)
+                    # Happens if current album has been removed
+                    if pos is None:
+                        pos = 0
+                    # we are on last album, go to first
+                    elif pos + 1 >= len(self._albums):
+                        self._finished = NextContext.STOP_ALL
+                        pos = 0
+                    else:
+                        pos += 1
+                    track = Track(self.__get_tracks(self._albums[pos])[0][0])
                 # next track
                 else:
-                    track = album.tracks[new_track_position]
+                    track = Track(track_ids[new_track_position])
         return track
 
     def prev(self):
@@ -80,28 +84,77 @@ class LinearPlayer(BasePlayer):
         if not self._albums:
             return self._current_track
         track = Track()
-        if self._current_track.album.id in self._context.genre_ids and \
-           self._albums:
-            genre_ids = self._context.genre_ids[self._current_track.album.id]
-            artist_ids = self._context.artist_ids[self._current_track.album.id]
-            album = Album(self._current_track.album.id, genre_ids, artist_ids)
-            if self._current_track.id in album.track_ids:
-                new_track_position = album.track_ids.index(
-                                                self._current_track.id) - 1
+        album_id = self._current_track.album.id
+        if album_id in self._context.genre_ids:
+            (track_ids, positions) = self.__get_tracks(
+                                                album_id,
+                                                self._current_track.id)
+            if self._current_track.id in positions:
+                new_track_position = positions[self._current_track.id] - 1
                 # Previous album
                 if new_track_position < 0:
-                    try:
-                        pos = self._albums.index(album.id)
-                        if pos - 1 < 0:  # we are on last album, go to first
-                            pos = len(self._albums) - 1
-                        else:
-                            pos -= 1
-                    except:
-                        pos = 0  # Happens if current album has been removed
-                    genre_ids = self._context.genre_ids[self._albums[pos]]
-                    track = Album(self._albums[pos],
-                                  genre_ids, artist_ids).tracks[-1]
+                    pos = self.__get_position(album_id)
+                    # Happens if current album has been removed
+                    if pos is None:
+                        pos = 0
+                    # we are on first album, go to last
+                    elif pos - 1 < 0:
+                        pos = len(self._albums) - 1
+                    else:
+                        pos -= 1
+                    track = Track(
+                               self.__get_tracks(self._albums[pos])[0][-1])
                 # Previous track
                 else:
-                    track = album.tracks[new_track_position]
+                    track = Track(track_ids[new_track_position])
         return track
+
+#######################
+# PROTECTED           #
+#######################
+    def _reset_plan(self):
+        """
+            Forget cached positions and tracks, call it when albums are
+            replaced by a new set
+        """
+        self.__positions = {}
+        self.__tracks = {}
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_position(self, album_id):
+        """
+            Get album position in albums, positions are indexed again if
+            albums changed since last call
+            @param album_id as int
+            @return int/None
+        """
+        pos = self.__positions.get(album_id)
+        if pos is None or pos >= len(self._albums) or\
+                self._albums[pos] != album_id:
+            self.__positions = dict([(album_id, pos) for (pos, album_id)
+                                     in enumerate(self._albums)])
+            pos = self.__positions.get(album_id)
+        return pos
+
+    def __get_tracks(self, album_id, track_id=None):
+        """
+            Get album tracks for current context
+            @param album_id as int
+            @param track_id as int, reload tracks if not in cache
+            @return (track ids as [int], positions as {int: int})
+        """
+        genre_ids = self._context.genre_ids[album_id]
+        artist_ids = self._context.artist_ids.get(album_id, [])
+        cached = self.__tracks.get(album_id)
+        if cached is None or cached[0] != genre_ids or\
+                cached[1] != artist_ids or\
+                (track_id is not None and track_id not in cached[3]):
+            track_ids = Album(album_id, genre_ids, artist_ids).track_ids
+            positions = {}
+            for (position, tid) in enumerate(track_ids):
+                positions.setdefault(tid, position)
+            cached = (list(genre_ids), list(artist_ids), track_ids, positions)
+            self.__tracks[album_id] = cached
+        return (cached[2], cached[3])
@@ -16,6 +16,7 @@ from lollypop.define import Shuffle, NextContext, Lp, Type
 from lollypop.player_base import BasePlayer
 from lollypop.objects import Track, Album
 from lollypop.list import LinkedList
+from lollypop.party_sampler import PartySampler
 
 
 class ShufflePlayer(BasePlayer):
@@ -29,9 +30,13 @@ class ShufflePlayer(BasePlayer):
             Init shuffle player
         """
         BasePlayer.__init__(self)
+        seed = Lp().settings.get_value('shuffle-seed').get_int32()
+        self.__random = random.Random(seed if seed else None)
         self.reset_history()
         # Party mode
         self.__is_party = False
+        self.__party_sampler = PartySampler()
+        self.__scan_signal_id = None
         Lp().settings.connect('changed::shuffle', self.___set_shuffle)
 
     def reset_history(self):
@@ -42,10 +47,7 @@ class ShufflePlayer(BasePlayer):
         self.__history = []
         # Used by shuffle albums to restore playlist before shuffle
         self._albums_backup = []
-        # Albums already played
-        self.__already_played_albums = []
-        # Tracks already played for albums
-        self.__already_played_tracks = {}
+        self.__reset_played()
         # Reset user playlist
         self.__user_playlist = []
         self.__user_playlist_ids = []
@@ -119,19 +121,43 @@ class ShufflePlayer(BasePlayer):
             self._external_tracks = []
             self._context.genre_ids = {}
             self.set_party_ids()
+            if self.__scan_signal_id is None:
+                self.__scan_signal_id = Lp().scanner.connect(
+                                                'tracks-changed',
+                                                self.__on_tracks_changed)
             # Start a new song if not playing
-            if (self._current_track.id in [None, Type.RADIOS])\
-                    and self._albums:
-                track_id = self.__get_random()
-                self.load(Track(track_id))
+            if self._current_track.id in [None, Type.RADIOS]:
+                track_id = self.__shuffle_next()
+                if track_id is not None:
+                    self.load(Track(track_id))
             elif not self.is_playing():
                 self.play()
         else:
+            if self.__scan_signal_id is not None:
+                Lp().scanner.disconnect(self.__scan_signal_id)
+                self.__scan_signal_id = None
             self._albums = albums_backup
             self.set_next()
             self.set_prev()
         self.emit('party-changed', party)
 
+    def get_shuffle_history(self):
+        """
+            Return shuffle history, to be restored with set_shuffle_history()
+            @return ({album id as int: set(track ids as int)}, random state)
+        """
+        return (self.__already_played_tracks, self.__random.getstate())
+
+    def set_shuffle_history(self, history):
+        """
+            Restore shuffle history
+            @param history as returned by get_shuffle_history()
+        """
+        (played, state) = history
+        self.__reset_played()
+        self.__already_played_tracks = played
+        self.__random.setstate(state)
+
     @property
     def is_party(self):
         """
@@ -161,20 +187,16 @@ class ShufflePlayer(BasePlayer):
         """
             Set party mode ids
         """
-        party_ids = self.get_party_ids()
-        if party_ids:
-            self._albums = Lp().albums.get_party_ids(party_ids)
-        else:
-            self._albums = Lp().albums.get_ids()
-        # We do not store genre_ids for ALL/POPULARS/...
-        genre_ids = []
-        for genre_id in party_ids:
-            if genre_id > 0:
-                genre_ids.append(genre_id)
-        # Set context for each album
-        for album_id in self._albums:
-            self._context.genre_ids[album_id] = genre_ids
-            self._context.artist_ids[album_id] = []
+        self.__set_party_albums()
+        self.__party_sampler.load(self._albums)
+
+    def update_party(self, track_id):
+        """
+            Update party weights for track
+            @param track id as int
+        """
+        if self.__is_party:
+            self.__party_sampler.update(track_id)
 
 #######################
 # PROTECTED           #
@@ -239,48 +261,118 @@ class ShufflePlayer(BasePlayer):
         if self._current_track.id is not None:
             self.set_next()
 
+    def __set_party_albums(self):
+        """
+            Set albums and context for party mode ids
+        """
+        party_ids = self.get_party_ids()
+        if party_ids:
+            self._albums = Lp().albums.get_party_ids(party_ids)
+        else:
+            self._albums = Lp().albums.get_ids()
+        # We do not store genre_ids for ALL/POPULARS/...
+        genre_ids = []
+        for genre_id in party_ids:
+            if genre_id > 0:
+                genre_ids.append(genre_id)
+        # Set context for each album
+        for album_id in self._albums:
+            self._context.genre_ids[album_id] = genre_ids
+            self._context.artist_ids[album_id] = []
+
+    def __reset_played(self):
+        """
+            Forget played tracks, start a new shuffle cycle
+        """
+        # Tracks already played for albums
+        self.__already_played_tracks = {}
+        # Albums with unplayed tracks, for self.__albums_source
+        self.__albums_pool = []
+        self.__albums_source = None
+        self.__albums_count = 0
+        # Unplayed tracks for albums, played ones are dropped lazily
+        self.__tracks_pool = {}
+
     def __shuffle_next(self):
         """
             Next track in shuffle mode
-            @return track id as int
+            @return track id as int/None
         """
-        try:
+        if self.__is_party:
+            track_id = self.__get_party_random()
+            # No weighted tracks, use unweighted shuffle
+            if track_id is not None:
+                return track_id
+        track_id = self.__get_random()
+        # All tracks played, start a new cycle
+        if track_id is None:
+            self.__reset_played()
             track_id = self.__get_random()
-            # Need to clear history
-            if track_id is None:
-                self._albums = self.__already_played_albums
-                self.reset_history()
-                return self.__shuffle_next()
-            return track_id
-        except:  # Recursion error
-            return None
+        return track_id
+
+    def __get_party_random(self):
+        """
+            Return a weighted random track for party mode
+            @return track id as int/None
+        """
+        track_id = self.__party_sampler.pick(self.__random)
+        # Just played, its listening time may not be saved yet
+        if track_id == self._current_track.id:
+            track_id = self.__party_sampler.pick(self.__random)
+        return track_id
 
     def __get_random(self):
         """
             Return a random track and make sure it has never been played
+            @return track id as int
+        """
+        # Album list changed, albums exhausted earlier are dropped again
+        # on first pick
+        if self.__albums_source is not self._albums or\
+                self.__albums_count != len(self._albums):
+            self.__albums_pool = list(self._albums)
+            self.__albums_source = self._albums
+            self.__albums_count = len(self._albums)
+        pool = self.__albums_pool
+        while pool:
+            index = self.__random.randrange(len(pool))
+            album_id = pool[index]
+            track_id = self.__get_random_track(album_id)
+            if track_id is not None:
+                return track_id
+            self._finished = NextContext.STOP_ALBUM
+            # No new tracks for this album, remove it
+            pool[index] = pool[-1]
+            pool.pop()
+        self._finished = NextContext.STOP_ALL
+        return None
+
+    def __get_random_track(self, album_id):
+        """
+            Return a random track never played for album
+            @param album id as int
+            @return track id as int/None
         """
-        for album_id in sorted(self._albums,
-                               key=lambda *args: random.random()):
+        played = self.__already_played_tracks.get(album_id, set())
+        if album_id not in self.__tracks_pool.keys():
             # We need to check this as in party mode, some items do not
             # have a valid genre (Populars, ...)
             if album_id in self._context.genre_ids.keys():
                 genre_ids = self._context.genre_ids[album_id]
             else:
                 genre_ids = []
-            tracks = Album(album_id, genre_ids).track_ids
-            for track in sorted(tracks, key=lambda *args: random.random()):
-                if album_id not in self.__already_played_tracks.keys() or\
-                   track not in self.__already_played_tracks[album_id]:
-                    return track
-            self._finished = NextContext.STOP_ALBUM
-            # No new tracks for this album, remove it
-            # If albums not in shuffle history, it's not present
-            # in db anymore (update since shuffle set)
-            if album_id in self.__already_played_tracks.keys():
-                self.__already_played_tracks.pop(album_id)
-                self.__already_played_albums.append(album_id)
-            self._albums.remove(album_id)
-        self._finished = NextContext.STOP_ALL
+            self.__tracks_pool[album_id] = [
+                track_id for track_id in Album(album_id, genre_ids).track_ids
+                if track_id not in played]
+        pool = self.__tracks_pool[album_id]
+        while pool:
+            index = self.__random.randrange(len(pool))
+            track_id = pool[index]
+            if track_id not in played:
+                return track_id
+            # Played since pool creation, remove it
+            pool[index] = pool[-1]
+            pool.pop()
         return None
 
     def __add_to_shuffle_history(self, track):
@@ -289,6 +381,17 @@ class ShufflePlayer(BasePlayer):
             @param track as Track
         """
         if track.album_id not in self.__already_played_tracks.keys():
-            self.__already_played_tracks[track.album_id] = []
-        if track.id not in self.__already_played_tracks[track.album_id]:
-            self.__already_played_tracks[track.album_id].append(track.id)
+            self.__already_played_tracks[track.album_id] = set()
+        self.__already_played_tracks[track.album_id].add(track.id)
+
+    def __on_tracks_changed(self, scanner, added, removed):
+        """
+            Update party albums and tracks
+            @param scanner as CollectionScanner
+            @param added as [int], added track ids
+            @param removed as [int], removed track ids
+        """
+        if self.__is_party:
+            self.__set_party_albums()
+            self.__party_sampler.remove(removed)
+            self.__party_sampler.add(added, self._albums)
@@ -30,6 +30,8 @@ class UserPlaylistPlayer(BasePlayer):
         self.__user_playlist_ids = []
         self.__user_playlist = []
         self.__user_playlist_backup = []
+        # Track id -> first position in user playlist
+        self.__positions = {}
 
     def get_user_playlist_ids(self):
         """
@@ -84,8 +86,8 @@ class UserPlaylistPlayer(BasePlayer):
         """
         track = Track()
         if self.__user_playlist and\
-           self._current_track.id in self.__user_playlist:
-            idx = self.__user_playlist.index(self._current_track.id)
+           self._current_track.id in self.__positions:
+            idx = self.__positions[self._current_track.id]
             if idx + 1 >= len(self.__user_playlist):
                 self._finished = NextContext.STOP_ALL
                 idx = 0
@@ -101,8 +103,8 @@ class UserPlaylistPlayer(BasePlayer):
         """
         track = Track()
         if self.__user_playlist and\
-           self._current_track.id in self.__user_playlist:
-            idx = self.__user_playlist.index(self._current_track.id)
+           self._current_track.id in self.__positions:
+            idx = self.__positions[self._current_track.id]
             if idx - 1 < 0:
                 idx = len(self.__user_playlist) - 1
             else:
@@ -127,5 +129,8 @@ class UserPlaylistPlayer(BasePlayer):
             if self.__user_playlist_backup:
                 self.__user_playlist = self.__user_playlist_backup
                 self.__user_playlist_backup = []
+        self.__positions = {}
+        for (position, track_id) in enumerate(self.__user_playlist):
+            self.__positions.setdefault(track_id, position)
         self.set_next()
         self.set_prev()
@@ -15,12 +15,12 @@ from gi.repository import GObject, GLib
 import os
 from gettext import gettext as _
 import itertools
-import sqlite3
 from datetime import datetime
 
 from lollypop.database import Database
 from lollypop.define import Lp, Type
 from lollypop.sqlcursor import SqlCursor
+from lollypop.utils import sql_chunks
 from lollypop.localized import LocalizedCollation
 
 
@@ -42,9 +42,20 @@ class Playlists(GObject.GObject):
                             name TEXT NOT NULL,
                             mtime BIGINT NOT NULL)'''
 
+    # Track id is a cache, uri is kept for tracks removed from collection
     __create_tracks = '''CREATE TABLE tracks (
                         playlist_id INT NOT NULL,
-                        uri TEXT NOT NULL)'''
+                        uri TEXT NOT NULL,
+                        track_id INT,
+                        position INT NOT NULL)'''
+    __create_tracks_idx = [
+        "CREATE UNIQUE index idx_pu ON tracks(playlist_id, uri)",
+        "CREATE index idx_pp ON tracks(playlist_id, position)",
+        "CREATE index IF NOT EXISTS idx_pt ON tracks(playlist_id, track_id)"]
+    # Bump when schema changes, see __upgrade()
+    __VERSION = 3
+    # Space between positions, tracks are moved without renumbering
+    __GAP = 1024
 
     def __init__(self):
         """
@@ -57,9 +68,13 @@ class Playlists(GObject.GObject):
             with SqlCursor(self) as sql:
                 sql.execute(self.__create_playlists)
                 sql.execute(self.__create_tracks)
+                for request in self.__create_tracks_idx:
+                    sql.execute(request)
+                sql.execute("PRAGMA user_version=%s" % self.__VERSION)
                 sql.commit()
         except:
             pass
+        self.__upgrade()
 
     def add(self, name):
         """
@@ -156,7 +171,8 @@ class Playlists(GObject.GObject):
         with SqlCursor(self) as sql:
             result = sql.execute("SELECT uri\
                                   FROM tracks\
-                                  WHERE playlist_id=?", (playlist_id,))
+                                  WHERE playlist_id=?\
+                                  ORDER BY position", (playlist_id,))
             return list(itertools.chain(*result))
 
     def get_track_ids(self, playlist_id):
@@ -167,13 +183,47 @@ class Playlists(GObject.GObject):
             @return array of track id as int
         """
         with SqlCursor(self) as sql:
-            result = sql.execute("SELECT music.tracks.rowid\
-                                  FROM tracks, music.tracks\
-                                  WHERE tracks.playlist_id=?\
-                                  AND music.tracks.uri=\
-                                  main.tracks.uri",
+            result = sql.execute("SELECT main.tracks.rowid,\
+                                  main.tracks.uri,\
+                                  music.tracks.rowid\
+                                  FROM main.tracks LEFT JOIN music.tracks\
+                                  ON music.tracks.rowid=main.tracks.track_id\
+                                  AND music.tracks.uri=main.tracks.uri\
+                                  WHERE main.tracks.playlist_id=?\
+                                  ORDER BY main.tracks.position",
                                  (playlist_id,))
-            return list(itertools.chain(*result))
+            rows = list(result)
+            # Stale ids, track removed or rescanned
+            uris = [uri for (rowid, uri, track_id) in rows
+                    if track_id is None]
+            if uris:
+                track_ids = {}
+                for (chunk, marks) in sql_chunks(uris):
+                    result = sql.execute("SELECT uri, rowid\
+                                          FROM music.tracks\
+                                          WHERE uri IN (%s)" % marks, chunk)
+                    track_ids.update(result)
+                rows = [(rowid, uri, track_ids.get(uri, track_id))
+                        for (rowid, uri, track_id) in rows]
+            return [track_id for (rowid, uri, track_id) in rows
+                    if track_id is not None]
+
+    def update_track_ids(self):
+        """
+            Update stale track ids, tracks removed or rescanned
+        """
+        with SqlCursor(self) as sql:
+            sql.execute("UPDATE tracks\
+                         SET track_id=(SELECT rowid FROM music.tracks\
+                                       WHERE music.tracks.uri=\
+                                       main.tracks.uri)\
+                         WHERE track_id IS NULL\
+                         OR NOT EXISTS (SELECT 1 FROM music.tracks\
+                                        WHERE music.tracks.rowid=\
+                                        main.tracks.track_id\
+                                        AND music.tracks.uri=\
+                                        main.tracks.uri)")
+            sql.commit()
 
     def get_id(self, playlist_name):
         """
@@ -254,14 +304,17 @@ class Playlists(GObject.GObject):
             @param notify as bool
         """
         with SqlCursor(self) as sql:
-            changed = False
-            for track in tracks:
-                if not self.exists_track(playlist_id, track.id):
-                    changed = True
-                    sql.execute("INSERT INTO tracks"
-                                " VALUES (?, ?)",
-                                (playlist_id, track.uri))
-                if notify:
+            position = self.__get_max_position(playlist_id)
+            changes = sql.total_changes
+            sql.executemany("INSERT OR IGNORE INTO tracks\
+                             (playlist_id, uri, track_id, position)\
+                             VALUES (?, ?, ?, ?)",
+                            [(playlist_id, track.uri, track.id,
+                              position + i * self.__GAP)
+                             for (i, track) in enumerate(tracks, 1)])
+            changed = sql.total_changes != changes
+            if notify:
+                for track in tracks:
                     GLib.idle_add(self.emit, 'playlist-add',
                                   playlist_id, track.id)
             if changed:
@@ -270,6 +323,37 @@ class Playlists(GObject.GObject):
                                               playlist_id))
                 sql.commit()
 
+    def move_tracks(self, playlist_id, tracks, before=None):
+        """
+            Move tracks before track, tracks not in playlist are inserted
+            Only moved rows are updated
+            @param playlist id as int
+            @param tracks as [Track]
+            @param before as Track, None to move at the end
+        """
+        if not tracks:
+            return
+        with SqlCursor(self) as sql:
+            positions = self.__get_free_positions(playlist_id, before,
+                                                  len(tracks))
+            if positions is None:
+                self.__renumber(playlist_id)
+                positions = self.__get_free_positions(playlist_id, before,
+                                                      len(tracks))
+            sql.executemany("UPDATE tracks SET position=?, track_id=?\
+                             WHERE playlist_id=? AND uri=?",
+                            [(position, track.id, playlist_id, track.uri)
+                             for (position, track) in zip(positions, tracks)])
+            sql.executemany("INSERT OR IGNORE INTO tracks\
+                             (playlist_id, uri, track_id, position)\
+                             VALUES (?, ?, ?, ?)",
+                            [(playlist_id, track.uri, track.id, position)
+                             for (position, track) in zip(positions, tracks)])
+            sql.execute("UPDATE playlists SET mtime=?\
+                         WHERE rowid=?", (datetime.now().strftime('%s'),
+                                          playlist_id))
+            sql.commit()
+
     def remove_tracks(self, playlist_id, tracks, notify=True):
         """
             Remove tracks from playlist
@@ -277,11 +361,12 @@ class Playlists(GObject.GObject):
             @param tracks as [Track]
         """
         with SqlCursor(self) as sql:
-            for track in tracks:
-                sql.execute("DELETE FROM tracks\
+            sql.executemany("DELETE FROM tracks\
                              WHERE uri=?\
-                             AND playlist_id=?", (track.uri, playlist_id))
-                if notify:
+                             AND playlist_id=?",
+                            [(track.uri, playlist_id) for track in tracks])
+            if notify:
+                for track in tracks:
                     GLib.idle_add(self.emit, 'playlist-del',
                                   playlist_id, track.id)
             sql.commit()
@@ -293,12 +378,20 @@ class Playlists(GObject.GObject):
             @param track id as int
             @return position as int
         """
-        i = 0
-        for tid in self.get_track_ids(playlist_id):
-            if track_id == tid:
-                break
-            i += 1
-        return i
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT COUNT(1)\
+                                  FROM tracks\
+                                  WHERE playlist_id=?\
+                                  AND track_id IS NOT NULL\
+                                  AND position<(\
+                                    SELECT position FROM tracks\
+                                    WHERE playlist_id=?\
+                                    AND track_id=?)",
+                                 (playlist_id, playlist_id, track_id))
+            v = result.fetchone()
+            if v is not None:
+                return v[0]
+            return 0
 
     def exists_track(self, playlist_id, track_id):
         """
@@ -311,9 +404,9 @@ class Playlists(GObject.GObject):
             result = sql.execute("SELECT main.tracks.uri\
                                   FROM tracks, music.tracks\
                                   WHERE music.tracks.rowid=?\
-                                  AND playlist_id=?\
-                                  AND music.tracks.uri=\
-                                  main.tracks.uri",
+                                  AND main.tracks.playlist_id=?\
+                                  AND main.tracks.uri=\
+                                  music.tracks.uri",
                                  (track_id, playlist_id))
             v = result.fetchone()
             if v is not None:
@@ -339,10 +432,10 @@ class Playlists(GObject.GObject):
 
     def get_cursor(self):
         """
-            Return a new sqlite cursor
+            Return a new sqlite connection, kept open by SqlCursor
         """
         try:
-            sql = sqlite3.connect(self._DB_PATH, 600.0)
+            sql = SqlCursor.connect(self._DB_PATH)
             sql.execute("ATTACH DATABASE '%s' AS music" % Database.DB_PATH)
             sql.create_collation('LOCALIZED', LocalizedCollation())
             return sql
@@ -352,3 +445,103 @@ class Playlists(GObject.GObject):
 #######################
 # PRIVATE             #
 #######################
+    def __get_max_position(self, playlist_id):
+        """
+            Get last position in playlist
+            @param playlist id as int
+            @return position as int, 0 if playlist is empty
+        """
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT MAX(position)\
+                                  FROM tracks\
+                                  WHERE playlist_id=?", (playlist_id,))
+            v = result.fetchone()
+            if v is not None and v[0] is not None:
+                return v[0]
+            return 0
+
+    def __get_free_positions(self, playlist_id, before, count):
+        """
+            Get free positions before track
+            @param playlist id as int
+            @param before as Track, None for playlist end
+            @param count as int
+            @return [int], None if positions must be renumbered
+        """
+        with SqlCursor(self) as sql:
+            end = None
+            if before is not None:
+                result = sql.execute("SELECT position FROM tracks\
+                                      WHERE playlist_id=? AND uri=?",
+                                     (playlist_id, before.uri))
+                v = result.fetchone()
+                if v is not None:
+                    end = v[0]
+            if end is None:
+                start = self.__get_max_position(playlist_id)
+                return [start + i * self.__GAP for i in range(1, count + 1)]
+            result = sql.execute("SELECT MAX(position) FROM tracks\
+                                  WHERE playlist_id=? AND position<?",
+                                 (playlist_id, end))
+            v = result.fetchone()
+            if v is not None and v[0] is not None:
+                start = v[0]
+            else:
+                start = end - (count + 1) * self.__GAP
+            step = (end - start) // (count + 1)
+            if step == 0:
+                return None
+            return [start + i * step for i in range(1, count + 1)]
+
+    def __renumber(self, playlist_id):
+        """
+            Space playlist positions
+            @param playlist id as int
+            @warning commit needed
+        """
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT rowid FROM tracks\
+                                  WHERE playlist_id=?\
+                                  ORDER BY position", (playlist_id,))
+            sql.executemany("UPDATE tracks SET position=? WHERE rowid=?",
+                            [(i * self.__GAP, rowid)
+                             for (i, (rowid,)) in enumerate(list(result), 1)])
+
+    def __upgrade(self):
+        """
+            Upgrade playlists database schema
+        """
+        try:
+            with SqlCursor(self) as sql:
+                result = sql.execute("PRAGMA user_version")
+                version = result.fetchone()[0]
+                if version < 1:
+                    # Explicit positions and track ids, no duplicates
+                    sql.execute("ALTER TABLE tracks ADD track_id INT")
+                    sql.execute("ALTER TABLE tracks\
+                                 ADD position INT NOT NULL DEFAULT 0")
+                    sql.execute("DELETE FROM tracks WHERE rowid NOT IN (\
+                                    SELECT MIN(rowid) FROM tracks\
+                                    GROUP BY playlist_id, uri)")
+                    sql.execute("UPDATE tracks SET position=rowid,\
+                                 track_id=(SELECT rowid FROM music.tracks\
+                                           WHERE music.tracks.uri=\
+                                           main.tracks.uri)")
+                    for request in self.__create_tracks_idx:
+                        sql.execute(request)
+                if version < 2:
+                    # Space positions
+                    result = sql.execute("SELECT rowid FROM tracks\
+                                          ORDER BY playlist_id, position")
+                    sql.executemany("UPDATE tracks SET position=?\
+                                     WHERE rowid=?",
+                                    [(i * self.__GAP, rowid)
+                                     for (i, (rowid,))
+                                     in enumerate(list(result), 1)])
+                if version < 3:
+                    # Position lookups by track id
+                    sql.execute(self.__create_tracks_idx[2])
+                sql.execute("PRAGMA user_version=%s" % self.__VERSION)
+                sql.commit()
+        except Exception as e:
+            print("Playlists::__upgrade():", e)
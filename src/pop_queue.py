@@ -117,11 +117,13 @@ class QueueRow(Gtk.ListBoxRow):
         """
         return self.__id
 
-    def set_labels(self):
+    def set_labels(self, track=None):
         """
             Set artist, album and title label
+            @param track as Track, loaded from row id if None
         """
-        track = Track(self.__id)
+        if track is None:
+            track = Track(self.__id)
         self.__artist_label.set_markup(
                                  "<b>"+escape(
                                         ", ".join(track.album.artists))+"</b>")
@@ -280,7 +282,7 @@ class QueuePopover(Gtk.Popover):
         """
         if Lp().player.get_queue():
             self.__clear_button.set_sensitive(True)
-        self.__add_items(list(Lp().player.get_queue()))
+        self.__add_items(Track.many(list(Lp().player.get_queue())))
 
 #######################
 # PROTECTED           #
@@ -309,12 +311,12 @@ class QueuePopover(Gtk.Popover):
     def __add_items(self, items, prev_album_id=None):
         """
             Add items to the view
-            @param item ids as [int]
+            @param items as [Track]
         """
         if items and not self._stop:
-            track_id = items.pop(0)
-            album_id = Lp().tracks.get_album_id(track_id)
-            row = self.__row_for_track_id(track_id)
+            track = items.pop(0)
+            album_id = track.album_id
+            row = self.__row_for_track(track)
             if album_id != prev_album_id:
                 surface = Lp().art.get_album_artwork(
                                         Album(album_id),
@@ -325,13 +327,13 @@ class QueuePopover(Gtk.Popover):
             self.__view.add(row)
             GLib.idle_add(self.__add_items, items, album_id)
 
-    def __row_for_track_id(self, track_id):
+    def __row_for_track(self, track):
         """
-            Get a row for track id
-            @param track id as int
+            Get a row for track
+            @param track as Track
         """
-        row = QueueRow(track_id)
-        row.set_labels()
+        row = QueueRow(track.id)
+        row.set_labels(track)
         row.connect('destroy', self.__on_child_destroyed)
         row.connect('track-moved', self.__on_track_moved)
         return row
@@ -421,7 +423,7 @@ class QueuePopover(Gtk.Popover):
             up = False
         else:
             up = True
-        src_row = self.__row_for_track_id(src)
+        src_row = self.__row_for_track(Track(src))
         # Destroy current src row
         i = 0
         row_index = -1
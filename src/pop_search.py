@@ -21,7 +21,7 @@ from lollypop.define import Lp, ArtSize, Type, DbPersistent
 from lollypop.objects import Track, Album
 from lollypop.pop_menu import TrackMenuPopover, TrackMenu
 from lollypop.pop_album import AlbumPopover
-from lollypop.search_item import SearchItem
+from lollypop.search_local import LocalSearch
 from lollypop.search_network import NetworkSearch
 from lollypop.youtube import Youtube
 
@@ -229,11 +229,11 @@ class SearchPopover(Gtk.Popover):
         self.set_position(Gtk.PositionType.BOTTOM)
         self.connect('map', self.__on_map)
         self.connect('unmap', self.__on_unmap)
-        self.__in_thread = False
-        self.__stop_thread = False
         self.__timeout = None
         self.__current_search = ''
         self.__search = None
+        self.__local_search = LocalSearch()
+        self.__local_search.connect('items-found', self.__on_local_items_found)
 
         builder = Gtk.Builder()
         builder.add_from_resource('/org/gnome/Lollypop/SearchPopover.ui')
@@ -277,13 +277,6 @@ class SearchPopover(Gtk.Popover):
             Timeout filtering
             @param widget as Gtk.TextEntry
         """
-        if self.__in_thread:
-            self.__stop_thread = True
-            self.__reset_search()
-            self.__stack.set_visible_child(self.__new_btn)
-            self.__spinner.stop()
-            GLib.timeout_add(100, self._on_search_changed, widget)
-
         if self.__timeout:
             GLib.source_remove(self.__timeout)
             self.__timeout = None
@@ -294,12 +287,12 @@ class SearchPopover(Gtk.Popover):
             self.__timeout = GLib.timeout_add(100,
                                               self.__on_search_changed_thread)
         else:
+            self.__local_search.stop()
             self.__reset_search()
             self.__stack.set_visible_child(self.__new_btn)
             self.__spinner.stop()
             self.__new_btn.set_sensitive(False)
-            for child in self.__view.get_children():
-                GLib.idle_add(child.destroy)
+            self.__clear()
 
     def _on_state_set(self, switch, state):
         """
@@ -320,76 +313,6 @@ class SearchPopover(Gtk.Popover):
         for child in self.__view.get_children():
             child.destroy()
 
-    def __populate(self):
-        """
-            Populate searching items
-            in db based on text entry current text
-        """
-        GLib.idle_add(self.__clear)
-
-        # Network Search
-        t = Thread(target=self.__network_search)
-        t.daemon = True
-        t.start()
-
-        # Local search
-        results = []
-        added_album_ids = []
-        added_track_ids = []
-        search_items = [self.__current_search]
-        # search_items += self.__current_search.split()
-        for item in search_items:
-            albums = []
-            tracks_non_album_artist = []
-            # Get all albums for all artists and non album_artist tracks
-            for artist_id in Lp().artists.search(item):
-                for album_id in Lp().albums.get_ids([artist_id], []):
-                    if (album_id, artist_id) not in albums:
-                        albums.append((album_id, artist_id))
-                for track_id, track_name in Lp(
-                                   ).tracks.get_as_non_album_artist(artist_id):
-                    tracks_non_album_artist.append((track_id, track_name))
-
-            for album_id, artist_id in albums:
-                if album_id in added_album_ids:
-                    continue
-                search_item = SearchItem()
-                search_item.id = album_id
-                added_album_ids.append(album_id)
-                search_item.is_track = False
-                search_item.artist_ids = [artist_id]
-                results.append(search_item)
-
-            albums = Lp().albums.search(item)
-            for album_id in albums:
-                if album_id in added_album_ids:
-                    continue
-                search_item = SearchItem()
-                search_item.id = album_id
-                added_album_ids.append(album_id)
-                search_item.is_track = False
-                search_item.artist_ids = Lp().albums.get_artist_ids(album_id)
-                results.append(search_item)
-
-            for track_id, track_name in Lp().tracks.search(
-                                               item) + tracks_non_album_artist:
-                if track_id in added_track_ids:
-                    continue
-                search_item = SearchItem()
-                search_item.id = track_id
-                added_track_ids.append(track_id)
-                search_item.is_track = True
-                search_item.artist_ids = Lp().tracks.get_artist_ids(track_id)
-                results.append(search_item)
-        if not self.__stop_thread:
-            GLib.idle_add(self.__add_rows_internal, results)
-        else:
-            self.__in_thread = False
-            self.__stop_thread = False
-            if not self.__need_network_search():
-                self.__stack.set_visible_child(self.__new_btn)
-                self.__spinner.stop()
-
     def __network_search(self):
         """
             Search on network
@@ -397,28 +320,6 @@ class SearchPopover(Gtk.Popover):
         if self.__need_network_search():
             self.__search.do(self.__current_search)
 
-    def __add_rows_internal(self, results):
-        """
-            Add rows for internal results
-            @param results as array of SearchItem
-        """
-        if results:
-            result = results.pop(0)
-            search_row = SearchRow(result)
-            search_row.show()
-            self.__view.add(search_row)
-            if self.__stop_thread:
-                self.__in_thread = False
-                self.__stop_thread = False
-            else:
-                GLib.idle_add(self.__add_rows_internal, results)
-        else:
-            self.__in_thread = False
-            self.__stop_thread = False
-            if not self.__need_network_search():
-                self.__stack.set_visible_child(self.__new_btn)
-                self.__spinner.stop()
-
     def __download_cover(self, uri, row):
         """
             Download row covers
@@ -577,6 +478,7 @@ class SearchPopover(Gtk.Popover):
         """
         # FIXME Not needed with GTK >= 3.18
         Lp().window.enable_global_shorcuts(True)
+        self.__local_search.stop()
         self.__reset_search()
         self.__stack.set_visible_child(self.__new_btn)
         self.__spinner.stop()
@@ -586,14 +488,32 @@ class SearchPopover(Gtk.Popover):
             Populate widget
         """
         self.__timeout = None
-        self.__in_thread = True
+        self.__reset_search()
+        self.__clear()
         self.__search = NetworkSearch()
         self.__search.connect('item-found', self.__on_item_found)
         self.__stack.set_visible_child(self.__spinner)
         self.__spinner.start()
-        t = Thread(target=self.__populate)
+        # Network Search
+        t = Thread(target=self.__network_search)
         t.daemon = True
         t.start()
+        self.__local_search.do(self.__current_search)
+
+    def __on_local_items_found(self, search, items, last):
+        """
+            Add rows for internal results
+            @param search as LocalSearch
+            @param items as [SearchItem]
+            @param last as bool
+        """
+        for item in items:
+            search_row = SearchRow(item)
+            search_row.show()
+            self.__view.add(search_row)
+        if last and not self.__need_network_search():
+            self.__stack.set_visible_child(self.__new_btn)
+            self.__spinner.stop()
 
     def __on_row_activated(self, widget, row):
         """
@@ -13,7 +13,6 @@
 from gi.repository import GObject, GLib, Gio, TotemPlParser
 
 import os
-import sqlite3
 
 from lollypop.sqlcursor import SqlCursor
 
@@ -247,10 +246,10 @@ class Radios(GObject.GObject):
 
     def get_cursor(self):
         """
-            Return a new sqlite cursor
+            Return a new sqlite connection, kept open by SqlCursor
         """
         try:
-            return sqlite3.connect(self.DB_PATH, 600.0)
+            return SqlCursor.connect(self.DB_PATH)
         except:
             exit(-1)
 
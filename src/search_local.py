@@ -0,0 +1,210 @@
+# Copyright (c) 2014-2016 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GObject, GLib
+
+from threading import Thread, Lock
+import sqlite3
+
+from lollypop.define import Lp
+from lollypop.search_item import SearchItem
+from lollypop.sqlcursor import SqlCursor
+
+
+class LocalSearch(GObject.GObject):
+    """
+        Search provider over collection
+        Only one search runs at a time, a new search interrupts the running
+        one. If searched string extends previous one, previous matches are
+        filtered instead of querying database again
+    """
+    __gsignals__ = {
+        # Items as [SearchItem], True if last items
+        'items-found': (GObject.SignalFlags.RUN_FIRST, None, (object, bool)),
+    }
+    # Matches per kind
+    __LIMIT = 25
+    # Items sent at once
+    __BATCH = 10
+    # SQLite instructions between cancellation checks
+    __STEPS = 1000
+
+    def __init__(self):
+        """
+            Init provider
+        """
+        GObject.GObject.__init__(self)
+        self.__lock = Lock()
+        self.__thread = None
+        self.__searched = None
+        self.__generation = 0
+        self.__done = 0
+        # (searched as str, matches) for last complete search
+        self.__previous = None
+        Lp().scanner.connect('tracks-changed', self.__on_tracks_changed)
+
+    def do(self, searched):
+        """
+            Search for searched, items are sent by 'items-found'
+            @param searched as str
+        """
+        with self.__lock:
+            self.__searched = searched
+            self.__generation += 1
+            if self.__thread is None:
+                self.__thread = Thread(target=self.__run)
+                self.__thread.daemon = True
+                self.__thread.start()
+
+    def stop(self):
+        """
+            Stop current search
+        """
+        with self.__lock:
+            self.__searched = None
+            self.__previous = None
+            self.__generation += 1
+
+#######################
+# PRIVATE             #
+#######################
+    def __run(self):
+        """
+            Run searches until there is no new one
+        """
+        while True:
+            with self.__lock:
+                generation = self.__generation
+                searched = self.__searched
+                if generation == self.__done:
+                    self.__thread = None
+                    return
+            if searched is not None:
+                self.__search(generation, searched)
+            self.__done = generation
+
+    def __search(self, generation, searched):
+        """
+            Search for searched, stop if a new search is started
+            @param generation as int
+            @param searched as str
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.set_progress_handler(
+                lambda: self.__generation != generation, self.__STEPS)
+            try:
+                items = self.__get_items(self.__get_matches(generation,
+                                                            searched))
+                for i in range(0, len(items), self.__BATCH):
+                    GLib.idle_add(self.__emit, generation,
+                                  items[i:i + self.__BATCH],
+                                  i + self.__BATCH >= len(items))
+                if not items:
+                    GLib.idle_add(self.__emit, generation, [], True)
+            except sqlite3.OperationalError as e:
+                # Interrupted by a new search
+                if self.__generation == generation:
+                    print("LocalSearch::__search():", e)
+            finally:
+                sql.set_progress_handler(None, 0)
+
+    def __get_matches(self, generation, searched):
+        """
+            Get matches for searched, from previous matches if possible
+            @param generation as int
+            @param searched as str
+            @return (tracks, albums, artists) as
+                    ([(id as int, name as str)] * 3)
+        """
+        previous = self.__previous
+        matches = None
+        if previous is not None:
+            # Previous matches are a superset if they were not truncated
+            if searched.startswith(previous[0]) and\
+                    max([len(match) for match in previous[1]]) < self.__LIMIT:
+                matches = tuple([[(rowid, name) for (rowid, name) in match
+                                  if Lp().db.search_match(searched, name)]
+                                 for match in previous[1]])
+        if matches is None:
+            matches = Lp().db.search(searched, self.__LIMIT)
+        # Search stopped or collection changed meanwhile
+        with self.__lock:
+            if generation == self.__generation:
+                self.__previous = (searched, matches)
+        return matches
+
+    def __get_items(self, matches):
+        """
+            Get search items for matches
+            @param matches as (tracks, albums, artists)
+            @return [SearchItem]
+        """
+        (tracks, albums, artists) = matches
+        (artist_albums, artist_track_ids) = Lp().db.get_artists_content(
+                                        [artist_id for (artist_id, name)
+                                         in artists])
+        album_ids = [album_id for (album_id, name) in albums]
+        track_ids = [track_id for (track_id, name) in tracks] +\
+            artist_track_ids
+        items = []
+        # Albums for artists first, then albums
+        album_artists = [(album_id, [artist_id])
+                         for (album_id, artist_id) in artist_albums]
+        album_infos = Lp().albums.get_infos(album_ids)
+        for album_id in album_ids:
+            if album_id in album_infos:
+                album_artists.append((album_id,
+                                      album_infos[album_id]["artist_ids"]))
+        added_album_ids = set()
+        for (album_id, artist_ids) in album_artists:
+            if album_id in added_album_ids:
+                continue
+            added_album_ids.add(album_id)
+            item = SearchItem()
+            item.id = album_id
+            item.is_track = False
+            item.artist_ids = artist_ids
+            items.append(item)
+        track_infos = Lp().tracks.get_infos(track_ids)
+        added_track_ids = set()
+        for track_id in track_ids:
+            if track_id in added_track_ids or track_id not in track_infos:
+                continue
+            added_track_ids.add(track_id)
+            item = SearchItem()
+            item.id = track_id
+            item.is_track = True
+            item.artist_ids = track_infos[track_id]["artist_ids"]
+            items.append(item)
+        return items
+
+    def __emit(self, generation, items, last):
+        """
+            Emit items if search is still current
+            @param generation as int
+            @param items as [SearchItem]
+            @param last as bool
+        """
+        if generation == self.__generation:
+            self.emit('items-found', items, last)
+
+    def __on_tracks_changed(self, scanner, added, removed):
+        """
+            Forget previous matches, collection changed
+            @param scanner as CollectionScanner
+            @param added as [int], added track ids
+            @param removed as [int], removed track ids
+        """
+        with self.__lock:
+            self.__previous = None
+            # Running search restarts on new collection
+            self.__generation += 1
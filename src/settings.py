@@ -18,6 +18,7 @@ except:
 
 
 from os import remove
+from os.path import exists
 from gettext import gettext as _
 from gettext import ngettext as ngettext
 from threading import Thread
@@ -28,6 +29,7 @@ from lollypop.define import Lp, SecretSchema, SecretAttributes
 from lollypop.cache import InfoCache
 from lollypop.database import Database
 from lollypop.database_history import History
+from lollypop.sqlcursor import SqlCursor
 
 
 class Settings(Gio.Settings):
@@ -648,8 +650,15 @@ class SettingsDialog:
             progress.hide()
             for artist in Lp().artists.get([]):
                 Lp().art.emit('artist-artwork-changed', artist[1])
-            remove(Database.DB_PATH)
+            SqlCursor.remove(Lp().playlists)
+            SqlCursor.remove(Lp().db)
+            # Do not let WAL files leak into new database
+            for suffix in ["", "-wal", "-shm"]:
+                if exists(Database.DB_PATH + suffix):
+                    remove(Database.DB_PATH + suffix)
             Lp().db = Database()
+            SqlCursor.add(Lp().db)
+            SqlCursor.add(Lp().playlists)
             Lp().window.show_genres(Lp().settings.get_value('show-genres'))
             Lp().window.show()
             Lp().window.update_db()
@@ -667,7 +676,6 @@ class SettingsDialog:
             Lp().player.emit('current-changed')
             Lp().player.emit('prev-changed')
             Lp().player.emit('next-changed')
-            Lp().cursors = {}
             track_ids = Lp().tracks.get_ids()
             progress.show()
             history = History()
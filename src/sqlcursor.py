@@ -11,45 +11,114 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from threading import current_thread
+from threading import local
 
-from lollypop.define import Lp
+import sqlite3
 
 
 class SqlCursor:
     """
         Context manager to get the SQL cursor
+        Connections are kept open for thread lifetime, one per database
+        class, and closed when thread exits. Connections opened before
+        last remove() for their class are reopened on next use
     """
+    # Prepared statements kept by each connection
+    __CACHED_STATEMENTS = 256
+    # Page cache size in KiB
+    __CACHE_SIZE = 8192
+    # Memory mapped io size in bytes
+    __MMAP_SIZE = 67108864
+    __threads = local()
+    # Class name -> generation, bumped by remove()
+    __generations = {}
+
+    def connect(path):
+        """
+            Open a tuned sqlite connection
+            @param path as str
+            @return sqlite3.Connection
+        """
+        c = sqlite3.connect(path, 600.0,
+                            cached_statements=SqlCursor.__CACHED_STATEMENTS)
+        try:
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            c.execute("PRAGMA cache_size=-%s" % SqlCursor.__CACHE_SIZE)
+            c.execute("PRAGMA mmap_size=%s" % SqlCursor.__MMAP_SIZE)
+        except Exception as e:
+            print("SqlCursor::connect():", e)
+        return c
+
     def add(obj):
         """
-            Add cursor to thread list
-            Raise an exception if cursor already exists
+            Open a connection for thread, never rolled back
+            @param obj as object with get_cursor()
+        """
+        SqlCursor.__get(obj, True)
+
+    def remove(obj):
+        """
+            Close connection for thread, other threads reconnect on next
+            use
+            @param obj as object with get_cursor()
         """
-        name = current_thread().getName() + obj.__class__.__name__
-        Lp().cursors[name] = obj.get_cursor()
+        connections = getattr(SqlCursor.__threads, "connections", {})
+        name = obj.__class__.__name__
+        SqlCursor.__generations[name] =\
+            SqlCursor.__generations.get(name, 0) + 1
+        if name in connections:
+            connections[name][0].close()
+            del connections[name]
 
     def __init__(self, obj):
         """
             Init object
         """
         self._obj = obj
-        self._creator = False
 
     def __enter__(self):
         """
             Return cursor for thread, create a new one if needed
         """
-        name = current_thread().getName() + self._obj.__class__.__name__
-        if name not in Lp().cursors:
-            self._creator = True
-            Lp().cursors[name] = self._obj.get_cursor()
-        return Lp().cursors[name]
+        (sql, state) = SqlCursor.__get(self._obj)
+        state[0] += 1
+        return sql
 
     def __exit__(self, type, value, traceback):
         """
-            If creator, close cursor and remove it
+            If outer context, discard uncommitted changes like a closed
+            connection would
+        """
+        (sql, state) = SqlCursor.__get(self._obj)
+        state[0] -= 1
+        if state[0] == 0 and not state[1] and sql.in_transaction:
+            sql.rollback()
+
+#######################
+# PRIVATE             #
+#######################
+    def __get(obj, pinned=False):
+        """
+            Get connection for obj in current thread, open it if needed
+            @param obj as object with get_cursor()
+            @param pinned as bool
+            @return (sqlite3.Connection, [depth as int, pinned as bool])
         """
-        if self._creator:
-            name = current_thread().getName() + self._obj.__class__.__name__
-            Lp().cursors[name].close()
-            del Lp().cursors[name]
+        connections = getattr(SqlCursor.__threads, "connections", None)
+        if connections is None:
+            connections = SqlCursor.__threads.connections = {}
+        name = obj.__class__.__name__
+        generation = SqlCursor.__generations.get(name, 0)
+        if name in connections:
+            (sql, state, opened) = connections[name]
+            # Stale connection, reopen it outside of any context
+            if opened < generation and state[0] == 0:
+                sql.close()
+                del connections[name]
+                pinned = pinned or state[1]
+        if name not in connections:
+            connections[name] = (obj.get_cursor(), [0, pinned], generation)
+        elif pinned:
+            connections[name][1][1] = True
+        return connections[name][:2]
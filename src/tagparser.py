@@ -0,0 +1,545 @@
+# Copyright (c) 2014-2016 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import struct
+
+from re import match
+
+
+class TagParser:
+    """
+        Read tags and duration from file headers, without GStreamer
+        Supported: MP3 (ID3v2), FLAC, Ogg Vorbis/Opus and MP4
+        Tags use GStreamer names, anything not handled exactly as
+        GStreamer does is rejected, caller should then discover the file
+    """
+    # Bigger blocks (embedded artwork) are skipped or rejected
+    __MAX_BLOCK = 1024 * 1024
+    # How many bytes are read at end of file
+    __TAIL_SIZE = 65536
+    # How many bytes are searched for first mp3 frame
+    __SYNC_SIZE = 8192
+
+    __ID3_FRAMES = {"TIT2": "title", "TT2": "title",
+                    "TPE1": "artist", "TP1": "artist",
+                    "TPE2": "album-artist", "TP2": "album-artist",
+                    "TALB": "album", "TAL": "album",
+                    "TCON": "genre", "TCO": "genre",
+                    "TCOM": "composer", "TCM": "composer",
+                    "TOPE": "performer", "TOA": "performer",
+                    "TSOP": "artist-sortname",
+                    "TSO2": "album-artist-sortname",
+                    "TRCK": "track-number", "TRK": "track-number",
+                    "TPOS": "album-disc-number", "TPA": "album-disc-number",
+                    "TDRC": "year", "TYER": "year", "TYE": "year",
+                    "TXXX": "extended-comment", "TXX": "extended-comment"}
+
+    __VORBIS_FIELDS = {"TITLE": "title",
+                       "ARTIST": "artist",
+                       "ALBUMARTIST": "album-artist",
+                       "ALBUM ARTIST": "album-artist",
+                       "ALBUM": "album",
+                       "GENRE": "genre",
+                       "COMPOSER": "composer",
+                       "PERFORMER": "performer",
+                       "ARTISTSORT": "artist-sortname",
+                       "ALBUMARTISTSORT": "album-artist-sortname",
+                       "TRACKNUMBER": "track-number",
+                       "DISCNUMBER": "album-disc-number",
+                       "DATE": "year"}
+
+    __MP4_ATOMS = {b"\xa9nam": "title",
+                   b"\xa9ART": "artist",
+                   b"aART": "album-artist",
+                   b"\xa9alb": "album",
+                   b"\xa9gen": "genre",
+                   b"\xa9wrt": "composer",
+                   b"soar": "artist-sortname",
+                   b"soaa": "album-artist-sortname",
+                   b"trkn": "track-number",
+                   b"disk": "album-disc-number",
+                   b"\xa9day": "year"}
+
+    # (version, layer): bitrates in kbps
+    __MP3_BITRATES = {
+        (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352,
+                 384, 416, 448],
+        (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256,
+                 320, 384],
+        (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224,
+                 256, 320],
+        (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192,
+                 224, 256],
+        (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144,
+                 160],
+        (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144,
+                 160]}
+    # version: sample rates
+    __MP3_RATES = {1: [44100, 48000, 32000],
+                   2: [22050, 24000, 16000],
+                   2.5: [11025, 12000, 8000]}
+
+    def parse(self, path):
+        """
+            Read tags and duration for file
+            @param path as str
+            @return (tags as {name as str: [str/int]}, duration as int (s))
+                    or None if file is not supported
+        """
+        try:
+            with open(path, "rb") as f:
+                header = f.read(12)
+                f.seek(0)
+                if header[:4] == b"fLaC":
+                    return self.__parse_flac(f)
+                elif header[:4] == b"OggS":
+                    return self.__parse_ogg(f)
+                elif header[4:8] == b"ftyp":
+                    return self.__parse_mp4(f)
+                elif header[:3] == b"ID3" or\
+                        (len(header) > 1 and header[0] == 0xFF and
+                         header[1] & 0xE0 == 0xE0):
+                    return self.__parse_mp3(f)
+        except Exception as e:
+            print("TagParser::parse():", path, e)
+        return None
+
+#######################
+# PRIVATE             #
+#######################
+    def __add(self, tags, name, value):
+        """
+            Add value to tags, numbers and dates are converted to int
+            @param tags as {str: [str/int]}
+            @param name as str
+            @param value as str
+        """
+        if name in ["track-number", "album-disc-number", "year"]:
+            m = match(r"^\s*([0-9]+)", value)
+            if m is None:
+                return
+            value = int(m.group(1))
+        elif value == "":
+            return
+        if name in ["track-number", "album-disc-number", "year"] and\
+                name in tags:
+            return
+        tags.setdefault(name, []).append(value)
+
+    def __parse_comments(self, data, tags):
+        """
+            Read a vorbis comment block
+            @param data as bytes
+            @param tags as {str: [str/int]}
+        """
+        (length,) = struct.unpack("<I", data[:4])
+        offset = 4 + length
+        (count,) = struct.unpack("<I", data[offset:offset + 4])
+        offset += 4
+        for i in range(count):
+            (length,) = struct.unpack("<I", data[offset:offset + 4])
+            offset += 4
+            comment = data[offset:offset + length].decode("utf-8", "replace")
+            offset += length
+            if "=" not in comment:
+                continue
+            (key, value) = comment.split("=", 1)
+            name = self.__VORBIS_FIELDS.get(key.upper(), None)
+            if name is not None:
+                self.__add(tags, name, value)
+            else:
+                self.__add(tags, "extended-comment", comment)
+
+    def __parse_flac(self, f):
+        """
+            Read FLAC metadata blocks
+            @param f as file object
+            @return (tags, duration) or None
+        """
+        f.seek(4)
+        tags = {}
+        duration = None
+        last = False
+        while not last:
+            header = f.read(4)
+            if len(header) != 4:
+                return None
+            last = header[0] & 0x80
+            block_type = header[0] & 0x7F
+            (length,) = struct.unpack(">I", b"\x00" + header[1:])
+            if block_type == 0:
+                data = f.read(length)
+                (value,) = struct.unpack(">Q", data[10:18])
+                rate = value >> 44
+                samples = value & 0xFFFFFFFFF
+                if rate == 0 or samples == 0:
+                    return None
+                duration = samples // rate
+            elif block_type == 4:
+                if length > self.__MAX_BLOCK:
+                    return None
+                self.__parse_comments(f.read(length), tags)
+            else:
+                f.seek(length, os.SEEK_CUR)
+        if duration is None:
+            return None
+        return (tags, duration)
+
+    def __read_ogg_page(self, f):
+        """
+            Read an Ogg page
+            @param f as file object
+            @return (granule as int, serial as int, segments as [bytes],
+                     packet ends as [bool]) or None
+        """
+        header = f.read(27)
+        if len(header) != 27 or header[:4] != b"OggS":
+            return None
+        (granule, serial) = struct.unpack("<qI", header[6:18])
+        lacing = f.read(header[26])
+        segments = []
+        ends = []
+        for size in lacing:
+            segments.append(f.read(size))
+            ends.append(size < 255)
+        return (granule, serial, segments, ends)
+
+    def __parse_ogg(self, f):
+        """
+            Read Ogg Vorbis or Opus headers
+            @param f as file object
+            @return (tags, duration) or None
+        """
+        packets = []
+        packet = b""
+        serial = None
+        while len(packets) < 2:
+            page = self.__read_ogg_page(f)
+            if page is None:
+                return None
+            (granule, page_serial, segments, ends) = page
+            if serial is None:
+                serial = page_serial
+            elif page_serial != serial:
+                # Multiplexed streams, let GStreamer handle them
+                return None
+            for (segment, end) in zip(segments, ends):
+                packet += segment
+                if len(packet) > self.__MAX_BLOCK:
+                    return None
+                if end:
+                    packets.append(packet)
+                    packet = b""
+                    if len(packets) == 2:
+                        break
+        (ident, comments) = packets
+        tags = {}
+        if ident.startswith(b"\x01vorbis"):
+            (rate,) = struct.unpack("<I", ident[12:16])
+            preskip = 0
+            if not comments.startswith(b"\x03vorbis"):
+                return None
+            self.__parse_comments(comments[7:], tags)
+        elif ident.startswith(b"OpusHead"):
+            (preskip,) = struct.unpack("<H", ident[10:12])
+            rate = 48000
+            if not comments.startswith(b"OpusTags"):
+                return None
+            self.__parse_comments(comments[8:], tags)
+        else:
+            return None
+        # Last page granule gives stream length
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - self.__TAIL_SIZE))
+        tail = f.read()
+        index = tail.rfind(b"OggS")
+        while index != -1:
+            if len(tail) >= index + 18:
+                (granule, page_serial) = struct.unpack("<qI",
+                                                       tail[index + 6:
+                                                            index + 18])
+                if page_serial == serial and granule >= 0:
+                    if rate == 0:
+                        return None
+                    return (tags, max(0, granule - preskip) // rate)
+            index = tail.rfind(b"OggS", 0, index)
+        return None
+
+    def __parse_id3v2(self, f, tags):
+        """
+            Read ID3v2 tag at file start
+            @param f as file object
+            @param tags as {str: [str/int]}
+            @return tag size as int or None if tag can't be read
+        """
+        header = f.read(10)
+        version = header[3]
+        flags = header[5]
+        size = self.__syncsafe(header[6:10])
+        end = 10 + size
+        if flags & 0x10:
+            end += 10
+        # Unsynchronised tags are rare, let GStreamer handle them
+        if version not in [2, 3, 4] or flags & 0x80:
+            return None
+        if flags & 0x40 and version == 3:
+            (length,) = struct.unpack(">I", f.read(4))
+            f.seek(length, os.SEEK_CUR)
+        elif flags & 0x40 and version == 4:
+            length = self.__syncsafe(f.read(4))
+            f.seek(length - 4, os.SEEK_CUR)
+        while f.tell() < 10 + size:
+            if version == 2:
+                header = f.read(6)
+                if len(header) != 6:
+                    break
+                frame_id = header[:3]
+                (length,) = struct.unpack(">I", b"\x00" + header[3:6])
+                frame_flags = 0
+            else:
+                header = f.read(10)
+                if len(header) != 10:
+                    break
+                frame_id = header[:4]
+                if version == 4:
+                    length = self.__syncsafe(header[4:8])
+                else:
+                    (length,) = struct.unpack(">I", header[4:8])
+                frame_flags = header[9]
+            # Padding
+            if frame_id[:1] == b"\x00":
+                break
+            try:
+                name = self.__ID3_FRAMES.get(frame_id.decode("ascii"), None)
+            except:
+                return None
+            if name is None:
+                f.seek(length, os.SEEK_CUR)
+                continue
+            # Compressed, encrypted or unsynchronised frames
+            if (version == 3 and frame_flags & 0xC0) or\
+                    (version == 4 and frame_flags & 0x0E):
+                return None
+            data = f.read(length)
+            if version == 4 and frame_flags & 0x01:
+                data = data[4:]
+            values = self.__decode_id3_text(data)
+            if name == "extended-comment":
+                # Description and value
+                if len(values) >= 2:
+                    self.__add(tags, name, "%s=%s" % (values[0], values[1]))
+                continue
+            for value in values:
+                # Numeric genres are resolved by GStreamer
+                if name == "genre" and (value.startswith("(") or
+                                        value.isdigit()):
+                    return None
+                self.__add(tags, name, value)
+        return end
+
+    def __decode_id3_text(self, data):
+        """
+            Decode an ID3v2 text frame
+            @param data as bytes
+            @return [str]
+        """
+        if not data:
+            return []
+        encoding = data[0]
+        data = data[1:]
+        if encoding == 0:
+            text = data.decode("latin-1")
+        elif encoding == 1:
+            text = data.decode("utf-16")
+        elif encoding == 2:
+            text = data.decode("utf-16-be")
+        else:
+            text = data.decode("utf-8", "replace")
+        return [value for value in text.split("\x00") if value]
+
+    def __syncsafe(self, data):
+        """
+            Decode a syncsafe integer
+            @param data as bytes
+            @return int
+        """
+        value = 0
+        for byte in data:
+            value = (value << 7) | (byte & 0x7F)
+        return value
+
+    def __parse_mp3(self, f):
+        """
+            Read MP3 tags and duration
+            @param f as file object
+            @return (tags, duration) or None
+        """
+        tags = {}
+        start = 0
+        if f.read(3) == b"ID3":
+            f.seek(0)
+            start = self.__parse_id3v2(f, tags)
+            if start is None:
+                return None
+        size = f.seek(0, os.SEEK_END)
+        # ID3v1 and APE tags are merged by GStreamer, do not handle them
+        f.seek(max(0, size - 160))
+        tail = f.read()
+        if tail[-128:-125] == b"TAG" or b"APETAGEX" in tail:
+            return None
+        # Search first frame
+        f.seek(start)
+        data = f.read(self.__SYNC_SIZE)
+        if data[:4] == b"fLaC":
+            return None
+        for i in range(len(data) - 4):
+            if data[i] != 0xFF or data[i + 1] & 0xE0 != 0xE0:
+                continue
+            frame = self.__parse_mp3_frame(data[i:])
+            if frame is None:
+                continue
+            (bitrate, rate, samples, frames) = frame
+            if frames is not None:
+                return (tags, frames * samples // rate)
+            elif bitrate:
+                return (tags, (size - start - i) * 8 // (bitrate * 1000))
+            break
+        return None
+
+    def __parse_mp3_frame(self, data):
+        """
+            Read MPEG audio frame header, and Xing/VBRI header if any
+            @param data as bytes, starting with frame
+            @return (bitrate as int (kbps), rate as int,
+                     samples per frame as int, frames as int/None) or None
+        """
+        version = {0: 2.5, 2: 2, 3: 1}.get((data[1] >> 3) & 0x03, None)
+        layer = {1: 3, 2: 2, 3: 1}.get((data[1] >> 1) & 0x03, None)
+        bitrate_index = data[2] >> 4
+        rate_index = (data[2] >> 2) & 0x03
+        if version is None or layer is None or\
+                bitrate_index == 15 or rate_index == 3:
+            return None
+        bitrate = self.__MP3_BITRATES[(min(version, 2), layer)][bitrate_index]
+        rate = self.__MP3_RATES[version][rate_index]
+        if layer == 1:
+            samples = 384
+        elif layer == 3 and version != 1:
+            samples = 576
+        else:
+            samples = 1152
+        mono = (data[3] >> 6) == 3
+        if version == 1:
+            offset = 21 if mono else 36
+        else:
+            offset = 13 if mono else 21
+        frames = None
+        if data[offset:offset + 4] in [b"Xing", b"Info"]:
+            (flags,) = struct.unpack(">I", data[offset + 4:offset + 8])
+            if flags & 0x01:
+                (frames,) = struct.unpack(">I", data[offset + 8:offset + 12])
+        elif data[36:40] == b"VBRI":
+            (frames,) = struct.unpack(">I", data[50:54])
+        if frames is None and bitrate == 0:
+            return None
+        return (bitrate, rate, samples, frames)
+
+    def __read_atom(self, f, end):
+        """
+            Read MP4 atom header
+            @param f as file object
+            @param end as int, parent end
+            @return (type as bytes, data start as int, atom end as int)
+                    or None
+        """
+        start = f.tell()
+        if start + 8 > end:
+            return None
+        (size, atom) = struct.unpack(">I4s", f.read(8))
+        if size == 1:
+            (size,) = struct.unpack(">Q", f.read(8))
+        elif size == 0:
+            size = end - start
+        if size < 8 or start + size > end:
+            return None
+        return (atom, f.tell(), start + size)
+
+    def __parse_mp4(self, f):
+        """
+            Read MP4 metadata
+            @param f as file object
+            @return (tags, duration) or None
+        """
+        size = f.seek(0, os.SEEK_END)
+        f.seek(0)
+        tags = {}
+        duration = None
+        # Atoms to enter, meta is a full atom
+        containers = [b"moov", b"udta", b"meta", b"ilst"]
+        ends = [size]
+        while ends:
+            if f.tell() >= ends[-1]:
+                ends.pop()
+                continue
+            atom = self.__read_atom(f, ends[-1])
+            if atom is None:
+                return None
+            (atom, start, end) = atom
+            if atom in containers:
+                if atom == b"meta":
+                    f.seek(4, os.SEEK_CUR)
+                ends.append(end)
+                continue
+            elif atom == b"mvhd":
+                data = f.read(32)
+                if data[0] == 1:
+                    (timescale, length) = struct.unpack(">IQ", data[20:32])
+                else:
+                    (timescale, length) = struct.unpack(">II", data[12:20])
+                if timescale == 0:
+                    return None
+                duration = length // timescale
+            elif atom == b"gnre":
+                # ID3 genre number, resolved by GStreamer
+                return None
+            elif atom in self.__MP4_ATOMS and end - start < self.__MAX_BLOCK:
+                self.__parse_mp4_item(f.read(end - start),
+                                      self.__MP4_ATOMS[atom], tags)
+            f.seek(end)
+        if duration is None:
+            return None
+        return (tags, duration)
+
+    def __parse_mp4_item(self, data, name, tags):
+        """
+            Read MP4 ilst item data atoms
+            @param data as bytes
+            @param name as str
+            @param tags as {str: [str/int]}
+        """
+        offset = 0
+        while offset + 16 <= len(data):
+            (size, atom) = struct.unpack(">I4s", data[offset:offset + 8])
+            if size < 16:
+                return
+            if atom == b"data":
+                payload = data[offset + 16:offset + size]
+                if name in ["track-number", "album-disc-number"]:
+                    if len(payload) >= 4:
+                        (number,) = struct.unpack(">H", payload[2:4])
+                        if number:
+                            self.__add(tags, name, str(number))
+                else:
+                    self.__add(tags, name,
+                               payload.decode("utf-8", "replace"))
+            offset += size
@@ -12,7 +12,7 @@
 
 import gi
 gi.require_version('GstPbutils', '1.0')
-from gi.repository import Gst, GstPbutils
+from gi.repository import Gst, GstPbutils, GLib
 
 import os
 
@@ -22,6 +22,7 @@ from gettext import gettext as _
 
 from lollypop.define import Lp
 from lollypop.utils import format_artist_name
+from lollypop.tagparser import TagParser
 
 
 class Discoverer:
@@ -63,6 +64,201 @@ class TagReader(Discoverer):
             Init tag reader
         """
         Discoverer.__init__(self)
+        # Name to id caches, only loaded while scanning
+        self.__artist_ids = None
+        self.__sortnames = None
+        self.__genre_ids = None
+        self.__album_ids = None
+        self.__album_paths = None
+
+    def init_caches(self):
+        """
+            Load artists, genres and albums ids in memory
+            Call clean_caches() when done, db must not be modified
+            by others while caches are loaded
+        """
+        self.__artist_ids = {}
+        self.__sortnames = {}
+        for (artist_id, name, sortname) in Lp().artists.get_all():
+            self.__artist_ids[name] = artist_id
+            self.__sortnames[artist_id] = sortname
+        self.__genre_ids = {}
+        for (genre_id, name) in Lp().genres.get():
+            self.__genre_ids[name] = genre_id
+        self.__album_ids = {}
+        self.__album_paths = {}
+        for (album_id, name, path,
+             no_album_artist, artist_id) in Lp().albums.get_all():
+            self.__cache_album(album_id, name, path,
+                               [] if no_album_artist else [artist_id])
+
+    def clean_caches(self):
+        """
+            Drop caches loaded by init_caches()
+        """
+        self.__artist_ids = None
+        self.__sortnames = None
+        self.__genre_ids = None
+        self.__album_ids = None
+        self.__album_paths = None
+
+    def del_from_caches(self, artist_ids=[], genre_ids=[], album_ids=[]):
+        """
+            Remove ids from caches, use it when db objects are removed
+            @param artist ids as [int]
+            @param genre ids as [int]
+            @param album ids as [int]
+        """
+        if self.__artist_ids is None:
+            return
+        if artist_ids:
+            artist_ids = set(artist_ids)
+            self.__artist_ids = {name: artist_id for (name, artist_id)
+                                 in self.__artist_ids.items()
+                                 if artist_id not in artist_ids}
+            for artist_id in artist_ids:
+                self.__sortnames.pop(artist_id, None)
+        if genre_ids:
+            genre_ids = set(genre_ids)
+            self.__genre_ids = {name: genre_id for (name, genre_id)
+                                in self.__genre_ids.items()
+                                if genre_id not in genre_ids}
+        if album_ids:
+            album_ids = set(album_ids)
+            self.__album_ids = {key: album_id for (key, album_id)
+                                in self.__album_ids.items()
+                                if album_id not in album_ids}
+            for album_id in album_ids:
+                self.__album_paths.pop(album_id, None)
+
+    def get_artist_id(self, name):
+        """
+            Get artist id, use cache if loaded
+            @param name as str
+            @return artist id as int/None
+        """
+        if self.__artist_ids is not None and name in self.__artist_ids:
+            return self.__artist_ids[name]
+        artist_id = Lp().artists.get_id(name)
+        if artist_id is not None and self.__artist_ids is not None:
+            self.__artist_ids[name] = artist_id
+            self.__sortnames[artist_id] = Lp().artists.get_sortname(
+                                                                 artist_id)
+        return artist_id
+
+    def set_sortname(self, artist_id, sortname):
+        """
+            Set artist sort name, nothing done if unchanged in cache
+            @param artist id as int
+            @param sortname as str
+            @commit needed
+        """
+        if self.__sortnames is not None:
+            if self.__sortnames.get(artist_id) == sortname:
+                return
+            self.__sortnames[artist_id] = sortname
+        Lp().artists.set_sortname(artist_id, sortname)
+
+    def get_genre_id(self, name):
+        """
+            Get genre id, use cache if loaded
+            @param name as str
+            @return genre id as int/None
+        """
+        if self.__genre_ids is not None and name in self.__genre_ids:
+            return self.__genre_ids[name]
+        genre_id = Lp().genres.get_id(name)
+        if genre_id is not None and self.__genre_ids is not None:
+            self.__genre_ids[name] = genre_id
+        return genre_id
+
+    def get_album_id(self, album_name, artist_ids):
+        """
+            Get album id, use cache if loaded
+            @param album name as str
+            @param album artist ids as [int], empty for compilations
+            @return album id as int/None
+        """
+        if self.__album_ids is not None:
+            for artist_id in artist_ids or [None]:
+                key = (album_name, artist_id)
+                if key in self.__album_ids:
+                    return self.__album_ids[key]
+        if artist_ids:
+            album_id = Lp().albums.get_non_compilation_id(album_name,
+                                                          artist_ids)
+        else:
+            album_id = Lp().albums.get_compilation_id(album_name)
+        if album_id is not None and self.__album_ids is not None:
+            self.__cache_album(album_id, album_name,
+                               Lp().albums.get_path(album_id), artist_ids)
+        return album_id
+
+    def parse_info(self, info, uri):
+        """
+            Read all tags needed by collection scanner
+            @param info as GstPbutils.DiscovererInfo
+            @param uri as str
+            @return (title, artists, composers, performers, a_sortnames,
+                     aa_sortnames, album_artists, album_name, genres,
+                     discnumber, discname, tracknumber, year, duration)
+            @thread safe
+        """
+        path = GLib.filename_from_uri(uri)[0]
+        tags = info.get_tags()
+        return (self.get_title(tags, path),
+                self.get_artists(tags),
+                self.get_composers(tags),
+                self.get_performers(tags),
+                self.get_artist_sortnames(tags),
+                self.get_album_artist_sortnames(tags),
+                self.get_album_artist(tags),
+                self.get_album_name(tags),
+                self.get_genres(tags),
+                self.get_discnumber(tags),
+                self.get_discname(tags),
+                self.get_tracknumber(tags, GLib.path_get_basename(path)),
+                self.get_year(tags),
+                int(info.get_duration()/1000000000))
+
+    def parse_file(self, uri):
+        """
+            Read all tags needed by collection scanner from file headers,
+            faster than discovering the file
+            @param uri as str
+            @return parse_info() tuple or None if file is not supported
+            @thread safe
+        """
+        path = GLib.filename_from_uri(uri)[0]
+        result = TagParser().parse(path)
+        if result is None:
+            return None
+        (tags, duration) = result
+
+        def join(name):
+            return "; ".join(tags.get(name, []))
+
+        discname = ""
+        for comment in tags.get('extended-comment', []):
+            if comment.startswith("DISCSUBTITLE"):
+                discname = comment.replace("DISCSUBTITLE=", "")
+                break
+        filename = GLib.path_get_basename(path)
+        return (tags.get('title', [os.path.basename(path)])[0],
+                join('artist'),
+                join('composer'),
+                join('performer'),
+                join('artist-sortname'),
+                join('album-artist-sortname'),
+                join('album-artist'),
+                tags.get('album', [_("Unknown")])[0],
+                join('genre') or _("Unknown"),
+                tags.get('album-disc-number', [0])[0],
+                discname,
+                tags.get('track-number', [self.__guess_tracknumber(
+                                                            filename)])[0],
+                tags.get('year', [None])[0],
+                duration)
 
     def get_title(self, tags, filepath):
         """
@@ -238,15 +434,7 @@ class TagReader(Discoverer):
             return 0
         (exists, tracknumber) = tags.get_uint_index('track-number', 0)
         if not exists:
-            # Guess from filename
-            m = match('^([0-9]*)[ ]*-', filename)
-            if m:
-                try:
-                    tracknumber = int(m.group(1))
-                except:
-                    tracknumber = 0
-            else:
-                tracknumber = 0
+            tracknumber = self.__guess_tracknumber(filename)
         return tracknumber
 
     def get_year(self, tags):
@@ -284,7 +472,7 @@ class TagReader(Discoverer):
             artist = artist.strip()
             if artist != '':
                 # Get artist id, add it if missing
-                artist_id = Lp().artists.get_id(artist)
+                artist_id = self.get_artist_id(artist)
                 if i >= sortlen or sortsplit[i] == "":
                     sortname = None
                 else:
@@ -292,11 +480,11 @@ class TagReader(Discoverer):
                 if artist_id is None:
                     if sortname is None:
                         sortname = format_artist_name(artist)
-                    artist_id = Lp().artists.add(artist, sortname)
+                    artist_id = self.__add_artist(artist, sortname)
                     if artist in album_artists:
                         new_artist_ids.append(artist_id)
                 elif sortname is not None:
-                    Lp().artists.set_sortname(artist_id, sortname)
+                    self.set_sortname(artist_id, sortname)
                 i += 1
                 artist_ids.append(artist_id)
         return (artist_ids, new_artist_ids)
@@ -318,7 +506,7 @@ class TagReader(Discoverer):
             artist = artist.strip()
             if artist != '':
                 # Get album artist id, add it if missing
-                artist_id = Lp().artists.get_id(artist)
+                artist_id = self.get_artist_id(artist)
                 if i >= sortlen or sortsplit[i] == "":
                     sortname = None
                 else:
@@ -326,10 +514,10 @@ class TagReader(Discoverer):
                 if artist_id is None:
                     if sortname is None:
                         sortname = format_artist_name(artist)
-                    artist_id = Lp().artists.add(artist, sortname)
+                    artist_id = self.__add_artist(artist, sortname)
                     new_artist_ids.append(artist_id)
                 elif sortname is not None:
-                    Lp().artists.set_sortname(artist_id, sortname)
+                    self.set_sortname(artist_id, sortname)
                 i += 1
                 artist_ids.append(artist_id)
         return (artist_ids, new_artist_ids)
@@ -348,9 +536,11 @@ class TagReader(Discoverer):
             genre = genre.strip()
             if genre != '':
                 # Get genre id, add genre if missing
-                genre_id = Lp().genres.get_id(genre)
+                genre_id = self.get_genre_id(genre)
                 if genre_id is None:
                     genre_id = Lp().genres.add(genre)
+                    if self.__genre_ids is not None:
+                        self.__genre_ids[genre] = genre_id
                     new_genre_ids.append(genre_id)
                 genre_ids.append(genre_id)
         return (genre_ids, new_genre_ids)
@@ -370,18 +560,22 @@ class TagReader(Discoverer):
         """
         path = os.path.dirname(filepath)
         new = False
-        if artist_ids:
-            album_id = Lp().albums.get_non_compilation_id(album_name,
-                                                          artist_ids)
-        else:
-            album_id = Lp().albums.get_compilation_id(album_name)
+        album_id = self.get_album_id(album_name, artist_ids)
         if album_id is None:
             new = True
             album_id = Lp().albums.add(album_name, artist_ids,
                                        path, popularity, mtime)
+            if self.__album_ids is not None:
+                self.__cache_album(album_id, album_name, path, artist_ids)
         # Now we have our album id, check if path doesn't change
-        if Lp().albums.get_path(album_id) != path:
+        if self.__album_paths is not None:
+            current = self.__album_paths.get(album_id)
+        else:
+            current = Lp().albums.get_path(album_id)
+        if current != path:
             Lp().albums.set_path(album_id, path)
+            if self.__album_paths is not None:
+                self.__album_paths[album_id] = path
 
         return (album_id, new)
 
@@ -420,3 +614,46 @@ class TagReader(Discoverer):
             Lp().tracks.add_artist(track_id, artist_id)
         for genre_id in genre_ids:
             Lp().tracks.add_genre(track_id, genre_id)
+
+#######################
+# PRIVATE             #
+#######################
+    def __guess_tracknumber(self, filename):
+        """
+            Guess track number from filename
+            @param filename as str
+            @return track number as int
+        """
+        m = match('^([0-9]*)[ ]*-', filename)
+        if m:
+            try:
+                return int(m.group(1))
+            except:
+                pass
+        return 0
+
+    def __add_artist(self, name, sortname):
+        """
+            Add artist to db and cache
+            @param name as str
+            @param sortname as str
+            @return artist id as int
+            @commit needed
+        """
+        artist_id = Lp().artists.add(name, sortname)
+        if self.__artist_ids is not None:
+            self.__artist_ids[name] = artist_id
+            self.__sortnames[artist_id] = sortname
+        return artist_id
+
+    def __cache_album(self, album_id, name, path, artist_ids):
+        """
+            Add album to cache
+            @param album id as int
+            @param name as str
+            @param path as str
+            @param album artist ids as [int], empty for compilations
+        """
+        for artist_id in artist_ids or [None]:
+            self.__album_ids.setdefault((name, artist_id), album_id)
+        self.__album_paths[album_id] = path
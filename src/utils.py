@@ -14,6 +14,7 @@ from gi.repository import Gio
 
 from gettext import gettext as _
 from threading import Thread
+from locale import strxfrm
 import unicodedata
 import os
 import socket
@@ -34,6 +35,17 @@ def noaccents(string):
         return u"".join([c for c in nfkd_form if not unicodedata.combining(c)])
 
 
+def get_sortkey(string):
+    """
+        Return locale sort key for string, case and accents are ignored
+        first, binary comparison of keys follows locale order
+        @param string as str
+        @return bytes
+    """
+    key = strxfrm(noaccents(string).lower()) + "\0" + strxfrm(string)
+    return key.encode("utf-32-be", "surrogatepass")
+
+
 def escape(str):
     """
         Escape string
@@ -44,6 +56,19 @@ def escape(str):
                     c.isdigit() or c in ['_', '-', ' ', '.']]).rstrip()
 
 
+def sql_chunks(items, size=500):
+    """
+        Split items for SQL IN clauses, SQLite limits bound parameters
+        @param items as [object]
+        @param size as int
+        @return (chunk as [object], placeholders as str) generator
+    """
+    items = list(items)
+    for i in range(0, len(items), size):
+        chunk = items[i:i + size]
+        yield (chunk, ",".join("?" * len(chunk)))
+
+
 def debug(str):
     """
         Print debug
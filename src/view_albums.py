@@ -12,17 +12,24 @@
 
 from gi.repository import Gtk, GLib, Gdk
 
-from lollypop.view import View, LazyLoadingView
+from lollypop.define import ArtSize
+from lollypop.view import View
 from lollypop.widgets_album import AlbumSimpleWidget
 from lollypop.pop_album import AlbumPopover
 from lollypop.pop_menu import AlbumMenu, AlbumMenuPopover
 from lollypop.objects import Album
 
 
-class AlbumsView(LazyLoadingView):
+class AlbumsView(View):
     """
         Show albums in a box
+        Only visible rows have a widget, widgets are recycled on scroll
+        and populated in batches limited in time
     """
+    # Rows with widgets above and below visible area
+    __MARGIN = 2
+    # Time spent populating widgets per main loop iteration (µs)
+    __BUDGET = 8000
 
     def __init__(self, genre_ids, artist_ids):
         """
@@ -30,38 +37,64 @@ class AlbumsView(LazyLoadingView):
             @param genre ids as [int]
             @param artist ids as [int]
         """
-        LazyLoadingView.__init__(self)
+        View.__init__(self)
         self.__signal = None
         self.__context_album_id = None
         self.__genre_ids = genre_ids
         self.__artist_ids = artist_ids
         self.__press_rect = None
+        self.__albums = []
+        # Widgets in box, showing albums from self.__first
+        self.__widgets = []
+        self.__first = 0
+        # Widgets waiting for populate()
+        self.__pending = []
+        self.__columns = 1
+        self.__width = 0
+        self.__row_height = ArtSize.BIG
+        self.__update_id = None
+        self.__populate_id = None
 
         self.__albumbox = Gtk.FlowBox()
         self.__albumbox.set_selection_mode(Gtk.SelectionMode.NONE)
         self.__albumbox.connect('child-activated', self.__on_album_activated)
         self.__albumbox.connect('button-press-event', self.__on_button_press)
         self.__albumbox.set_homogeneous(True)
-        self.__albumbox.set_max_children_per_line(1000)
+        self.__albumbox.set_valign(Gtk.Align.START)
         self.__albumbox.show()
+        # Space for rows without widgets
+        self.__top = Gtk.Box()
+        self.__top.show()
+        self.__bottom = Gtk.Box()
+        self.__bottom.show()
+        self.__grid = Gtk.Grid()
+        self.__grid.set_orientation(Gtk.Orientation.VERTICAL)
+        self.__grid.add(self.__top)
+        self.__grid.add(self.__albumbox)
+        self.__grid.add(self.__bottom)
+        self.__grid.show()
 
         self._viewport.set_property('valign', Gtk.Align.START)
         self._viewport.set_property('margin', 5)
         self._scrolled.set_property('expand', True)
+        self._scrolled.get_vadjustment().connect('value-changed',
+                                                 self.__on_value_changed)
+        self._scrolled.connect('size-allocate', self.__on_size_allocate)
         self.add(self._scrolled)
 
     def populate(self, albums):
         """
             Populate albums
-            @param is compilation as bool
+            @param albums as [int]
         """
-        GLib.idle_add(self.__add_albums, albums)
+        GLib.idle_add(self.__set_albums,
+                      Album.many(albums, self.__genre_ids))
 
     def stop(self):
         """
             Stop loading
         """
-        self._lazy_queue = []
+        self.__pending = []
         for child in self._get_children():
             child.stop()
 
@@ -85,30 +118,166 @@ class AlbumsView(LazyLoadingView):
             children.append(child)
         return children
 
+    def _on_destroy(self, widget):
+        """
+            Remove pending sources
+            @param widget as Gtk.Widget
+        """
+        View._on_destroy(self, widget)
+        for source_id in [self.__update_id, self.__populate_id]:
+            if source_id is not None:
+                GLib.source_remove(source_id)
+        self.__update_id = self.__populate_id = None
+
 #######################
 # PRIVATE             #
 #######################
-    def __add_albums(self, albums):
+    def __set_albums(self, albums):
         """
-            Add albums to the view
-            Start lazy loading
-            @param [album ids as int]
+            Set albums shown by view
+            @param albums as [Album]
         """
         if self._stop:
             self._stop = False
             return
-        if albums:
-            widget = AlbumSimpleWidget(albums.pop(0),
-                                       self.__genre_ids,
-                                       self.__artist_ids)
+        self.__albums = albums
+        if self._viewport.get_child() is None:
+            self._viewport.add(self.__grid)
+        self.__update()
+
+    def __queue_update(self):
+        """
+            Update view on next main loop iteration
+        """
+        if self.__update_id is None:
+            self.__update_id = GLib.idle_add(self.__update)
+
+    def __update(self):
+        """
+            Give widgets to albums around visible area
+        """
+        self.__update_id = None
+        if self._stop:
+            return
+        if self.__widgets:
+            width = self.__widgets[0].get_preferred_width()[1]
+        else:
+            width = ArtSize.BIG + 12
+        # Viewport margin
+        self.__columns = max(1, (self.__width - 10) // width)
+        self.__albumbox.set_min_children_per_line(self.__columns)
+        self.__albumbox.set_max_children_per_line(self.__columns)
+        rows = (len(self.__albums) + self.__columns - 1) // self.__columns
+        adj = self._scrolled.get_vadjustment()
+        first_row = max(0, int(adj.get_value() / self.__row_height) -
+                        self.__MARGIN)
+        last_row = min(rows, int((adj.get_value() + adj.get_page_size()) /
+                                 self.__row_height) + 1 + self.__MARGIN)
+        first_row = min(first_row, last_row)
+        self.__top.set_size_request(-1, first_row * self.__row_height)
+        self.__bottom.set_size_request(-1,
+                                       (rows - last_row) * self.__row_height)
+        self.__set_window(first_row * self.__columns,
+                          min(len(self.__albums), last_row * self.__columns))
+
+    def __set_window(self, first, last):
+        """
+            Show albums from first to last, recycling widgets
+            @param first as int
+            @param last as int
+        """
+        old_first = self.__first
+        old_last = self.__first + len(self.__widgets)
+        # Albums keeping their widget
+        start = min(max(first, old_first), last)
+        end = max(min(last, old_last), start)
+        if start == end:
+            kept = []
+            free = self.__widgets
+        else:
+            kept = self.__widgets[start - old_first:end - old_first]
+            free = self.__widgets[:start - old_first] +\
+                self.__widgets[end - old_first:]
+        for widget in free:
+            self.__albumbox.remove(widget)
+        before = []
+        for index in range(first, start):
+            widget = self.__get_widget(free, self.__albums[index])
+            self.__albumbox.insert(widget, len(before))
+            before.append(widget)
+        after = []
+        for index in range(end, last):
+            widget = self.__get_widget(free, self.__albums[index])
             self.__albumbox.insert(widget, -1)
-            widget.show()
-            self._lazy_queue.append(widget)
-            GLib.idle_add(self.__add_albums, albums)
+            after.append(widget)
+        for widget in free:
+            widget.destroy()
+        self.__first = first
+        self.__widgets = before + kept + after
+        # Populate visible widgets first
+        widgets = set(self.__widgets)
+        self.__pending = [widget for widget in self.__pending
+                          if widget in widgets]
+        margin = self.__MARGIN * self.__columns
+        visible = set(self.__widgets[margin:len(self.__widgets) - margin])
+        self.__pending.sort(key=lambda widget: widget not in visible)
+        if self.__pending and self.__populate_id is None:
+            self.__populate_id = GLib.idle_add(self.__populate_pending)
+
+    def __get_widget(self, free, album):
+        """
+            Get a widget for album, recycled from free if possible
+            @param free as [AlbumSimpleWidget]
+            @param album as Album
+            @return AlbumSimpleWidget
+        """
+        if free:
+            widget = free.pop(0)
+            widget.set_album(album)
         else:
-            GLib.idle_add(self.lazy_loading)
-            if self._viewport.get_child() is None:
-                self._viewport.add(self.__albumbox)
+            widget = AlbumSimpleWidget(album, self.__artist_ids)
+            widget.show()
+        if widget not in self.__pending:
+            self.__pending.append(widget)
+        return widget
+
+    def __populate_pending(self):
+        """
+            Populate pending widgets until budget is spent
+        """
+        start = GLib.get_monotonic_time()
+        while self.__pending and\
+                GLib.get_monotonic_time() - start < self.__BUDGET:
+            self.__pending.pop(0).populate()
+        if self.__pending:
+            return True
+        self.__populate_id = None
+        # Box is homogeneous, all rows have the tallest child height
+        height = max([widget.get_preferred_height()[1]
+                      for widget in self.__widgets] + [1])
+        if height != self.__row_height:
+            self.__row_height = height
+            self.__queue_update()
+        return False
+
+    def __on_value_changed(self, adj):
+        """
+            Update widgets for new visible area
+            @param adj as Gtk.Adjustment
+        """
+        if self.__albums:
+            self.__queue_update()
+
+    def __on_size_allocate(self, scrolled, allocation):
+        """
+            Update widgets if width changed
+            @param scrolled as Gtk.ScrolledWindow
+            @param allocation as Gtk.Allocation
+        """
+        if allocation.width != self.__width:
+            self.__width = allocation.width
+            if self.__albums:
+                self.__queue_update()
 
     def __on_album_activated(self, flowbox, album_widget):
         """
@@ -123,7 +292,7 @@ class AlbumsView(LazyLoadingView):
         # FIXME: Report a bug and check always true
         (x, y) = album_widget.translate_coordinates(self._scrolled, 0, 0)
         if y < 0:
-            y = album_widget.translate_coordinates(self.__albumbox, 0, 0)[1]
+            y = album_widget.translate_coordinates(self.__grid, 0, 0)[1]
             self._scrolled.get_allocation().height + y
             self._scrolled.get_vadjustment().set_value(y)
         if self.__press_rect is not None:
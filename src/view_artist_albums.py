@@ -15,7 +15,7 @@ from gi.repository import Gtk, GLib, GObject
 from lollypop.view import LazyLoadingView, View
 from lollypop.view_container import ViewContainer
 from lollypop.define import Lp, Type, ArtSize
-from lollypop.objects import Track
+from lollypop.objects import Track, Album
 from lollypop.widgets_album import AlbumDetailedWidget
 
 
@@ -69,7 +69,7 @@ class ArtistAlbumsView(LazyLoadingView):
         if albums:
             if len(albums) != 1:
                 self.__spinner.start()
-            self.__add_albums(albums)
+            self.__add_albums(Album.many(albums, self._genre_ids))
 
     def jump_to_current(self):
         """
@@ -144,12 +144,10 @@ class ArtistAlbumsView(LazyLoadingView):
         """
             Pop an album and add it to the view,
             repeat operation until album list is empty
-            @param [album ids as int]
+            @param albums as [Album]
         """
         if albums and not self._stop:
-            album_id = albums.pop(0)
-            widget = AlbumDetailedWidget(album_id,
-                                         self._genre_ids,
+            widget = AlbumDetailedWidget(albums.pop(0),
                                          self._artist_ids,
                                          self.__show_cover)
             self._lazy_queue.append(widget)
@@ -75,8 +75,8 @@ class PlaylistsView(View):
         heights = {}
         total = 0
         idx = 0
-        for track_id in tracks:
-            track = Track(track_id)
+        tracks = Track.many(tracks)
+        for track in tracks:
             if track.album_id != prev_album_id:
                 heights[idx] = 2
                 total += 2
@@ -93,7 +93,7 @@ class PlaylistsView(View):
             if count >= half:
                 break
             mid_tracks += 1
-        self.__tracks = tracks
+        self.__tracks = [track.id for track in tracks]
         self.__update_jump_button()
         self.__playlists_widget.populate_list_left(tracks[:mid_tracks],
                                                    1)
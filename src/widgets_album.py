@@ -22,7 +22,6 @@ from lollypop.objects import Track
 from lollypop.widgets_rating import RatingWidget
 from lollypop.pop_menu import AlbumMenuPopover, AlbumMenu
 from lollypop.pop_artwork import CoversPopover
-from lollypop.objects import Album
 
 
 class AlbumWidget:
@@ -30,11 +29,12 @@ class AlbumWidget:
         Base album widget
     """
 
-    def __init__(self, album_id, genre_ids=[]):
+    def __init__(self, album):
         """
             Init widget
+            @param album as Album
         """
-        self._album = Album(album_id, genre_ids)
+        self._album = album
         self._filter_ids = []
         self._selected = None
         self._loading = Loading.NONE
@@ -391,24 +391,39 @@ class AlbumSimpleWidget(Gtk.FlowBoxChild, AlbumWidget):
         Album widget showing cover, artist and title
     """
 
-    def __init__(self, album_id, genre_ids, artist_ids):
+    def __init__(self, album, artist_ids):
         """
             Init simple album widget
-            @param album id as int
-            @param genre ids as [int]
+            @param album as Album
             @param artist_ids as [int]
         """
         # We do not use Gtk.Builder for speed reasons
         Gtk.FlowBoxChild.__init__(self)
         self.set_size_request(ArtSize.BIG, ArtSize.BIG)
         self.get_style_context().add_class('loading')
-        AlbumWidget.__init__(self, album_id, genre_ids)
+        AlbumWidget.__init__(self, album)
         self._filter_ids = artist_ids
 
+    def set_album(self, album):
+        """
+            Recycle widget for album, content is updated by populate()
+            @param album as Album
+        """
+        if self._show_overlay:
+            self.show_overlay(False)
+        self._album = album
+        if self._widget is not None:
+            self._widget.set_opacity(0)
+
     def populate(self):
         """
             Populate widget content
         """
+        if self._widget is not None:
+            self.__set_content()
+            self._widget.set_sensitive(True)
+            self._widget.set_opacity(1)
+            return
         self.get_style_context().remove_class('loading')
         self._rounded_class = "rounded-icon-small"
         self._widget = Gtk.EventBox()
@@ -420,11 +435,9 @@ class AlbumSimpleWidget(Gtk.FlowBoxChild, AlbumWidget):
         self.__title_label = Gtk.Label()
         self.__title_label.set_ellipsize(Pango.EllipsizeMode.END)
         self.__title_label.set_property('halign', Gtk.Align.CENTER)
-        self.__title_label.set_markup("<b>"+escape(self._album.name)+"</b>")
         self.__artist_label = Gtk.Label()
         self.__artist_label.set_ellipsize(Pango.EllipsizeMode.END)
         self.__artist_label.set_property('halign', Gtk.Align.CENTER)
-        self.__artist_label.set_text(", ".join(self._album.artists))
         self.__artist_label.get_style_context().add_class('dim-label')
         self._widget.set_property('has-tooltip', True)
         self._widget.connect('query-tooltip', self._on_query_tooltip)
@@ -450,16 +463,12 @@ class AlbumSimpleWidget(Gtk.FlowBoxChild, AlbumWidget):
         grid.add(self.__title_label)
         grid.add(self.__artist_label)
         self.add(self._widget)
-        self.set_cover()
-        self.update_state()
+        self.__set_content()
         self._widget.set_property('halign', Gtk.Align.CENTER)
         self._widget.set_property('valign', Gtk.Align.CENTER)
         self.show_all()
         self._widget.connect('enter-notify-event', self._on_enter_notify)
         self._widget.connect('leave-notify-event', self._on_leave_notify)
-        if self._album.is_youtube:
-            self._cover.get_style_context().add_class(
-                                                'cover-frame-youtube')
 
     def get_id(self):
         """
@@ -586,6 +595,21 @@ class AlbumSimpleWidget(Gtk.FlowBoxChild, AlbumWidget):
 #######################
 # PRIVATE             #
 #######################
+    def __set_content(self):
+        """
+            Set labels, cover and state for current album
+        """
+        self.__title_label.set_markup("<b>"+escape(self._album.name)+"</b>")
+        self.__artist_label.set_text(", ".join(self._album.artists))
+        self.set_cover()
+        self.update_state()
+        if self._album.is_youtube:
+            self._cover.get_style_context().add_class(
+                                                'cover-frame-youtube')
+        else:
+            self._cover.get_style_context().remove_class(
+                                                'cover-frame-youtube')
+
     def _on_query_tooltip(self, eventbox, x, y, keyboard, tooltip):
         """
             Show tooltip if needed
@@ -618,17 +642,15 @@ class AlbumDetailedWidget(Gtk.Bin, AlbumWidget):
         'populated': (GObject.SignalFlags.RUN_FIRST, None, ())
     }
 
-    def __init__(self, album_id, genre_ids, artist_ids, show_cover):
+    def __init__(self, album, artist_ids, show_cover):
         """
             Init detailed album widget
-            @param album id as int
-            @param genre ids as [int]
+            @param album as Album
             @param artist ids as [int]
-            @param lazy as LazyLoadingView
             @param show cover as bool
         """
         Gtk.Bin.__init__(self)
-        AlbumWidget.__init__(self, album_id, genre_ids)
+        AlbumWidget.__init__(self, album)
         self._album.set_artists(artist_ids)
         self.__width = None
         # Cover + rating + spacing
@@ -681,7 +703,8 @@ class AlbumDetailedWidget(Gtk.Bin, AlbumWidget):
             self._cover = None
 
         label = builder.get_object('duration')
-        duration = Lp().albums.get_duration(album_id, genre_ids)
+        duration = Lp().albums.get_duration(self._album.id,
+                                            self._album.genre_ids)
         hours = int(duration / 3600)
         mins = int(duration / 60)
         if hours > 0:
@@ -908,7 +931,7 @@ class AlbumDetailedWidget(Gtk.Bin, AlbumWidget):
         else:
             track_number = track.number
 
-        row = TrackRow(track.id, track_number)
+        row = TrackRow(track, track_number)
         row.show()
         widget[disc_number].add(row)
         GLib.idle_add(self.__add_tracks, tracks, widget, disc_number, i + 1)
@@ -41,6 +41,8 @@ class PlaylistsWidget(Gtk.Grid):
         self.__playlist_ids = playlist_ids
         self.__tracks_left = []
         self.__tracks_right = []
+        # Track id -> album id, for headers
+        self.__album_ids = {}
         self.__width = None
         self.__orientation = None
         self.__loading = Loading.NONE
@@ -112,26 +114,26 @@ class PlaylistsWidget(Gtk.Grid):
     def populate_list_left(self, tracks, pos):
         """
             Populate left list
-            @param track's ids as array of int (not null)
+            @param tracks as [Track]
             @param track position as int
             @thread safe
         """
         # We reset width here to allow size allocation code to run
         self.__width = None
-        self.__tracks_left = list(tracks)
+        self.__tracks_left = [track.id for track in tracks]
         GLib.idle_add(self.__add_tracks,
-                      tracks,
+                      list(tracks),
                       self.__tracks_widget_left,
                       pos)
 
     def populate_list_right(self, tracks, pos):
         """
             Populate right list
-            @param track's ids as array of int (not null)
+            @param tracks as [Track]
             @param track position as int
             @thread safe
         """
-        self.__tracks_right = list(tracks)
+        self.__tracks_right = [track.id for track in tracks]
         # If we are showing only one column, wait for widget1
         if self.__orientation == Gtk.Orientation.VERTICAL and\
            self.__locked_widget_right:
@@ -140,7 +142,7 @@ class PlaylistsWidget(Gtk.Grid):
             # We reset width here to allow size allocation code to run
             self.__width = None
             GLib.idle_add(self.__add_tracks,
-                          tracks,
+                          list(tracks),
                           self.__tracks_widget_right,
                           pos)
 
@@ -170,7 +172,7 @@ class PlaylistsWidget(Gtk.Grid):
             Add track to widget
             @param track id as int
         """
-        self.__add_tracks([track_id],
+        self.__add_tracks([Track(track_id)],
                           self.__tracks_widget_right,
                           -1)
         self.__update_tracks()
@@ -209,7 +211,7 @@ class PlaylistsWidget(Gtk.Grid):
     def __add_tracks(self, tracks, widget, pos, previous_album_id=None):
         """
             Add tracks to list
-            @param tracks id as array of [int]
+            @param tracks as [Track]
             @param widget TracksWidget
             @param track position as int
             @param pos as int
@@ -228,14 +230,15 @@ class PlaylistsWidget(Gtk.Grid):
             self.__locked_widget_right = False
             return
 
-        track = Track(tracks.pop(0))
-        row = PlaylistRow(track.id, pos,
-                          track.album.id != previous_album_id)
+        track = tracks.pop(0)
+        self.__album_ids[track.id] = track.album_id
+        row = PlaylistRow(track, pos,
+                          track.album_id != previous_album_id)
         row.connect('track-moved', self.__on_track_moved)
         row.show()
         widget.insert(row, pos)
         GLib.idle_add(self.__add_tracks, tracks, widget,
-                      pos + 1, track.album.id)
+                      pos + 1, track.album_id)
 
     def __update_tracks(self):
         """
@@ -271,7 +274,50 @@ class PlaylistsWidget(Gtk.Grid):
             else:
                 dst = -1
             self.__move_track(dst, src, True)
-        self.__update_tracks()
+
+    def __get_row(self, index):
+        """
+            Get row at index in playlist
+            @param index as int
+            @return PlaylistRow
+        """
+        len_tracks1 = len(self.__tracks_left)
+        if index < len_tracks1:
+            return self.__tracks_widget_left.get_row_at_index(index)
+        return self.__tracks_widget_right.get_row_at_index(index - len_tracks1)
+
+    def __get_album_id(self, track_id):
+        """
+            Get album id for track
+            @param track id as int
+            @return album id as int
+        """
+        if track_id not in self.__album_ids:
+            self.__album_ids[track_id] = Track(track_id).album.id
+        return self.__album_ids[track_id]
+
+    def __update_rows(self, indexes):
+        """
+            Update number and header of rows
+            @param indexes as [int], indexes in playlist
+        """
+        len_tracks1 = len(self.__tracks_left)
+        tracks = self.__tracks_left + self.__tracks_right
+        for index in indexes:
+            if index < 0 or index >= len(tracks):
+                continue
+            row = self.__get_row(index)
+            row.set_number(index + 1)
+            row.update_num_label()
+            # First row of right column only follows left column vertically
+            if index == 0 or (index == len_tracks1 and
+                              self.__orientation !=
+                              Gtk.Orientation.VERTICAL):
+                prev_album_id = None
+            else:
+                prev_album_id = self.__get_album_id(tracks[index - 1])
+            row.show_headers(self.__get_album_id(tracks[index]) !=
+                             prev_album_id)
 
     def __update_headers(self):
         """
@@ -296,66 +342,48 @@ class PlaylistsWidget(Gtk.Grid):
 
     def __move_track(self, dst, src, up):
         """
-            Move track from src to row
+            Move track row from src to dst row
             @param dst as int
             @param src as int
             @param up as bool
-            @return (dst_widget as TracksWidget,
-                     src index as int, dst index as int)
+            @return (src index as int, dst index as int) in playlist
         """
-        tracks1_len = len(self.__tracks_left)
-        tracks2_len = len(self.__tracks_right)
         if src in self.__tracks_left:
             src_widget = self.__tracks_widget_left
-            src_index = self.__tracks_left.index(src) - 1
+            src_tracks = self.__tracks_left
+            src_index = self.__tracks_left.index(src)
         else:
             src_widget = self.__tracks_widget_right
-            src_index = self.__tracks_right.index(src) - 1
-        if tracks1_len == 0 or dst in self.__tracks_left:
+            src_tracks = self.__tracks_right
+            src_index = self.__tracks_right.index(src)
+        if not self.__tracks_left or dst in self.__tracks_left:
             dst_widget = self.__tracks_widget_left
             dst_tracks = self.__tracks_left
-        elif tracks2_len == 0 or dst in self.__tracks_right:
+        elif not self.__tracks_right or dst in self.__tracks_right:
             dst_widget = self.__tracks_widget_right
             dst_tracks = self.__tracks_right
         else:
-            return
-        # Remove src from src_widget
-        for child in src_widget.get_children():
-            if child.get_id() == src:
-                child.destroy()
-                break
-        src_track = Track(src)
-        prev_track = Track()
-        name = escape(src_track.name)
+            return None
+        # Playlist index before move
+        if src_tracks is self.__tracks_left:
+            src_offset = 0
+        else:
+            src_offset = len(self.__tracks_left)
+        row = src_widget.get_row_at_index(src_index)
+        src_widget.remove(row)
+        del src_tracks[src_index]
         index = 0
-        # Get previous track
         if dst != -1:
-            for child in dst_widget.get_children():
-                if child.get_id() == dst:
-                    break
-                index += 1
+            index = dst_tracks.index(dst)
             if not up:
                 index += 1
-            # Get previous track (in dst context)
-            prev_index = dst_tracks.index(dst)
-            if up:
-                prev_index -= 1
-            prev_track = Track(dst_tracks[prev_index])
-            # If we are listening to a compilation, prepend artist name
-            if (src_track.album.artist_id == Type.COMPILATIONS or
-                    len(src_track.artist_ids) > 1 or
-                    src_track.album.artist_id not in src_track.artist_ids):
-                name = "<b>%s</b>\n%s" % (escape(", ".join(src_track.artists)),
-                                          name)
-            self.__tracks_left.insert(index, src_track.id)
-        row = PlaylistRow(src_track.id,
-                          index,
-                          index == 0 or
-                          src_track.album.id != prev_track.album.id)
-        row.connect('track-moved', self.__on_track_moved)
-        row.show()
         dst_widget.insert(row, index)
-        return (src_widget, dst_widget, src_index, index)
+        dst_tracks.insert(index, src)
+        if dst_tracks is self.__tracks_left:
+            dst_offset = 0
+        else:
+            dst_offset = len(self.__tracks_left)
+        return (src_offset + src_index, dst_offset + index)
 
     def __on_drag_data_received(self, widget, context, x, y, data, info, time):
         """
@@ -388,29 +416,35 @@ class PlaylistsWidget(Gtk.Grid):
             @param src as int
             @param up as bool
         """
-        def update_playlist():
+        def update_playlist(track_ids, before):
             # Save playlist in db only if one playlist visible
             if len(self.__playlist_ids) == 1 and self.__playlist_ids[0] >= 0:
-                Lp().playlists.clear(self.__playlist_ids[0], False)
-                tracks = []
-                for track_id in self.__tracks_left + self.__tracks_right:
-                    tracks.append(Track(track_id))
-                Lp().playlists.add_tracks(self.__playlist_ids[0],
-                                          tracks,
-                                          False)
+                Lp().playlists.move_tracks(self.__playlist_ids[0],
+                                           [Track(src)],
+                                           None if before is None
+                                           else Track(before))
             if not (set(self.__playlist_ids) -
                set(Lp().player.get_user_playlist_ids())):
-                Lp().player.update_user_playlist(self.__tracks_left +
-                                                 self.__tracks_right)
+                Lp().player.update_user_playlist(track_ids)
 
-        (src_widget, dst_widget, src_index, dst_index) = \
-            self.__move_track(dst, src, up)
-        self.__update_tracks()
+        indexes = self.__move_track(dst, src, up)
+        if indexes is None:
+            return
+        (src_index, dst_index) = indexes
         self.__update_position()
-        self.__update_headers()
-        self.__tracks_widget_left.update_indexes(1)
-        self.__tracks_widget_right.update_indexes(len(self.__tracks_left) + 1)
-        t = Thread(target=update_playlist)
+        # Only rows between src and dst moved, next row header may change
+        # as well as column boundaries
+        len_tracks1 = len(self.__tracks_left)
+        rows = set(range(min(src_index, dst_index),
+                         max(src_index, dst_index) + 2))
+        rows |= {len_tracks1 - 1, len_tracks1, len_tracks1 + 1}
+        self.__update_rows(sorted(rows))
+        track_ids = self.__tracks_left + self.__tracks_right
+        if dst_index + 1 < len(track_ids):
+            before = track_ids[dst_index + 1]
+        else:
+            before = None
+        t = Thread(target=update_playlist, args=(track_ids, before))
         t.daemon = True
         t.start()
 
@@ -15,7 +15,7 @@ from gi.repository import Gtk, Pango
 from gettext import gettext as _
 
 from lollypop.define import Lp, ArtSize, Type
-from lollypop.objects import Track
+from lollypop.objects import Track, Album
 from lollypop.widgets_album import AlbumWidget
 from lollypop.pop_radio import RadioPopover
 
@@ -45,7 +45,7 @@ class RadioWidget(Gtk.FlowBoxChild, AlbumWidget):
             Init widget content
         """
         self.get_style_context().remove_class('loading')
-        AlbumWidget.__init__(self, None)
+        AlbumWidget.__init__(self, Album())
         self._widget = Gtk.EventBox()
         self._widget.connect('enter-notify-event', self._on_enter_notify)
         self._widget.connect('leave-notify-event', self._on_leave_notify)
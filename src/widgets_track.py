@@ -26,17 +26,16 @@ class Row(Gtk.ListBoxRow):
     """
         A row
     """
-    def __init__(self, rowid, num):
+    def __init__(self, track, num):
         """
             Init row widgets
-            @param rowid as int
+            @param track as Track
             @param num as int
-            @param show loved as bool
         """
         # We do not use Gtk.Builder for speed reasons
         Gtk.ListBoxRow.__init__(self)
         self._artists_label = None
-        self._track = Track(rowid)
+        self._track = track
         self.__number = num
         self.__timeout_id = None
         self._indicator = IndicatorWidget(self._track.id)
@@ -301,14 +300,14 @@ class PlaylistRow(Row):
         'track-moved': (GObject.SignalFlags.RUN_FIRST, None, (int, int, bool))
     }
 
-    def __init__(self, rowid, num, show_headers):
+    def __init__(self, track, num, show_headers):
         """
             Init row widget
-            @param rowid as int
+            @param track as Track
             @param num as int
             @param show headers as bool
         """
-        Row.__init__(self, rowid, num)
+        Row.__init__(self, track, num)
         self.__show_headers = show_headers
         self._indicator.set_margin_start(5)
         self._row_widget.set_margin_start(5)
@@ -494,13 +493,13 @@ class TrackRow(Row):
             height = menu_height
         return height
 
-    def __init__(self, rowid, num):
+    def __init__(self, track, num):
         """
             Init row widget and show it
-            @param rowid as int
+            @param track as Track
             @param num as int
         """
-        Row.__init__(self, rowid, num)
+        Row.__init__(self, track, num)
         self._grid.insert_column(0)
         self._grid.attach(self._indicator, 0, 0, 1, 1)
         self.show_all()
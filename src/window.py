@@ -483,7 +483,7 @@ class Window(Gtk.ApplicationWindow, Container):
             # Delayed, make python segfault on sys.exit() otherwise
             # No idea why, maybe scanner using Gstpbutils before Gstreamer
             # initialisation is finished...
-            GLib.timeout_add(2000, self.update_db)
+            GLib.timeout_add(2000, self.update_db, True)
 
     def __on_current_changed(self, player):
         """